@@ -21,7 +21,8 @@ from pydantic import BaseModel
 
 from tools.campaign_admin import build_campaign_admin_tools, render_campaign_overview
 from utils.llm_models import campaign_admin as campaign_admin_model
-from utils.prompts import campaign_admin_prompt_template
+from utils.llm_resilience import resilient_invoke
+from utils.prompts import prompts
 
 logger = getLogger(__name__)
 
@@ -46,12 +47,12 @@ def spawn_campaign_admin(campaign_id: int) -> StateGraph:
 
     async def agent(state: CampaignAdminState) -> dict:
         """🧑‍💼 OOC admin assistant: converses, asks follow-ups, and uses its tools."""
-        prompt = await campaign_admin_prompt_template.ainvoke({
+        prompt = await prompts.ainvoke("campaign-admin", {
             "messages": state.messages,
             "campaign_context": state.campaign_context,
             "campaign_id": state.campaign_id,
         })
-        response = await campaign_admin_model.bind_tools(tools).ainvoke(prompt)
+        response = await resilient_invoke(campaign_admin_model.bind_tools(tools), prompt, policy="campaign_admin")
         logger.info(
             f"🧑‍💼 [campaign_admin] response for campaign {campaign_id}, "
             f"tool_calls={bool(response.tool_calls)}"
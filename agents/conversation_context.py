@@ -0,0 +1,237 @@
+"""🧾 Token-budgeted conversation history for prompts.
+
+``persist_messages`` extends a conversation's ``message_buffer`` forever, so
+feeding the raw buffer to every prompt makes prompt tokens -- and with them
+latency and cost -- grow with session length. ``assemble_context`` is the
+one place prompts get their ``messages`` from instead:
+
+- the newest ``CONTEXT_VERBATIM_MESSAGES`` messages (and anything the
+  summary has not caught up with yet) are kept verbatim, newest first, until
+  the node's token budget runs out;
+- everything older is folded into a rolling "story so far" summary that is
+  prepended as a single message.
+
+The summary is updated incrementally in the background after a turn is
+persisted, once ``CONTEXT_SUMMARY_BATCH`` messages have aged out of the
+verbatim window, and is cached per conversation. Nothing on the player's
+wait path ever summarizes.
+
+    CONTEXT_VERBATIM_MESSAGES  newest messages never folded into the summary (default 12)
+    CONTEXT_SUMMARY_BATCH      aged-out messages that trigger a summary update (default 6)
+    CONTEXT_SUMMARY_TOKENS     soft cap on the summary's size (default 800)
+    CONTEXT_BUDGET_TOKENS      history budget for full-context prompts (default 6000)
+    CONTEXT_RECENT_TOKENS      history budget for recent-window classifiers (default 2000)
+"""
+import asyncio
+import os
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any
+
+from langchain_core.messages import AnyMessage, HumanMessage
+from pydantic import BaseModel, Field
+
+from database.graphiti_utils import fire_and_forget
+from database.models.conversation import Conversation
+from utils.llm_governor import CHARS_PER_TOKEN, reported_tokens
+from utils.llm_models import context_summarizer
+from utils.llm_resilience import resilient_invoke
+from utils.prompts import prompts
+
+logger = getLogger(__name__)
+
+CONTEXT_VERBATIM_MESSAGES = int(os.environ.get("CONTEXT_VERBATIM_MESSAGES", "12"))
+CONTEXT_SUMMARY_BATCH = int(os.environ.get("CONTEXT_SUMMARY_BATCH", "6"))
+CONTEXT_SUMMARY_TOKENS = int(os.environ.get("CONTEXT_SUMMARY_TOKENS", "800"))
+CONTEXT_BUDGET_TOKENS = int(os.environ.get("CONTEXT_BUDGET_TOKENS", "6000"))
+CONTEXT_RECENT_TOKENS = int(os.environ.get("CONTEXT_RECENT_TOKENS", "2000"))
+
+# Role/name framing each chat message costs on top of its content.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_HEADER = "[The story so far -- earlier messages, summarized]"
+
+
+class StorySoFar(BaseModel):
+    """Rolling summary of the part of a session that no longer fits verbatim."""
+    summary: str = Field(description=(
+        "What has happened so far, in past tense. Compress older events hardest; "
+        "keep the most recent developments in the most detail."))
+    key_facts: list[str] = Field(default_factory=list, description=(
+        "Names, promises, debts, items, and revealed secrets a later scene may depend on, one per entry."))
+
+
+@dataclass
+class RollingSummary:
+    text: str = ""
+    covered: set[str] = field(default_factory=set)
+    updating: asyncio.Task | None = None
+    updates: int = 0
+    failures: int = 0
+    summarizer_tokens: int = 0
+
+
+@dataclass
+class AssemblyStats:
+    calls: int = 0
+    prompt_tokens: int = 0
+    history_tokens: int = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "mean_prompt_tokens": round(self.prompt_tokens / self.calls) if self.calls else None,
+            "mean_history_tokens": round(self.history_tokens / self.calls) if self.calls else None,
+        }
+
+
+_summaries: dict[int, RollingSummary] = {}
+_assembly = AssemblyStats()
+
+
+def message_tokens(message: AnyMessage) -> int:
+    return len(str(message.content)) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+def _key(message: AnyMessage) -> str:
+    return str(message.id)
+
+
+def _summary_message(rolling: RollingSummary) -> HumanMessage:
+    return HumanMessage(content=f"{SUMMARY_HEADER}\n{rolling.text}", name="story_so_far")
+
+
+def assemble_context(
+    conversation: Conversation,
+    pending: list[AnyMessage],
+    *,
+    budget_tokens: int,
+    limit: int | None = None,
+    summary: bool = True,
+) -> list[AnyMessage]:
+    """The conversation history a prompt should see, within ``budget_tokens``.
+
+    ``pending`` are this turn's not-yet-persisted messages; they are always
+    kept. ``limit`` additionally caps the verbatim messages for nodes that
+    only care about the latest exchange, and ``summary=False`` leaves the
+    rolling summary out for them.
+    """
+    rolling = _summaries.get(conversation.id)
+    covered = rolling.covered if rolling else set()
+    history = [m for m in conversation.message_buffer if _key(m) not in covered]
+    if limit is not None:
+        history = history[len(history) - max(limit - len(pending), 0):]
+
+    prefix = [_summary_message(rolling)] if summary and rolling and rolling.text else []
+    remaining = budget_tokens - sum(map(message_tokens, prefix)) - sum(map(message_tokens, pending))
+    kept: list[AnyMessage] = []
+    for message in reversed(history):
+        cost = message_tokens(message)
+        if cost > remaining:
+            break
+        kept.append(message)
+        remaining -= cost
+    kept.reverse()
+
+    assembled = [*prefix, *kept, *pending]
+    _assembly.calls += 1
+    _assembly.prompt_tokens += sum(map(message_tokens, assembled))
+    _assembly.history_tokens += sum(map(message_tokens, [*conversation.message_buffer, *pending]))
+    return assembled
+
+
+def recent_messages(conversation: Conversation, pending: list[AnyMessage], limit: int) -> list[AnyMessage]:
+    """The raw tail of the conversation, for transcripts rather than prompts."""
+    combo = [*conversation.message_buffer, *pending]
+    return combo[-min(limit, len(combo)):]
+
+
+# ------------------------------------------------------------------
+# Background summary updates
+# ------------------------------------------------------------------
+
+def _render(messages: list[AnyMessage]) -> str:
+    return "\n".join(f"{m.name or m.type}: {m.content}" for m in messages if m.content)
+
+
+def _cap(text: str, facts: list[str]) -> str:
+    """Keep the summary under ``CONTEXT_SUMMARY_TOKENS``, dropping the oldest facts first."""
+    facts = list(facts)
+    while facts and (len(text) + sum(len(f) + 3 for f in facts)) // CHARS_PER_TOKEN > CONTEXT_SUMMARY_TOKENS:
+        facts.pop(0)
+    return "\n".join([text, *(f"- {fact}" for fact in facts)])
+
+
+async def _fold(conversation: Conversation, rolling: RollingSummary, aged_out: list[AnyMessage]) -> None:
+    """🧾 Fold messages that aged out of the verbatim window into the summary."""
+    transcript = _render(aged_out)
+    if rolling.text:
+        transcript = f"{SUMMARY_HEADER}\n{rolling.text}\n\n[What happened next]\n{transcript}"
+    # The scene summarizer prompt already frames "distill this transcript";
+    # the StorySoFar schema asks for the rolling shape.
+    prompt = await prompts.ainvoke("dm-scene-summarizer", {
+        "player_name": conversation.player.name,
+        "active_npcs": ", ".join(c.name for c in conversation.characters) or "(none)",
+        "location": conversation.campaign.location,
+        "world_clock": conversation.campaign.world_clock or "(unspecified)",
+        "transcript": transcript,
+    })
+    structured = context_summarizer.with_structured_output(StorySoFar, strict=True, include_raw=True)
+    try:
+        result = await resilient_invoke(structured, prompt, policy="context_summarizer")
+    except Exception:
+        rolling.failures += 1
+        logger.exception(f"💥 Rolling summary update failed for conversation {conversation.id}")
+        return
+    rolling.summarizer_tokens += reported_tokens(result.get("raw")) or 0
+    parsed: StorySoFar | None = result.get("parsed")
+    if parsed is None:
+        rolling.failures += 1
+        logger.warning(f"⚠️ Rolling summary for conversation {conversation.id} did not parse, keeping the old one")
+        return
+
+    rolling.text = _cap(parsed.summary, parsed.key_facts)
+    rolling.covered.update(_key(m) for m in aged_out)
+    rolling.updates += 1
+    logger.info(
+        f"🧾 Conversation {conversation.id} summary now covers {len(rolling.covered)} message(s) "
+        f"in ~{len(rolling.text) // CHARS_PER_TOKEN} tokens"
+    )
+
+
+def refresh_summary(conversation: Conversation) -> None:
+    """Schedule a summary update once enough messages have aged out.
+
+    Called after a turn is persisted; returns immediately.
+    """
+    rolling = _summaries.setdefault(conversation.id, RollingSummary())
+    if rolling.updating is not None and not rolling.updating.done():
+        return
+    older = conversation.message_buffer[:-CONTEXT_VERBATIM_MESSAGES] if CONTEXT_VERBATIM_MESSAGES else []
+    aged_out = [m for m in older if _key(m) not in rolling.covered]
+    if len(aged_out) < CONTEXT_SUMMARY_BATCH:
+        return
+    rolling.updating = fire_and_forget(_fold(conversation, rolling, aged_out))
+
+
+def invalidate_summary(conversation_id: int) -> None:
+    """Forget a conversation's summary after its history was edited."""
+    if _summaries.pop(conversation_id, None) is not None:
+        logger.info(f"🧹 Dropped rolling summary of conversation {conversation_id}")
+
+
+def context_stats() -> dict[str, Any]:
+    """Prompt history size vs raw history size, and per-conversation summary state."""
+    return {
+        "assembly": _assembly.snapshot(),
+        "conversations": {
+            conversation_id: {
+                "covered_messages": len(rolling.covered),
+                "summary_tokens": len(rolling.text) // CHARS_PER_TOKEN,
+                "updates": rolling.updates,
+                "failures": rolling.failures,
+                "summarizer_tokens": rolling.summarizer_tokens,
+            }
+            for conversation_id, rolling in _summaries.items()
+        },
+    }
@@ -1,9 +1,11 @@
 """The DM supervisor package: a world-runtime, referee, and drama director.
 
 Public surface mirrors the old single-module ``agents.dungeon_master``:
-``spawn_dungeon_master``, ``NARRATOR_NAME``, and the directive/plan schemas.
+``get_dungeon_master`` (with ``dm_session_config`` for each run),
+``NARRATOR_NAME``, and the directive/plan schemas.
 """
-from agents.dungeon_master.graph import spawn_dungeon_master
+from agents.dungeon_master.context import dm_session_config
+from agents.dungeon_master.graph import get_dungeon_master
 from agents.dungeon_master.schemas import (
     NARRATOR_NAME,
     Adjudication,
@@ -22,5 +24,6 @@ __all__ = [
     "NARRATOR_NAME",
     "NPCDirective",
     "NPCIntroduction",
-    "spawn_dungeon_master",
+    "dm_session_config",
+    "get_dungeon_master",
 ]
@@ -5,11 +5,15 @@ from uuid import UUID, uuid4
 
 from langchain_core.messages import HumanMessage
 
+from agents.conversation_context import refresh_summary
 from agents.dungeon_master.context import DMContext
+from agents.dungeon_master.narration import discard_opening_draft
+from agents.dungeon_master.referee import discard_speculation
 from agents.dungeon_master.schemas import DungeonMasterState
 from database.graphiti_utils import fire_and_forget, save_secret_notes, save_world_events
 from tools.participants import apply_participant_state_update
 from tools.world_state import advance_faction_clock, apply_thread_update, set_location, set_world_clock
+from utils.turn_scope import mark_committed
 
 logger = getLogger(__name__)
 
@@ -100,6 +104,11 @@ def make_persist_messages(ctx: DMContext):
         ids = [m.id for m in ctx.conversation.message_buffer]
         if (dupes := len(ids) - len(set(ids))):
             logger.error(f"👯‍♀️ {dupes} duplicate message IDs detected")
+        mark_committed()
+        refresh_summary(ctx.conversation)
+        # Speculative work the turn never claimed is dead now.
+        discard_opening_draft(state)
+        discard_speculation(state)
 
         return {"messages": []}
 
@@ -0,0 +1,243 @@
+"""💾 Postgres checkpoints for DM turns, so a crash doesn't cost the whole turn.
+
+Every turn runs on its own checkpoint thread, ``dm-<conversation id>-<turn id>``,
+where the turn id is the player message id. LangGraph checkpoints the state
+after each super-step. If the server dies mid-turn, the conversation's latest
+thread is left with nodes still to run. When the player re-sends the same
+message, ``resumable_turn`` finds that thread and the turn resumes from the
+last completed node instead of paying for the whole pipeline again. A
+different message abandons it.
+
+Storage stays bounded: once a turn finishes, every other thread of the
+conversation is deleted, so only the latest turn's checkpoints remain.
+
+A turn still streaming looks just like an interrupted one in the checkpoints,
+and with several workers it may be streaming in another process. Running
+turns are therefore recorded in the ``dm_running_turns`` table, next to the
+checkpoints, with a heartbeat the owning worker refreshes every
+``DM_TURN_HEARTBEAT_S`` seconds. A turn whose heartbeat is fresh is never
+resumed or pruned; one whose worker died stops being fresh after three
+missed heartbeats.
+
+``DM_CHECKPOINTS=0`` compiles the DM graph without a checkpointer.
+``DM_CHECKPOINT_DSN`` overrides the database, which defaults to the app's own.
+"""
+import asyncio
+import os
+import re
+from dataclasses import dataclass
+from logging import getLogger
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from langgraph.graph.state import CompiledStateGraph
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from database.postgres_connection import ALCHEMY_CONNECTION_STRING
+
+logger = getLogger(__name__)
+
+DM_CHECKPOINTS = os.environ.get("DM_CHECKPOINTS", "1").lower() not in ("0", "false", "no")
+# SQLAlchemy URLs name the driver ("postgresql+psycopg2://"); libpq does not.
+DM_CHECKPOINT_DSN = os.environ.get("DM_CHECKPOINT_DSN") or re.sub(
+    r"^postgresql\+\w+://", "postgresql://", ALCHEMY_CONNECTION_STRING,
+)
+DM_CHECKPOINT_POOL_SIZE = int(os.environ.get("DM_CHECKPOINT_POOL_SIZE", "8"))
+DM_TURN_HEARTBEAT_S = float(os.environ.get("DM_TURN_HEARTBEAT_S", "10"))
+# A running turn whose heartbeat is older than this belonged to a dead worker.
+TURN_STALE_S = 3 * DM_TURN_HEARTBEAT_S
+
+_RUNNING_TURNS_TABLE = """
+CREATE TABLE IF NOT EXISTS dm_running_turns (
+    thread_id text PRIMARY KEY,
+    conversation_id bigint NOT NULL,
+    heartbeat_at timestamptz NOT NULL DEFAULT now()
+)
+"""
+
+_pool: AsyncConnectionPool | None = None
+_saver: AsyncPostgresSaver | None = None
+# Threads of turns streaming in this process, kept fresh by _heartbeat.
+_running: set[str] = set()
+_heartbeat: asyncio.Task[None] | None = None
+
+
+@dataclass
+class InterruptedTurn:
+    turn_id: str
+    content: str
+    pending: tuple[str, ...]
+
+
+async def open_checkpointer() -> AsyncPostgresSaver | None:
+    """Connect the checkpoint store and create its tables. Call before the DM
+    graph is first compiled; without a store the graph runs unchecked."""
+    global _pool, _saver
+    if not DM_CHECKPOINTS or _saver is not None:
+        return _saver
+    pool = AsyncConnectionPool(
+        DM_CHECKPOINT_DSN,
+        max_size=DM_CHECKPOINT_POOL_SIZE,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=False,
+    )
+    try:
+        await pool.open(wait=True)
+        saver = AsyncPostgresSaver(pool)
+        await saver.setup()
+        async with pool.connection() as conn:
+            await conn.execute(_RUNNING_TURNS_TABLE)
+    except Exception:
+        logger.exception("💥 Checkpoint store unavailable, DM turns will not be resumable")
+        await pool.close()
+        return None
+    _pool, _saver = pool, saver
+    logger.info("💾 DM turn checkpoints enabled")
+    return saver
+
+
+async def close_checkpointer() -> None:
+    global _pool, _saver
+    if _heartbeat is not None:
+        _heartbeat.cancel()
+    if _pool is not None:
+        await _pool.close()
+    _pool = _saver = None
+
+
+def dm_checkpointer() -> AsyncPostgresSaver | None:
+    return _saver
+
+
+def turn_thread_id(conversation_id: int, turn_id: str) -> str:
+    return f"dm-{conversation_id}-{turn_id}"
+
+
+def turn_checkpoint_config(
+    conversation_id: int, turn_id: str, config: RunnableConfig | None = None,
+) -> RunnableConfig:
+    """``config`` extended with the turn's checkpoint thread.
+
+    The conversation id goes into the run metadata, which LangGraph copies
+    onto every checkpoint, so a conversation's threads can be listed.
+    """
+    config = dict(config or {})
+    config["configurable"] = {
+        **config.get("configurable", {}),
+        "thread_id": turn_thread_id(conversation_id, turn_id),
+    }
+    config["metadata"] = {**config.get("metadata", {}), "conversation_id": conversation_id, "turn_id": turn_id}
+    return config
+
+
+async def mark_turn_running(conversation_id: int, turn_id: str) -> None:
+    """Record the turn as streaming here, so no worker resumes or prunes it."""
+    global _heartbeat
+    if _pool is None:
+        return
+    thread_id = turn_thread_id(conversation_id, turn_id)
+    _running.add(thread_id)
+    try:
+        async with _pool.connection() as conn:
+            await conn.execute(
+                "INSERT INTO dm_running_turns (thread_id, conversation_id) VALUES (%s, %s) "
+                "ON CONFLICT (thread_id) DO UPDATE SET heartbeat_at = now()",
+                (thread_id, conversation_id),
+            )
+    except Exception:
+        logger.exception(f"💥 Could not record running turn {thread_id}")
+    if _heartbeat is None or _heartbeat.done():
+        _heartbeat = asyncio.create_task(_beat())
+
+
+async def mark_turn_done(conversation_id: int, turn_id: str) -> None:
+    thread_id = turn_thread_id(conversation_id, turn_id)
+    _running.discard(thread_id)
+    if _pool is None:
+        return
+    try:
+        async with _pool.connection() as conn:
+            await conn.execute("DELETE FROM dm_running_turns WHERE thread_id = %s", (thread_id,))
+    except Exception:
+        logger.exception(f"💥 Could not clear running turn {thread_id}")
+
+
+async def _beat() -> None:
+    """Refresh this process's running turns until none are left."""
+    while True:
+        await asyncio.sleep(DM_TURN_HEARTBEAT_S)
+        if not _running or _pool is None:
+            return
+        try:
+            async with _pool.connection() as conn:
+                await conn.execute(
+                    "UPDATE dm_running_turns SET heartbeat_at = now() WHERE thread_id = ANY(%s)",
+                    (list(_running),),
+                )
+        except Exception:
+            logger.exception("💥 Running turn heartbeat failed")
+
+
+async def _live_threads(conversation_id: int) -> set[str]:
+    """Threads of the conversation whose turn is streaming on some worker."""
+    async with _pool.connection() as conn:
+        cursor = await conn.execute(
+            "SELECT thread_id FROM dm_running_turns "
+            "WHERE conversation_id = %s AND heartbeat_at > now() - make_interval(secs => %s)",
+            (conversation_id, TURN_STALE_S),
+        )
+        return {row["thread_id"] for row in await cursor.fetchall()}
+
+
+async def interrupted_turn(graph: CompiledStateGraph, conversation_id: int) -> InterruptedTurn | None:
+    """The conversation's latest turn, if it stopped with nodes still to run."""
+    if _saver is None:
+        return None
+    async for latest in _saver.alist(None, filter={"conversation_id": conversation_id}, limit=1):
+        thread_id = latest.config["configurable"]["thread_id"]
+        if thread_id in await _live_threads(conversation_id):
+            return None
+        snapshot = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+        if not snapshot.next:
+            return None
+        messages = snapshot.values.get("messages") or []
+        content = messages[0].content if messages else ""
+        return InterruptedTurn(latest.metadata.get("turn_id", ""), content, tuple(snapshot.next))
+    return None
+
+
+async def resumable_turn(graph: CompiledStateGraph, conversation_id: int, content: str) -> InterruptedTurn | None:
+    """The interrupted turn to resume, when the player re-sent its message."""
+    turn = await interrupted_turn(graph, conversation_id)
+    if turn is None or not turn.turn_id:
+        return None
+    if turn.content.strip() != content.strip():
+        logger.info(f"💾 Abandoning interrupted turn {turn.turn_id} of conversation {conversation_id}: new message")
+        return None
+    logger.info(f"♻️ Resuming turn {turn.turn_id} of conversation {conversation_id} at {', '.join(turn.pending)}")
+    return turn
+
+
+async def prune_turns(conversation_id: int, keep_turn_id: str) -> int:
+    """Delete every checkpoint thread of the conversation except ``keep_turn_id``'s
+    and those of turns still streaming on any worker."""
+    if _saver is None:
+        return 0
+    keep = turn_thread_id(conversation_id, keep_turn_id)
+    async with _pool.connection() as conn:
+        # Rows left behind by workers that died mid-turn.
+        await conn.execute(
+            "DELETE FROM dm_running_turns "
+            "WHERE conversation_id = %s AND heartbeat_at <= now() - make_interval(secs => %s)",
+            (conversation_id, TURN_STALE_S),
+        )
+    stale = {
+        checkpoint.config["configurable"]["thread_id"]
+        async for checkpoint in _saver.alist(None, filter={"conversation_id": conversation_id})
+    } - {keep} - await _live_threads(conversation_id)
+    for thread_id in stale:
+        await _saver.adelete_thread(thread_id)
+    if stale:
+        logger.debug(f"💾 Pruned {len(stale)} checkpoint threads of conversation {conversation_id}")
+    return len(stale)
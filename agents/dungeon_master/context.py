@@ -5,7 +5,9 @@ from logging import getLogger
 
 import socketio
 from langchain_core.messages import AnyMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig, ensure_config
 
+from agents.conversation_context import assemble_context, recent_messages
 from agents.dungeon_master.schemas import DungeonMasterState
 from database.graphiti_utils import (
     load_information,
@@ -28,13 +30,68 @@ info_limits = settings.graphiti.information_limits
 logger = getLogger(__name__)
 
 
+# Where dm_session_config puts the DMSession in ``config["configurable"]``.
+DM_SESSION_KEY = "dm_session"
+
+
 @dataclass
-class DMContext:
-    """Everything a DM node needs about the session it is running in."""
+class DMSession:
+    """The session one DM graph run serves."""
     conversation: Conversation
     sio: socketio.AsyncServer | None = None
     sid: str | None = None
 
+
+def dm_session_config(
+    conversation: Conversation,
+    sio: socketio.AsyncServer | None = None,
+    sid: str | None = None,
+    config: RunnableConfig | None = None,
+) -> RunnableConfig:
+    """``config`` extended with the session the shared DM graph should run for."""
+    config = dict(config or {})
+    config["configurable"] = {
+        **config.get("configurable", {}),
+        DM_SESSION_KEY: DMSession(conversation, sio, sid),
+    }
+    return config
+
+
+class DMContext:
+    """Everything a DM node needs about the session it is running in.
+
+    The compiled DM graph is shared by every session, so nothing is bound at
+    build time: each access resolves the current run's ``DMSession`` from the
+    runnable config. The roster and campaign are therefore read per turn.
+
+    That config only exists inside the run. Work that outlives a node --
+    ``fire_and_forget`` jobs and the epilogue lanes run in a blank context --
+    must be handed plain values snapshotted while the node runs, never
+    ``ctx`` itself.
+    """
+
+    @property
+    def session(self) -> DMSession:
+        session = ensure_config().get("configurable", {}).get(DM_SESSION_KEY)
+        if session is None:
+            raise RuntimeError(
+                "No DM session in this context: pass dm_session_config(...) as the graph config, "
+                "and snapshot values before handing work to a background task"
+            )
+        return session
+
+    @property
+    def conversation(self) -> Conversation:
+        return self.session.conversation
+
+    @property
+    def sio(self) -> socketio.AsyncServer | None:
+        return self.session.sio
+
+    @property
+    def sid(self) -> str | None:
+        return self.session.sid
+
     @property
     def campaign(self):
         return self.conversation.campaign
@@ -64,17 +121,29 @@ class DMContext:
     def npc_descriptions(self) -> str:
         return "\n\n".join(f"**{c.name}**:\n{c.description}" for c in self.conversation.characters)
 
-    def combined_messages(self, state: DungeonMasterState, limit: int | None = None) -> list[AnyMessage]:
-        combo = [*self.conversation.message_buffer, *state.messages]
-        if limit is not None:
-            combo = combo[-min(limit, len(combo)):]
-        return combo
+    def prompt_messages(
+        self, state: DungeonMasterState, budget_tokens: int, limit: int | None = None, summary: bool = True,
+    ) -> list[AnyMessage]:
+        """Conversation history for a prompt; see ``agents.conversation_context``."""
+        return assemble_context(
+            self.conversation, state.messages, budget_tokens=budget_tokens, limit=limit, summary=summary,
+        )
+
+    def combined_messages(self, state: DungeonMasterState, limit: int) -> list[AnyMessage]:
+        """The raw last ``limit`` messages, for transcripts."""
+        return recent_messages(self.conversation, state.messages, limit)
 
     @staticmethod
     def last_human_query(state: DungeonMasterState, fallback: str = "general scene") -> str:
         last_human = next((m for m in reversed(state.messages) if isinstance(m, HumanMessage)), None)
         return last_human.content if last_human else fallback
 
+    @staticmethod
+    def turn_key(state: DungeonMasterState) -> str | None:
+        """The id of the player message that started this turn."""
+        last_human = next((m for m in reversed(state.messages) if isinstance(m, HumanMessage)), None)
+        return last_human.id if last_human else None
+
 
 def make_state_loader(ctx: DMContext):
     async def state_loader(state: DungeonMasterState) -> dict:
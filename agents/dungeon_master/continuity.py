@@ -1,10 +1,26 @@
-"""Continuity checker: validate the DM plan before anything streams to the player."""
+"""Continuity checker: validate the DM plan before anything streams to the player.
+
+Verdicts and their latency are recorded on every turn, so the approval rate
+shows whether optimistic narration (``DM_OPTIMISTIC_CONTINUITY``, see
+``narration``) would pay off: each approved turn with a draft saves the
+verdict latency from time-to-first-narration-token, each rejection wastes one
+cancelled narration call.
+"""
+import time
+from dataclasses import dataclass
 from logging import getLogger
 
+from agents.conversation_context import CONTEXT_RECENT_TOKENS
 from agents.dungeon_master.context import DMContext
+from agents.dungeon_master.narration import (
+    DM_OPTIMISTIC_CONTINUITY,
+    discard_opening_draft,
+    start_opening_draft,
+)
 from agents.dungeon_master.schemas import ContinuityVerdict, DungeonMasterState
 from utils.llm_models import dm_continuity_model
-from utils.prompts import dm_continuity_prompt_template
+from utils.llm_resilience import resilient_invoke
+from utils.prompts import prompts
 
 logger = getLogger(__name__)
 
@@ -13,6 +29,48 @@ MAX_PLAN_ATTEMPTS = 2
 CONTINUITY_CONTEXT_WINDOW = 12
 
 
+@dataclass
+class ContinuityStats:
+    verdicts: int = 0
+    approved: int = 0
+    verdict_s_total: float = 0.0
+    drafts: int = 0
+    drafts_flushed: int = 0
+    drafts_cancelled: int = 0
+    head_start_s_total: float = 0.0
+
+    def record(self, approved: bool, verdict_s: float, drafted: bool, draft_kept: bool) -> None:
+        self.verdicts += 1
+        self.approved += approved
+        self.verdict_s_total += verdict_s
+        if drafted:
+            self.drafts += 1
+            if draft_kept:
+                self.drafts_flushed += 1
+                self.head_start_s_total += verdict_s
+            else:
+                self.drafts_cancelled += 1
+
+    def as_dict(self) -> dict[str, float | int | bool]:
+        return {
+            "optimistic": DM_OPTIMISTIC_CONTINUITY,
+            "verdicts": self.verdicts,
+            "approval_rate": round(self.approved / self.verdicts, 3) if self.verdicts else 0.0,
+            "mean_verdict_s": round(self.verdict_s_total / self.verdicts, 3) if self.verdicts else 0.0,
+            "drafts": self.drafts,
+            "drafts_flushed": self.drafts_flushed,
+            "drafts_cancelled": self.drafts_cancelled,
+            "latency_saved_s_total": round(self.head_start_s_total, 3),
+        }
+
+
+_stats = ContinuityStats()
+
+
+def continuity_stats() -> dict[str, float | int | bool]:
+    return _stats.as_dict()
+
+
 def make_continuity_checker(ctx: DMContext):
     verdict_llm = dm_continuity_model.with_structured_output(ContinuityVerdict, strict=True)
 
@@ -20,7 +78,8 @@ def make_continuity_checker(ctx: DMContext):
         """🛡️ Catch contradictions, secret leaks, agency violations, and ignored dice.
 
         Rejection loops back to the planner exactly once; a turn is never
-        hard-failed on continuity grounds.
+        hard-failed on continuity grounds. In optimistic mode the opening
+        narration is drafted concurrently and dropped on rejection.
         """
         if state.plan is None:
             return {"messages": [], "continuity_notes": ""}
@@ -28,7 +87,7 @@ def make_continuity_checker(ctx: DMContext):
             logger.warning("🛡️ Plan still has continuity issues after repair, proceeding anyway")
             return {"messages": [], "continuity_notes": ""}
 
-        prompt = await dm_continuity_prompt_template.ainvoke({
+        prompt = await prompts.ainvoke("dm-continuity-checker", {
             "player_name": ctx.player.name,
             "location": ctx.location,
             "world_clock": ctx.world_clock,
@@ -38,18 +97,32 @@ def make_continuity_checker(ctx: DMContext):
             "secret_knowledge": state.secret_knowledge,
             "adjudication": state.adjudication.render() if state.adjudication else "(none this turn)",
             "plan_json": state.plan.model_dump_json(indent=2),
-            "messages": ctx.combined_messages(state, limit=CONTINUITY_CONTEXT_WINDOW),
+            "messages": ctx.prompt_messages(
+                state, CONTEXT_RECENT_TOKENS, limit=CONTINUITY_CONTEXT_WINDOW, summary=False,
+            ),
         })
+        draft = start_opening_draft(ctx, state) if DM_OPTIMISTIC_CONTINUITY else None
+        started = time.monotonic()
         try:
-            verdict: ContinuityVerdict = await verdict_llm.ainvoke(prompt)
+            verdict: ContinuityVerdict = await resilient_invoke(verdict_llm, prompt, policy="dm_continuity")
         except Exception:
             logger.exception("💥 Continuity checker failed, proceeding with unvalidated plan")
             return {"messages": [], "continuity_notes": ""}
+        verdict_s = time.monotonic() - started
 
-        if verdict.approved or not verdict.issues:
-            logger.info("🛡️ Plan approved by continuity checker")
+        approved = verdict.approved or not verdict.issues
+        # A rejected final attempt still proceeds, so its draft stays valid.
+        repairing = not approved and state.plan_attempts < MAX_PLAN_ATTEMPTS
+        _stats.record(approved, verdict_s, drafted=draft is not None, draft_kept=not repairing)
+        if approved:
+            logger.info(
+                f"🛡️ Plan approved by continuity checker in {verdict_s:.2f}s "
+                f"(approval rate {_stats.as_dict()['approval_rate']:.0%})"
+            )
             return {"messages": [], "continuity_notes": ""}
 
+        if draft is not None and repairing:
+            discard_opening_draft(state)
         notes = "\n".join(f"- {issue}" for issue in verdict.issues)
         logger.warning(f"🛡️ Plan rejected by continuity checker:\n{notes}")
         return {"messages": [], "continuity_notes": notes}
@@ -1,17 +1,38 @@
-"""Turn epilogue: fire-and-forget scene memory and offscreen faction simulation.
+"""Turn epilogue: background scene memory and offscreen faction simulation.
 
-Nothing here blocks the player's turn -- the node snapshots what it needs,
-schedules background work, and returns immediately.
+Nothing here blocks the player's turn -- the node snapshots what it needs
+and returns immediately. The snapshot is handed to the campaign's epilogue
+lane once ``persist_messages`` has committed the turn (``after_commit``), so
+a turn that is preempted before then never queues any work.
+
+Each campaign has one lane with a single consumer, so its scene summaries
+and faction simulations never run concurrently (no two simulations reading
+the same clocks, no overlapping world-event writes through the shared
+session). A lane runs once no new work has arrived for
+``EPILOGUE_DEBOUNCE_S``; work submitted while it is busy or waiting is
+merged into one pending job:
+
+- the newest transcript supersedes older ones, so a stale scene summary is
+  dropped rather than run;
+- consecutive faction simulations merge into one call that sees every
+  pending turn summary.
 """
+import asyncio
+import contextvars
+import os
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field, replace
+from functools import partial
 from logging import getLogger
+from typing import Any
 
 from langchain_core.messages import AnyMessage
 from pydantic import BaseModel, Field
 
 from agents.dungeon_master.context import DMContext
-from agents.dungeon_master.schemas import DMPlan, DungeonMasterState, FactionSimulation, SceneSummary
+from agents.dungeon_master.schemas import DungeonMasterState, FactionSimulation, SceneSummary
 from database.graphiti_utils import (
-    fire_and_forget,
     save_player_preferences,
     save_secret_notes,
     save_world_events,
@@ -25,11 +46,10 @@ from tools.world_state import (
     render_threads,
 )
 from utils.llm_models import dm_faction_model, dm_summarizer_model, scene_change
-from utils.prompts import (
-    dm_faction_prompt_template,
-    dm_scene_summarizer_prompt_template,
-    scene_change_prompt_template,
-)
+from utils.llm_resilience import resilient_invoke
+from utils.metrics import timed_job
+from utils.prompts import prompts
+from utils.turn_scope import after_commit
 
 logger = getLogger(__name__)
 
@@ -39,6 +59,9 @@ MIN_TURNS_BEFORE_CHECK = 4
 MAX_TURNS_BETWEEN_SUMMARIES = 10
 # How many recent messages feed the summarizer and scene-change check.
 SCENE_WINDOW = 30
+# Quiet period before a lane runs, so a burst of quick turns becomes one job;
+# every new submission restarts it.
+EPILOGUE_DEBOUNCE_S = float(os.environ.get("EPILOGUE_DEBOUNCE_S", "3"))
 
 
 class SceneChanged(BaseModel):
@@ -53,131 +76,219 @@ def _render_transcript(messages: list[AnyMessage]) -> str:
     return "\n".join(lines[-SCENE_WINDOW:])
 
 
+@dataclass
+class EpilogueJob:
+    """One campaign's pending epilogue work, snapshotted when the turn ended."""
+    campaign_id: int
+    lore_world: str
+    player_name: str
+    active_npcs: str
+    location: str
+    world_clock: str
+    scene_ended: bool
+    recent: list[AnyMessage]
+    transcript: str
+    world_events: str
+    secrets: str
+    lore: str
+    # Summaries of the pending turns that call for a faction simulation.
+    faction_turns: list[str] = field(default_factory=list)
+
+    def merged_into(self, newer: "EpilogueJob") -> "EpilogueJob":
+        """``newer`` carrying this job's still-relevant work.
+
+        The newer snapshot wins for the scene summary; faction turns add up.
+        """
+        return replace(
+            newer,
+            scene_ended=newer.scene_ended or self.scene_ended,
+            faction_turns=[*self.faction_turns, *newer.faction_turns],
+        )
+
+
+@dataclass
+class CampaignLane:
+    pending: EpilogueJob | None = None
+    worker: asyncio.Task | None = None
+    turns_since_summary: int = 0
+    submitted_at: float = 0.0
+
+
+@dataclass
+class LaneStats:
+    submitted: int = 0
+    runs: int = 0
+    superseded_snapshots: int = 0
+    faction_sims_merged: int = 0
+    scene_summaries: int = 0
+    faction_sims: int = 0
+
+
+_lanes: dict[int, CampaignLane] = {}
+_stats = LaneStats()
+
+
+def epilogue_lane_stats() -> dict[str, Any]:
+    """How much epilogue work the lanes merged or dropped instead of running."""
+    return {
+        "submitted": _stats.submitted,
+        "runs": _stats.runs,
+        "superseded_snapshots": _stats.superseded_snapshots,
+        "faction_sims_merged": _stats.faction_sims_merged,
+        "scene_summaries": _stats.scene_summaries,
+        "faction_sims": _stats.faction_sims,
+        "busy_lanes": sum(1 for lane in _lanes.values() if lane.worker is not None and not lane.worker.done()),
+    }
+
+
+def _submit(job: EpilogueJob, run: Callable[[EpilogueJob, CampaignLane], Awaitable[None]]) -> None:
+    """Queue ``job`` on its campaign's lane, merging with work still pending."""
+    lane = _lanes.setdefault(job.campaign_id, CampaignLane())
+    lane.turns_since_summary += 1
+    lane.submitted_at = time.monotonic()
+    _stats.submitted += 1
+    if lane.pending is not None:
+        _stats.superseded_snapshots += 1
+        if lane.pending.faction_turns and job.faction_turns:
+            _stats.faction_sims_merged += 1
+        job = lane.pending.merged_into(job)
+        logger.info(f"🌙 Campaign {job.campaign_id} epilogue merged into pending work")
+    lane.pending = job
+    if lane.worker is None or lane.worker.done():
+        # The lane outlives the turn that started it, so it is not a turn child.
+        lane.worker = asyncio.create_task(timed_job(_drain(lane, run)), context=contextvars.Context())
+
+
+async def _drain(lane: CampaignLane, run: Callable[[EpilogueJob, CampaignLane], Awaitable[None]]) -> None:
+    while lane.pending is not None:
+        # Debounce: wait until the lane has been quiet for EPILOGUE_DEBOUNCE_S.
+        while (quiet := time.monotonic() - lane.submitted_at) < EPILOGUE_DEBOUNCE_S:
+            await asyncio.sleep(EPILOGUE_DEBOUNCE_S - quiet)
+        job, lane.pending = lane.pending, None
+        _stats.runs += 1
+        try:
+            await run(job, lane)
+        except Exception:
+            logger.exception(f"💥 Epilogue for campaign {job.campaign_id} failed")
+
+
 def make_turn_epilogue(ctx: DMContext):
     scene_change_llm = scene_change.with_structured_output(SceneChanged, strict=True)
     summarizer_llm = dm_summarizer_model.with_structured_output(SceneSummary, strict=True)
     faction_llm = dm_faction_model.with_structured_output(FactionSimulation, strict=True)
 
     async def _detect_scene_change(recent: list[AnyMessage]) -> bool:
-        prompt = await scene_change_prompt_template.ainvoke({"messages": recent[-SCENE_WINDOW:]})
-        verdict: SceneChanged = await scene_change_llm.ainvoke(prompt)
+        prompt = await prompts.ainvoke("did-scene-change", {"messages": recent[-SCENE_WINDOW:]})
+        verdict: SceneChanged = await resilient_invoke(scene_change_llm, prompt, policy="scene_change")
         return verdict.changed
 
-    async def _run_scene_summary(transcript: str) -> None:
+    async def _run_scene_summary(job: EpilogueJob) -> None:
         """🧾 Distill the scene into world events and player preferences."""
-        prompt = await dm_scene_summarizer_prompt_template.ainvoke({
-            "player_name": ctx.player.name,
-            "active_npcs": ctx.npc_names,
-            "location": ctx.location,
-            "world_clock": ctx.world_clock,
-            "transcript": transcript,
+        prompt = await prompts.ainvoke("dm-scene-summarizer", {
+            "player_name": job.player_name,
+            "active_npcs": job.active_npcs,
+            "location": job.location,
+            "world_clock": job.world_clock,
+            "transcript": job.transcript,
         })
-        summary: SceneSummary = await summarizer_llm.ainvoke(prompt)
+        summary: SceneSummary = await resilient_invoke(summarizer_llm, prompt, policy="dm_summarizer")
 
         events = [f"Scene summary: {summary.scene_summary}"]
         events.extend(summary.canon_updates)
         events.extend(summary.npc_updates)
         events.extend(f"Unresolved hook: {hook}" for hook in summary.unresolved_hooks)
-        await save_world_events(
-            events=events, campaign_id=ctx.campaign.id, lore_world=ctx.campaign.lore_world,
-        )
+        await save_world_events(events=events, campaign_id=job.campaign_id, lore_world=job.lore_world)
         if summary.player_preferences:
             await save_player_preferences(
                 notes=summary.player_preferences,
-                campaign_id=ctx.campaign.id,
-                lore_world=ctx.campaign.lore_world,
+                campaign_id=job.campaign_id,
+                lore_world=job.lore_world,
             )
         logger.info(
             f"🧾 Scene summarized: {len(summary.canon_updates)} canon update(s), "
             f"{len(summary.unresolved_hooks)} hook(s)"
         )
 
-    async def _run_faction_simulation(turn_summary: str, world_events: str, secrets: str, lore: str) -> None:
-        """🌒 Advance offscreen faction agendas in response to the turn."""
-        clocks = list_faction_clocks(ctx.campaign.id)
-        threads = list_open_threads(ctx.campaign.id)
-        prompt = await dm_faction_prompt_template.ainvoke({
+    async def _run_faction_simulation(job: EpilogueJob, turn_summaries: list[str]) -> None:
+        """🌒 Advance offscreen faction agendas in response to the pending turns."""
+        if len(turn_summaries) == 1:
+            turn_summary = turn_summaries[0]
+        else:
+            turn_summary = "\n\n".join(f"Turn {i}:\n{s}" for i, s in enumerate(turn_summaries, 1))
+        clocks = list_faction_clocks(job.campaign_id)
+        threads = list_open_threads(job.campaign_id)
+        prompt = await prompts.ainvoke("dm-faction-simulator", {
             "faction_clocks": render_clocks(clocks),
             "open_threads": render_threads(threads),
-            "world_events": world_events,
-            "secret_knowledge": secrets,
-            "lore": lore,
-            "location": ctx.location,
-            "world_clock": ctx.world_clock,
+            "world_events": job.world_events,
+            "secret_knowledge": job.secrets,
+            "lore": job.lore,
+            "location": job.location,
+            "world_clock": job.world_clock,
             "turn_summary": turn_summary,
         })
-        sim: FactionSimulation = await faction_llm.ainvoke(prompt)
+        sim: FactionSimulation = await resilient_invoke(faction_llm, prompt, policy="dm_faction")
 
         for advance in sim.clock_advances:
             advance_faction_clock(
-                ctx.campaign.id, advance.faction, advance.ticks,
+                job.campaign_id, advance.faction, advance.ticks,
                 reason=advance.reason, next_move=advance.next_move,
             )
         for new_clock in sim.new_clocks:
             create_faction_clock(
-                ctx.campaign.id, new_clock.faction_name, new_clock.goal,
+                job.campaign_id, new_clock.faction_name, new_clock.goal,
                 ticks_max=new_clock.ticks_max, next_move=new_clock.next_move,
             )
         if sim.world_events:
             await save_world_events(
-                events=sim.world_events, campaign_id=ctx.campaign.id,
-                lore_world=ctx.campaign.lore_world,
+                events=sim.world_events, campaign_id=job.campaign_id, lore_world=job.lore_world,
             )
         if sim.secret_notes:
             await save_secret_notes(
-                notes=sim.secret_notes, campaign_id=ctx.campaign.id,
-                lore_world=ctx.campaign.lore_world,
+                notes=sim.secret_notes, campaign_id=job.campaign_id, lore_world=job.lore_world,
             )
         logger.info(
-            f"🌒 Faction simulation: {len(sim.clock_advances)} tick(s), "
+            f"🌒 Faction simulation over {len(turn_summaries)} turn(s): {len(sim.clock_advances)} tick(s), "
             f"{len(sim.new_clocks)} new clock(s), {len(sim.world_events)} event(s)"
         )
 
-    async def _run_epilogue(
-        plan: DMPlan,
-        recent: list[AnyMessage],
-        transcript: str,
-        turn_summary: str,
-        world_events: str,
-        secrets: str,
-        lore: str,
-        turns_since_summary: int,
-    ) -> None:
-        scene_ended = bool(plan.time_location_update or plan.world_clock_update)
+    async def _run_epilogue(job: EpilogueJob, lane: CampaignLane) -> None:
+        scene_ended = job.scene_ended
+        turns_since_summary = lane.turns_since_summary
         if not scene_ended and turns_since_summary >= MAX_TURNS_BETWEEN_SUMMARIES:
             scene_ended = True
             logger.info(f"🧾 {turns_since_summary} turns since last summary, forcing one")
         elif not scene_ended and turns_since_summary >= MIN_TURNS_BEFORE_CHECK:
             try:
-                scene_ended = await _detect_scene_change(recent)
+                scene_ended = await _detect_scene_change(job.recent)
             except Exception:
                 logger.exception("💥 Scene-change detection failed, skipping summary this turn")
 
         if scene_ended:
             try:
-                await _run_scene_summary(transcript)
-                ctx.conversation._turns_since_summary = 0
+                await _run_scene_summary(job)
+                _stats.scene_summaries += 1
+                lane.turns_since_summary = 0
             except Exception:
                 logger.exception("💥 Scene summarizer failed")
 
-        if plan.offscreen_simulation or plan.clock_advances:
+        turn_summaries = job.faction_turns
+        if turn_summaries:
             try:
-                await _run_faction_simulation(turn_summary, world_events, secrets, lore)
+                await _run_faction_simulation(job, turn_summaries)
+                _stats.faction_sims += 1
             except Exception:
                 logger.exception("💥 Faction simulation failed")
 
     async def turn_epilogue(state: DungeonMasterState) -> dict:
-        """🌙 Schedule post-turn world upkeep without delaying the response."""
+        """🌙 Queue post-turn world upkeep without delaying the response."""
         plan = state.plan
         if plan is None:
             return {"messages": []}
 
-        turns_since_summary = getattr(ctx.conversation, "_turns_since_summary", 0) + 1
-        ctx.conversation._turns_since_summary = turns_since_summary
-
-        # Snapshot everything now -- persist_messages mutates the buffer next.
+        # Snapshot everything now -- persist_messages mutates the buffer next,
+        # and the lane runs outside this run's config.
         recent = ctx.combined_messages(state, limit=SCENE_WINDOW)
-        transcript = _render_transcript(recent)
 
         summary_bits = [f"Player intent: {state.intent.summary}" if state.intent else ""]
         if state.adjudication and state.adjudication.outcome:
@@ -187,16 +298,28 @@ def make_turn_epilogue(ctx: DMContext):
         summary_bits.extend(f"Event: {e}" for e in plan.new_world_events)
         turn_summary = "\n".join(filter(None, summary_bits)) or "(an ordinary exchange)"
 
-        fire_and_forget(_run_epilogue(
-            plan=plan,
+        faction_turns = []
+        if plan.offscreen_simulation or plan.clock_advances:
+            faction_turns.append(turn_summary)
+
+        job = EpilogueJob(
+            campaign_id=ctx.campaign.id,
+            lore_world=ctx.campaign.lore_world,
+            player_name=ctx.player.name,
+            active_npcs=ctx.npc_names,
+            location=ctx.location,
+            world_clock=ctx.world_clock,
+            scene_ended=bool(plan.time_location_update or plan.world_clock_update),
             recent=recent,
-            transcript=transcript,
-            turn_summary=turn_summary,
+            transcript=_render_transcript(recent),
             world_events=state.world_events,
             secrets=state.secret_knowledge,
             lore=state.lore,
-            turns_since_summary=turns_since_summary,
-        ))
+            faction_turns=faction_turns,
+        )
+        # Queued only once persist_messages commits the turn; a preempted
+        # turn leaves no upkeep behind.
+        after_commit(partial(_submit, job, _run_epilogue))
         return {"messages": []}
 
     return turn_epilogue
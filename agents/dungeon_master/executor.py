@@ -1,13 +1,24 @@
-"""Run the DM-selected NPC agents in order, streaming their turns to the client."""
+"""Run the DM-selected NPC agents, streaming their turns to the client.
+
+Context retrieval, emotion updates and private planning are independent per
+NPC, so all responding NPCs are prepared concurrently. Only narration runs in
+the DM's order, each NPC seeing the lines spoken before it this turn.
+"""
+import asyncio
+import time
 from logging import getLogger
 from uuid import uuid4
 
 import socketio
 from langchain_core.messages import AIMessageChunk, AnyMessage
+from langchain_core.runnables import RunnableConfig
 
 from agents.dungeon_master.context import DMContext
 from agents.dungeon_master.schemas import DungeonMasterState
-from agents.nonplayer import spawn_npc_directed
+from agents.nonplayer import PREPARED_FIELDS, get_npc_graph, npc_turn_config
+from utils.stream_coalescing import TokenCoalescer
+from utils.turn_scope import note_bubble, note_token
+from utils.turn_timing import mark_first_token
 
 logger = getLogger(__name__)
 
@@ -16,65 +27,79 @@ NODE_NARRATOR = "npc_narrator"
 
 async def _stream_npc_to_socket(
     npc_graph: object,
-    input_messages: list[AnyMessage],
+    npc_input: dict,
+    config: RunnableConfig,
     speaker: str,
     sio: socketio.AsyncServer,
     sid: str,
 ) -> list[AnyMessage]:
     """Stream an NPC graph and emit tokens directly to a Socket.IO client.
 
-    Tokens are forwarded live for responsiveness, but the *authoritative* message is
-    the cleaned one the npc_narrator node returns (prefix-stripping, foreign-turn
-    truncation, retries) -- raw chunks may contain several retry attempts concatenated.
+    Tokens are forwarded live (coalesced into a few frames) for responsiveness,
+    but the *authoritative* message is the cleaned one the npc_narrator node
+    returns (prefix-stripping, foreign-turn truncation, retries) -- raw chunks
+    may contain several retry attempts concatenated.
     ``stream_end`` carries the cleaned content so the frontend can snap the live
     bubble to it (or drop the bubble when narration failed entirely).
 
     Returns the cleaned delta messages, carrying the streamed bubble id.
     """
     message_id: str | None = None
+    coalescer: TokenCoalescer | None = None
     prefix_buffer = ""
     prefix_stripped = False
     final_messages: list[AnyMessage] = []
     expected = f"{speaker}: "
 
     async def ensure_started() -> None:
-        nonlocal message_id
+        nonlocal message_id, coalescer
         if message_id is None:
             message_id = str(uuid4())
+            note_bubble(message_id)
             await sio.emit("stream_start", {"messageId": message_id, "name": speaker}, to=sid)
+            coalescer = TokenCoalescer(sio, "stream_token", {"messageId": message_id}, to=sid, stream="npc")
 
-    stream = npc_graph.astream(
-        {"messages": input_messages}, stream_mode=["messages", "updates"], subgraphs=True,
-    )
-
-    async for _namespace, mode, payload in stream:
-        if mode == "updates":
-            for node_name, update in payload.items():
-                if node_name == NODE_NARRATOR and update:
-                    final_messages = list(update.get("messages") or [])
-            continue
-
-        msg, metadata = payload
-        if (
-            not isinstance(msg, AIMessageChunk)
-            or metadata.get("langgraph_node", "") != NODE_NARRATOR
-            or not msg.content
-        ):
-            continue
-
-        await ensure_started()
-        if prefix_stripped:
-            await sio.emit("stream_token", {"messageId": message_id, "token": msg.content}, to=sid)
-            continue
-
-        # Buffer until the leading "{speaker}: " prefix is either stripped or ruled out.
-        prefix_buffer += msg.content
-        if len(prefix_buffer) >= len(expected) or not expected.startswith(prefix_buffer):
-            prefix_stripped = True
-            flush = prefix_buffer[len(expected):] if prefix_buffer.startswith(expected) else prefix_buffer
-            if flush:
-                await sio.emit("stream_token", {"messageId": message_id, "token": flush}, to=sid)
+    stream = npc_graph.astream(npc_input, config, stream_mode=["messages", "updates"], subgraphs=True)
 
+    try:
+        async for _namespace, mode, payload in stream:
+            if mode == "updates":
+                for node_name, update in payload.items():
+                    if node_name == NODE_NARRATOR and update:
+                        final_messages = list(update.get("messages") or [])
+                continue
+
+            msg, metadata = payload
+            if (
+                not isinstance(msg, AIMessageChunk)
+                or metadata.get("langgraph_node", "") != NODE_NARRATOR
+                or not msg.content
+            ):
+                continue
+
+            await ensure_started()
+            if prefix_stripped:
+                mark_first_token()
+                note_token()
+                await coalescer.push(msg.content)
+                continue
+
+            # Buffer until the leading "{speaker}: " prefix is either stripped or ruled out.
+            prefix_buffer += msg.content
+            if len(prefix_buffer) >= len(expected) or not expected.startswith(prefix_buffer):
+                prefix_stripped = True
+                flush = prefix_buffer[len(expected):] if prefix_buffer.startswith(expected) else prefix_buffer
+                if flush:
+                    mark_first_token()
+                    note_token()
+                    await coalescer.push(flush)
+    except BaseException:
+        if coalescer is not None:
+            coalescer.discard()
+        raise
+
+    if coalescer is not None:
+        await coalescer.close()
     if not final_messages:
         if message_id is not None:
             # Narration failed after retries: retract the live bubble.
@@ -94,29 +119,49 @@ async def _stream_npc_to_socket(
     return final_messages
 
 
+async def _prepare_npc(npc_graph: object, config: RunnableConfig, name: str, messages: list[AnyMessage]) -> dict:
+    """Run an NPC's context, emotion and planning stage; returns the prepared fields."""
+    try:
+        result = await npc_graph.ainvoke({"messages": messages, "prepare_only": True}, config)
+    except Exception:
+        logger.exception(f"💥 Preparing '{name}' failed, it will prepare during its turn")
+        return {}
+    return {field: result[field] for field in PREPARED_FIELDS if field in result}
+
+
 def make_npc_executor(ctx: DMContext):
     async def npc_executor(state: DungeonMasterState) -> dict:
-        """Dynamically build and run each selected NPC in the DM's order."""
+        """Prepare every selected NPC concurrently, then narrate them in the DM's order."""
         plan = state.plan
         if not plan or not plan.responding_npcs:
             return {"messages": []}
 
-        all_messages: list[AnyMessage] = []
+        npc_graph = get_npc_graph()
+        npcs = []
         for directive in plan.responding_npcs:
             character = next((c for c in ctx.conversation.characters if c.name == directive.name), None)
             if character is None:
                 logger.warning(f"⚠️ NPC '{directive.name}' not found in conversation characters")
                 continue
+            npcs.append((directive, character, npc_turn_config(character, ctx.conversation, directive)))
 
-            npc_graph = spawn_npc_directed(character, ctx.conversation, directive)
+        started = time.monotonic()
+        prepared = await asyncio.gather(
+            *(_prepare_npc(npc_graph, config, character.name, state.messages) for _, character, config in npcs)
+        )
+        logger.info(f"🎭 Prepared {len(npcs)} NPC(s) concurrently in {time.monotonic() - started:.2f}s")
+
+        all_messages: list[AnyMessage] = []
+        for (directive, character, config), fields in zip(npcs, prepared):
             input_messages = [*state.messages, *all_messages]
+            npc_input = {"messages": input_messages, **fields}
             try:
                 if ctx.sio is not None and ctx.sid is not None:
                     delta = await _stream_npc_to_socket(
-                        npc_graph, input_messages, character.name, ctx.sio, ctx.sid,
+                        npc_graph, npc_input, config, character.name, ctx.sio, ctx.sid,
                     )
                 else:
-                    result = await npc_graph.ainvoke({"messages": input_messages})
+                    result = await npc_graph.ainvoke(npc_input, config)
                     delta = result.get("messages", [])[len(input_messages):]
                 all_messages.extend(delta)
                 logger.info(f"🎭 {directive.name} produced {len(delta)} message(s)")
@@ -0,0 +1,99 @@
+"""Express lane: plain dialogue with one obvious responder skips the DM brain.
+
+Most turns are the player talking to a single NPC. When the intent router
+reads in-character dialogue with nothing to adjudicate, the scene stays put,
+and exactly one NPC can plausibly answer, the plan is obvious: that NPC
+responds. ``context_join`` decides this once per story turn and records the
+responder in ``state.express_npc``; ``express_planner`` then writes the plan
+directly, skipping the referee, the planner and the continuity checker.
+
+Set ``DM_EXPRESS_LANE=0`` to send every story turn through the full pipeline.
+"""
+import os
+import re
+from dataclasses import dataclass
+from logging import getLogger
+
+from agents.dungeon_master.context import DMContext
+from agents.dungeon_master.schemas import DMPlan, DungeonMasterState, NPCDirective
+from utils.turn_timing import set_turn_mode
+
+logger = getLogger(__name__)
+
+DM_EXPRESS_LANE = os.environ.get("DM_EXPRESS_LANE", "1").lower() not in ("0", "false", "no")
+
+# Scene modes in which a line of dialogue cannot move the scene on by itself.
+EXPRESS_SCENE_MODES = frozenset({"social", "downtime"})
+
+
+@dataclass
+class ExpressStats:
+    story_turns: int = 0
+    express_turns: int = 0
+
+    @property
+    def share(self) -> float:
+        return self.express_turns / self.story_turns if self.story_turns else 0.0
+
+
+_stats = ExpressStats()
+
+
+def express_stats() -> dict[str, float | int | bool]:
+    return {
+        "enabled": DM_EXPRESS_LANE,
+        "story_turns": _stats.story_turns,
+        "express_turns": _stats.express_turns,
+        "express_share": round(_stats.share, 3),
+    }
+
+
+def _sole_responder(ctx: DMContext, state: DungeonMasterState) -> str | None:
+    """The one NPC who can plausibly answer: the only NPC addressed by name,
+    or the only NPC in the scene when nobody is named."""
+    names = [c.name for c in ctx.conversation.characters]
+    message = ctx.last_human_query(state, fallback="")
+    addressed = [n for n in names if re.search(rf"\b{re.escape(n)}\b", message, re.IGNORECASE)]
+    if len(addressed) == 1:
+        return addressed[0]
+    if not addressed and len(names) == 1:
+        return names[0]
+    return None
+
+
+def express_responder(ctx: DMContext, state: DungeonMasterState) -> str | None:
+    """Decide the express lane for a story turn; logs and counts the decision.
+
+    Call it from a node, so a resumed turn reuses the checkpointed decision
+    instead of counting it again.
+    """
+    _stats.story_turns += 1
+    intent = state.intent
+    responder = None
+    if (
+        DM_EXPRESS_LANE
+        and intent is not None
+        and intent.intent_type == "dialogue"
+        and not intent.needs_adjudication
+        and intent.scene_mode in EXPRESS_SCENE_MODES
+    ):
+        responder = _sole_responder(ctx, state)
+    if responder is None:
+        logger.info(f"🚦 Full pipeline (express share {_stats.share:.0%} of {_stats.story_turns})")
+        return None
+    _stats.express_turns += 1
+    logger.info(f"🚄 Express lane to {responder} (express share {_stats.share:.0%} of {_stats.story_turns})")
+    return responder
+
+
+def make_express_planner(ctx: DMContext):
+    async def express_planner(state: DungeonMasterState) -> dict:
+        """🚄 Synthesize the obvious plan: the addressed NPC answers the player."""
+        set_turn_mode("express")
+        plan = DMPlan(responding_npcs=[NPCDirective(
+            name=state.express_npc,
+            guidance=f"Respond in character to {ctx.player.name}: {state.intent.summary}",
+        )])
+        return {"messages": [], "plan": plan, "build_queue": [], "plan_attempts": 1}
+
+    return express_planner
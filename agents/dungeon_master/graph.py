@@ -2,42 +2,54 @@
 
 Turn pipeline:
 
-    START -> state_loader -> {graphiti_loader || intent_router} -> context_join
+    START -> state_loader -> {graphiti_loader -> referee_speculator || intent_router}
+        -> context_join
         -> ooc_responder -> persist_messages            (OOC short-circuit)
+        -> express_planner -> npc_executor -> ...       (plain dialogue, one responder)
         -> rules_referee -> dm_planner -> continuity_checker
             -> dm_planner                               (one repair pass)
-            -> {[npc build loop] || dm_narrator_opening} -> npc_executor
+            -> {npc_build_negotiation x N || dm_narrator_opening} -> npc_executor
             -> dm_narrator_closing -> canon_manager -> turn_epilogue
         -> persist_messages -> END
 
 Two fan-outs run concurrently:
   - Graphiti retrieval overlaps with intent classification; context_join
-    waits for both before routing OOC vs story.
-  - When the plan introduces NPCs, the build negotiation loop runs alongside
-    opening narration; npc_executor is deferred so it starts only after both
-    branches finish.
+    waits for both before routing OOC vs story. In speculative mode the
+    referee call for action-looking messages starts right after retrieval,
+    and context_join keeps or cancels it once the intent is known.
+  - When the plan introduces NPCs, each gets its own build negotiation
+    branch, all running alongside opening narration; npc_executor is
+    deferred so it starts only after every branch finishes.
+
+With a checkpoint store open (``checkpoints.open_checkpointer``) every turn
+is checkpointed per super-step, so an interrupted turn can resume.
 """
+from functools import lru_cache
 from logging import getLogger
 
-import socketio
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, START, StateGraph
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.types import Send
 
-from agents.dungeon_master.builder import after_builder, make_builder_nodes
+from agents.dungeon_master.builder import make_builder_nodes
 from agents.dungeon_master.canon import make_canon_manager, make_persist_messages
+from agents.dungeon_master.checkpoints import dm_checkpointer
 from agents.dungeon_master.context import DMContext, make_graphiti_loader, make_state_loader
 from agents.dungeon_master.continuity import MAX_PLAN_ATTEMPTS, make_continuity_checker
 from agents.dungeon_master.epilogue import make_turn_epilogue
 from agents.dungeon_master.executor import make_npc_executor
-from agents.dungeon_master.intent import make_intent_router, make_ooc_responder, route_intent
+from agents.dungeon_master.express import express_responder, make_express_planner
+from agents.dungeon_master.intent import OOC_INTENTS, make_intent_router, make_ooc_responder, route_intent
 from agents.dungeon_master.narration import make_narrator_nodes
 from agents.dungeon_master.planner import make_dm_planner
-from agents.dungeon_master.referee import make_rules_referee
-from agents.dungeon_master.schemas import DungeonMasterState
-from database.models.conversation import Conversation
+from agents.dungeon_master.referee import make_referee_nodes, settle_speculation
+from agents.dungeon_master.schemas import DungeonMasterState, NPCBuildTask
+from utils.metrics import instrument_node
 
 logger = getLogger(__name__)
 
-SCENE_TARGETS = ["npc_builder_caller", "dm_narrator_opening", "npc_executor"]
+SCENE_TARGETS = ["npc_build_negotiation", "dm_narrator_opening", "npc_executor"]
 
 
 def _route_to_scene(state: DungeonMasterState) -> str:
@@ -58,51 +70,55 @@ def _route_to_scene(state: DungeonMasterState) -> str:
     return "npc_executor"
 
 
-def _scene_fanout(state: DungeonMasterState) -> list[str]:
+def _scene_fanout(state: DungeonMasterState) -> list[str | Send]:
     """Targets to launch once the plan is final.
 
-    With NPCs to build, the build loop and opening narration run as parallel
-    branches; the deferred npc_executor waits for both to finish.
+    With NPCs to build, one negotiation branch per NPC and the opening
+    narration run in parallel; the deferred npc_executor waits for them all.
     """
     scene = _route_to_scene(state)
     if not state.build_queue:
         return [scene]
+    builds: list[str | Send] = [Send("npc_build_negotiation", NPCBuildTask(intro=i)) for i in state.build_queue]
     if scene == "dm_narrator_opening":
-        logger.info("🔀 Running NPC build loop and opening narration concurrently")
-        return ["npc_builder_caller", "dm_narrator_opening"]
-    return ["npc_builder_caller"]
+        logger.info(f"🔀 Negotiating {len(builds)} NPC build(s) and opening narration concurrently")
+        return [*builds, "dm_narrator_opening"]
+    logger.info(f"🔀 Negotiating {len(builds)} NPC build(s) concurrently")
+    return builds
 
 
-def after_continuity(state: DungeonMasterState) -> list[str]:
+def after_continuity(state: DungeonMasterState) -> list[str | Send]:
     if state.continuity_notes and state.plan_attempts < MAX_PLAN_ATTEMPTS:
         return ["dm_planner"]
     return _scene_fanout(state)
 
 
-def after_registrar(state: DungeonMasterState) -> str:
-    # Opening narration already ran (or was skipped) in the parallel branch,
-    # so the registrar only ever continues the build queue or hands off to
-    # the deferred executor.
-    return "npc_builder_caller" if state.build_queue else "npc_executor"
-
-
 def after_npc_executor(state: DungeonMasterState) -> str:
     if state.plan and state.plan.closing_narration:
         return "dm_narrator_closing"
     return "canon_manager"
 
 
-def spawn_dungeon_master(
-    conversation: Conversation,
-    sio: socketio.AsyncServer | None = None,
-    sid: str | None = None,
-    name: str = "dungeon_master",
-) -> StateGraph:
-    ctx = DMContext(conversation=conversation, sio=sio, sid=sid)
+def build_dungeon_master(
+    name: str = "dungeon_master", checkpointer: BaseCheckpointSaver | None = None,
+) -> CompiledStateGraph:
+    """Compile the DM graph. Runs take their session from ``dm_session_config``
+    and, with a ``checkpointer``, their thread from ``turn_checkpoint_config``."""
+    ctx = DMContext()
 
     async def context_join(state: DungeonMasterState) -> dict:
-        """Barrier: waits for graphiti_loader and intent_router before routing."""
-        return {"messages": []}
+        """Barrier: waits for graphiti_loader and intent_router before routing,
+        and decides whether a story turn takes the express lane."""
+        settle_speculation(state)
+        if state.intent is not None and state.intent.intent_type in OOC_INTENTS:
+            return {"messages": []}
+        return {"messages": [], "express_npc": express_responder(ctx, state)}
+
+    def route_turn(state: DungeonMasterState) -> str:
+        route = route_intent(state)
+        if route == "rules_referee" and state.express_npc:
+            return "express_planner"
+        return route
 
     nodes = {
         "state_loader": make_state_loader(ctx),
@@ -110,7 +126,8 @@ def spawn_dungeon_master(
         "intent_router": make_intent_router(ctx),
         "context_join": context_join,
         "ooc_responder": make_ooc_responder(ctx),
-        "rules_referee": make_rules_referee(ctx),
+        "express_planner": make_express_planner(ctx),
+        **make_referee_nodes(ctx),
         "dm_planner": make_dm_planner(ctx),
         "continuity_checker": make_continuity_checker(ctx),
         **make_builder_nodes(ctx),
@@ -121,24 +138,26 @@ def spawn_dungeon_master(
 
     graph = StateGraph(DungeonMasterState)
     for node_name, node in nodes.items():
-        graph.add_node(node_name, node)
+        graph.add_node(node_name, instrument_node("dm", node_name, node))
     # Deferred nodes wait until all other in-flight branches finish, which
     # makes npc_executor the join point of the build-loop/narration fan-out.
-    graph.add_node("npc_executor", make_npc_executor(ctx), defer=True)
-    graph.add_node("persist_messages", make_persist_messages(ctx), defer=True)
+    graph.add_node("npc_executor", instrument_node("dm", "npc_executor", make_npc_executor(ctx)), defer=True)
+    graph.add_node(
+        "persist_messages", instrument_node("dm", "persist_messages", make_persist_messages(ctx)), defer=True,
+    )
 
     graph.add_edge(START, "state_loader")
     graph.add_edge("state_loader", "graphiti_loader")
     graph.add_edge("state_loader", "intent_router")
-    graph.add_edge(["graphiti_loader", "intent_router"], "context_join")
-    graph.add_conditional_edges("context_join", route_intent, ["ooc_responder", "rules_referee"])
+    graph.add_edge("graphiti_loader", "referee_speculator")
+    graph.add_edge(["referee_speculator", "intent_router"], "context_join")
+    graph.add_conditional_edges("context_join", route_turn, ["ooc_responder", "express_planner", "rules_referee"])
     graph.add_edge("ooc_responder", "persist_messages")
+    graph.add_edge("express_planner", "npc_executor")
     graph.add_edge("rules_referee", "dm_planner")
     graph.add_edge("dm_planner", "continuity_checker")
     graph.add_conditional_edges("continuity_checker", after_continuity, ["dm_planner", *SCENE_TARGETS])
-    graph.add_conditional_edges("npc_builder_caller", after_builder, ["npc_build_reviewer", "npc_registrar"])
-    graph.add_edge("npc_build_reviewer", "npc_builder_caller")
-    graph.add_conditional_edges("npc_registrar", after_registrar, ["npc_builder_caller", "npc_executor"])
+    graph.add_edge("npc_build_negotiation", "npc_executor")
     graph.add_edge("dm_narrator_opening", "npc_executor")
     graph.add_conditional_edges("npc_executor", after_npc_executor, ["dm_narrator_closing", "canon_manager"])
     graph.add_edge("dm_narrator_closing", "canon_manager")
@@ -146,4 +165,10 @@ def spawn_dungeon_master(
     graph.add_edge("turn_epilogue", "persist_messages")
     graph.add_edge("persist_messages", END)
 
-    return graph.compile(name=name)
+    return graph.compile(name=name, checkpointer=checkpointer)
+
+
+@lru_cache(maxsize=1)
+def get_dungeon_master() -> CompiledStateGraph:
+    """The process-wide compiled DM graph, shared by every session."""
+    return build_dungeon_master(checkpointer=dm_checkpointer())
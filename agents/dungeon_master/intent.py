@@ -4,10 +4,12 @@ from uuid import uuid4
 
 from langchain_core.messages import AIMessage
 
+from agents.conversation_context import CONTEXT_BUDGET_TOKENS, CONTEXT_RECENT_TOKENS
 from agents.dungeon_master.context import DMContext
 from agents.dungeon_master.schemas import NARRATOR_NAME, DungeonMasterState, IntentReading
 from utils.llm_models import dm_intent_model, dm_ooc_model
-from utils.prompts import dm_intent_router_prompt_template, dm_ooc_responder_prompt_template
+from utils.llm_resilience import resilient_invoke
+from utils.prompts import prompts
 
 logger = getLogger(__name__)
 
@@ -23,16 +25,18 @@ def make_intent_router(ctx: DMContext):
 
     async def intent_router(state: DungeonMasterState) -> dict:
         """🧭 Classify the player's latest message: what do they want this turn?"""
-        prompt = await dm_intent_router_prompt_template.ainvoke({
+        prompt = await prompts.ainvoke("dm-intent-router", {
             "player_name": ctx.player.name,
             "location": ctx.location,
             "world_clock": ctx.world_clock,
             "active_npcs": ctx.npc_names,
             "player_state": state.player_state,
-            "messages": ctx.combined_messages(state, limit=ROUTER_CONTEXT_WINDOW),
+            "messages": ctx.prompt_messages(
+                state, CONTEXT_RECENT_TOKENS, limit=ROUTER_CONTEXT_WINDOW, summary=False,
+            ),
         })
         try:
-            reading: IntentReading = await intent_llm.ainvoke(prompt)
+            reading: IntentReading = await resilient_invoke(intent_llm, prompt, policy="dm_intent")
         except Exception:
             logger.exception("💥 Intent router failed, defaulting to in-character dialogue")
             reading = IntentReading(
@@ -64,7 +68,7 @@ def make_ooc_responder(ctx: DMContext):
         Speaks as the Narrator so the frontend needs no new speaker concept.
         Never advances the story and never touches the secrets group.
         """
-        prompt = await dm_ooc_responder_prompt_template.ainvoke({
+        prompt = await prompts.ainvoke("dm-ooc-responder", {
             "lore": state.lore,
             "world_events": state.world_events,
             "open_threads": state.open_threads,
@@ -72,13 +76,13 @@ def make_ooc_responder(ctx: DMContext):
             "world_clock": ctx.world_clock,
             "story_background": ctx.story_background,
             "player_name": ctx.player.name,
-            "messages": ctx.combined_messages(state),
+            "messages": ctx.prompt_messages(state, CONTEXT_BUDGET_TOKENS),
         })
         prefix = f"{NARRATOR_NAME}: "
         prompt.messages.append(AIMessage(content=prefix))
 
         try:
-            response = await dm_ooc_model.ainvoke(prompt)
+            response = await resilient_invoke(dm_ooc_model, prompt, policy="dm_ooc")
         except Exception:
             logger.exception("💥 OOC responder failed")
             return {"messages": []}
@@ -1,54 +1,273 @@
-"""The DM's narrative voice: expand plan notes into Narrator prose."""
+"""The DM's narrative voice: expand plan notes into Narrator prose.
+
+With ``DM_OPTIMISTIC_CONTINUITY`` enabled, the continuity checker starts the
+opening narration call alongside its own verdict (``start_opening_draft``).
+The draft streams into a server-side buffer -- nothing reaches the player.
+On approval ``dm_narrator_opening`` claims the draft and replays it through a
+stand-in chat model, so the buffered tokens flush at once and the rest
+follows live on the normal stream. On rejection the draft is cancelled, and
+a draft its turn never claimed is dropped when the turn is persisted.
+
+A draft that fails before its first token is replayed falls back to a fresh
+narration call. Once tokens are on the player's screen it is not restarted
+(that would repeat the text in the same bubble); the text already shown
+becomes the narration.
+"""
+import asyncio
+import os
+import time
+from collections.abc import AsyncIterator
+from functools import partial
 from logging import getLogger
+from typing import Any
 from uuid import uuid4
 
-from langchain_core.messages import AIMessage
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import ensure_config
+from langgraph.constants import TAG_NOSTREAM
 
+from agents.conversation_context import CONTEXT_BUDGET_TOKENS
 from agents.dungeon_master.context import DMContext
-from agents.dungeon_master.schemas import NARRATOR_NAME, DungeonMasterState
+from agents.dungeon_master.schemas import NARRATOR_NAME, DMPlan, DungeonMasterState
 from utils.llm_models import dm_narrator_model
-from utils.prompts import dm_narrator_prompt_template
+from utils.llm_resilience import resilient_invoke
+from utils.prompts import prompts
+from utils.turn_scope import spawn_child
 
 logger = getLogger(__name__)
 
+DM_OPTIMISTIC_CONTINUITY = os.environ.get("DM_OPTIMISTIC_CONTINUITY", "0").lower() in ("1", "true", "yes")
+
+# Finished drafts older than this are dropped even if their turn never
+# reached persist_messages (e.g. it failed).
+DRAFT_TTL_S = 300
+
+
+def _opening_notes(plan: DMPlan) -> str:
+    """The plan beats the opening narration expands; empty when there are none."""
+    notes: list[str] = []
+    # Only narrate the action outcome when no NPC is around to convey it.
+    if plan.action_outcome and not plan.responding_npcs:
+        notes.append(f"Action outcome: {plan.action_outcome}")
+    if plan.time_location_update:
+        notes.append(f"Scene change: {plan.time_location_update}")
+    if plan.opening_narration:
+        notes.append(f"Opening narration: {plan.opening_narration}")
+    notes.extend(f"New character enters: {i.entrance_narration}" for i in plan.npcs_to_introduce)
+    return "\n".join(notes)
+
+
+async def _narration_prompt(ctx: DMContext, notes: str, state: DungeonMasterState) -> PromptValue:
+    prompt = await prompts.ainvoke("dm-narrator", {
+        "narration_notes": notes,
+        "location": ctx.location,
+        "story_background": ctx.story_background,
+        "messages": ctx.prompt_messages(state, CONTEXT_BUDGET_TOKENS),
+    })
+    prompt.messages.append(AIMessage(content=f"{NARRATOR_NAME}: "))
+    return prompt
+
+
+def _narrator_message(response: BaseMessage) -> AIMessage:
+    prefix = f"{NARRATOR_NAME}: "
+    content = response.content.strip()
+    while content.startswith(prefix):
+        content = content[len(prefix):].lstrip()
+    return AIMessage(content=f"{prefix}{content}", name=NARRATOR_NAME, id=str(uuid4()))
+
+
+# ------------------------------------------------------------------
+# Optimistic opening drafts
+# ------------------------------------------------------------------
+
+class DraftRestarted(Exception):
+    """The draft's call was retried after part of it had been replayed."""
+
+
+class OpeningDraft:
+    """A narration call running ahead of plan approval, buffered server-side.
+
+    Acts as the call's ``ChunkListener``; ``tokens()`` yields everything
+    buffered so far and then follows the call live. ``replayed`` is what
+    ``tokens()`` has handed out.
+    """
+
+    def __init__(self, plan: DMPlan):
+        self.plan = plan
+        self.prompt: PromptValue | None = None
+        self.started = time.monotonic()
+        self.task: asyncio.Task | None = None
+        self.replayed: list[str] = []
+        self._chunks: list[str] = []
+        self._attempt = 0
+        self._changed = asyncio.Event()
+
+    def reset(self) -> None:
+        self._chunks = []
+        self._attempt += 1
+        self._changed.set()
+
+    def on_chunk(self, chunk: Any) -> None:
+        if isinstance(chunk.content, str) and chunk.content:
+            self._chunks.append(chunk.content)
+            self._changed.set()
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._changed.set()
+        if not task.cancelled():
+            task.exception()
+
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    async def tokens(self) -> AsyncIterator[str]:
+        attempt, sent = self._attempt, 0
+        while True:
+            if attempt != self._attempt:
+                if self.replayed:
+                    raise DraftRestarted("opening narration draft restarted mid-replay")
+                # A retry restarted the narration before anything was shown; follow it.
+                attempt, sent = self._attempt, 0
+            while sent < len(self._chunks):
+                sent += 1
+                self.replayed.append(self._chunks[sent - 1])
+                yield self._chunks[sent - 1]
+            if self.task.done():
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+
+class _DraftReplay(BaseChatModel):
+    """Stand-in chat model that "generates" a draft's tokens, so they flow
+    through LangGraph's ``messages`` stream like any narrator call."""
+    draft: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "narration-draft-replay"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # Sync callers get whatever the draft has buffered, in one message.
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.draft.text()))])
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async for token in self.draft.tokens():
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+# Drafts awaiting the continuity verdict, keyed by the turn's player message id.
+_drafts: dict[str, OpeningDraft] = {}
+
+
+def start_opening_draft(ctx: DMContext, state: DungeonMasterState) -> OpeningDraft | None:
+    """Launch the opening narration for ``state.plan`` without streaming it."""
+    key = DMContext.turn_key(state)
+    notes = _opening_notes(state.plan) if state.plan else ""
+    if key is None or not notes:
+        return None
+    discard_opening_draft(state)
+    _drop_stale_drafts()
+
+    async def run(draft: OpeningDraft) -> AIMessage:
+        draft.prompt = await _narration_prompt(ctx, notes, state)
+        config = ensure_config()
+        config = {**config, "tags": [*(config.get("tags") or []), TAG_NOSTREAM]}
+        response = await resilient_invoke(
+            dm_narrator_model, draft.prompt, policy="dm_narrator", config=config, listener=draft,
+        )
+        return _narrator_message(response)
+
+    draft = OpeningDraft(state.plan)
+    draft.task = spawn_child(run(draft))
+    draft.task.add_done_callback(draft._on_done)
+    draft.task.add_done_callback(partial(_forget_cancelled_draft, key, draft))
+    _drafts[key] = draft
+    logger.info("📜 Drafting opening narration while continuity is checked")
+    return draft
+
+
+def _forget_cancelled_draft(key: str, draft: OpeningDraft, task: asyncio.Task) -> None:
+    # A preempted turn never claims or discards its draft.
+    if task.cancelled() and _drafts.get(key) is draft:
+        del _drafts[key]
+
+
+def discard_opening_draft(state: DungeonMasterState) -> None:
+    """Cancel and forget this turn's draft, if it was never claimed."""
+    key = DMContext.turn_key(state)
+    draft = _drafts.pop(key, None) if key else None
+    if draft is not None and not draft.task.done():
+        draft.task.cancel()
+        logger.info("🗑️ Opening narration draft cancelled")
+
+
+def _drop_stale_drafts() -> None:
+    now = time.monotonic()
+    for key, draft in list(_drafts.items()):
+        if draft.task.done() and now - draft.started > DRAFT_TTL_S:
+            del _drafts[key]
+
 
 def make_narrator_nodes(ctx: DMContext) -> dict:
     async def _narrate(notes: str, state: DungeonMasterState) -> AIMessage:
         """Expand DM narration notes into full Narrator prose."""
-        prompt = await dm_narrator_prompt_template.ainvoke({
-            "narration_notes": notes,
-            "location": ctx.location,
-            "story_background": ctx.story_background,
-            "messages": ctx.combined_messages(state),
-        })
-        prefix = f"{NARRATOR_NAME}: "
-        prompt.messages.append(AIMessage(content=prefix))
-
-        response = await dm_narrator_model.ainvoke(prompt)
-        content = response.content.strip()
-        while content.startswith(prefix):
-            content = content[len(prefix):].lstrip()
-        return AIMessage(content=f"{prefix}{content}", name=NARRATOR_NAME, id=str(uuid4()))
+        prompt = await _narration_prompt(ctx, notes, state)
+        response = await resilient_invoke(dm_narrator_model, prompt, policy="dm_narrator")
+        return _narrator_message(response)
+
+    async def _flush_draft(draft: OpeningDraft) -> AIMessage:
+        """Replay the approved draft onto the stream, then return its final message."""
+        replay = _DraftReplay(draft=draft)
+        async for _chunk in replay.astream(draft.prompt or ""):
+            pass
+        return await draft.task
 
     async def dm_narrator_opening(state: DungeonMasterState) -> dict:
         """Expand opening narration notes into full prose."""
         plan = state.plan
         if not plan:
             return {"messages": []}
-
-        notes: list[str] = []
-        # Only narrate the action outcome when no NPC is around to convey it.
-        if plan.action_outcome and not plan.responding_npcs:
-            notes.append(f"Action outcome: {plan.action_outcome}")
-        if plan.time_location_update:
-            notes.append(f"Scene change: {plan.time_location_update}")
-        if plan.opening_narration:
-            notes.append(f"Opening narration: {plan.opening_narration}")
-        notes.extend(f"New character enters: {i.entrance_narration}" for i in plan.npcs_to_introduce)
+        notes = _opening_notes(plan)
         if not notes:
             return {"messages": []}
 
-        msg = await _narrate("\n".join(notes), state)
+        key = DMContext.turn_key(state)
+        draft = _drafts.pop(key, None) if key else None
+        msg = None
+        if draft is not None and draft.plan == plan:
+            try:
+                msg = await _flush_draft(draft)
+                logger.info(f"📜 Flushed drafted opening ({time.monotonic() - draft.started:.2f}s since start)")
+            except Exception:
+                draft.task.cancel()
+                shown = "".join(draft.replayed)
+                if shown.strip():
+                    # Narrating again would append a second take to the same bubble.
+                    logger.exception("💥 Opening narration draft failed mid-replay, keeping the text already shown")
+                    msg = _narrator_message(AIMessage(content=shown))
+                else:
+                    logger.exception("💥 Opening narration draft failed before its first token, narrating again")
+        elif draft is not None:
+            draft.task.cancel()
+        if msg is None:
+            msg = await _narrate(notes, state)
         logger.info(f"📜 Opening narration: {msg.content[:120]}...")
         return {"messages": [msg]}
 
@@ -0,0 +1,81 @@
+"""Incremental parsing of the DM plan while the planner is still streaming it.
+
+The planner asks for JSON-schema output, which arrives as message content
+and emits ``DMPlan`` fields in schema order. A model bound with function
+calling streams the same JSON as the tool call's argument chunks instead,
+and those are parsed the same way. Either way a top-level field is complete
+as soon as the next one starts (or the object closes).
+``PlanStreamParser`` is a ``ChunkListener`` for ``resilient_invoke``:
+it re-parses the partial JSON at field boundaries and fires
+``on_field(name, value)`` exactly once per completed field, letting work that
+only needs, say, ``responding_npcs`` start while the rest of the plan is
+still being written.
+"""
+import json
+import time
+from collections.abc import Callable
+from logging import getLogger
+from typing import Any
+
+from langchain_core.messages import AIMessage
+from langchain_core.utils.json import parse_partial_json
+
+from agents.dungeon_master.schemas import DMPlan
+
+logger = getLogger(__name__)
+
+FieldCallback = Callable[[str, Any], None]
+
+
+class PlanStreamParser:
+    def __init__(self, on_field: FieldCallback):
+        self._on_field = on_field
+        self.reset()
+
+    def reset(self) -> None:
+        """Start over -- called when an attempt wins, and again on a retry."""
+        self._buffer = ""
+        self._emitted: set[str] = set()
+        self._started = time.monotonic()
+        self.field_times: dict[str, float] = {}
+
+    def on_chunk(self, chunk: Any) -> None:
+        text = chunk.content if isinstance(chunk.content, str) else ""
+        if not text:
+            # Function calling: the plan is the first tool call's arguments.
+            text = "".join(
+                tc.get("args") or "" for tc in getattr(chunk, "tool_call_chunks", []) if tc.get("index", 0) == 0
+            )
+        if not text:
+            return
+        self._buffer += text
+        # A top-level field can only complete at a separator or closing brace.
+        if "," in text or "}" in text:
+            self._scan(final=False)
+
+    def _scan(self, final: bool) -> None:
+        partial = parse_partial_json(self._buffer)
+        if not isinstance(partial, dict):
+            return
+        keys = list(partial)
+        complete = keys if final else keys[:-1]
+        for key in complete:
+            if key in self._emitted:
+                continue
+            self._emitted.add(key)
+            self.field_times[key] = round(time.monotonic() - self._started, 3)
+            try:
+                self._on_field(key, partial[key])
+            except Exception:
+                logger.exception(f"💥 Plan field handler failed for '{key}'")
+
+    def finish(self, message: AIMessage) -> DMPlan:
+        """Validate the complete plan and flush any fields not yet emitted."""
+        if message.tool_calls:
+            args = message.tool_calls[0]["args"]
+            self._buffer = json.dumps(args)
+            self._scan(final=True)
+            return DMPlan.model_validate(args)
+        self._buffer = message.content
+        self._scan(final=True)
+        return DMPlan.model_validate_json(message.content)
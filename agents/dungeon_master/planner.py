@@ -1,16 +1,56 @@
 """The DM brain: produce a structured plan for the turn."""
+import os
 from logging import getLogger
+from typing import Any
 
+from langchain_core.prompt_values import PromptValue
+
+from agents.conversation_context import CONTEXT_BUDGET_TOKENS
 from agents.dungeon_master.context import DMContext
+from agents.dungeon_master.plan_stream import PlanStreamParser
 from agents.dungeon_master.schemas import DMPlan, DungeonMasterState
+from agents.nonplayer import prefetch_npc_context
 from utils.llm_models import dm_planner_model
-from utils.prompts import dm_planner_prompt_template
+from utils.llm_resilience import resilient_invoke
+from utils.prompts import prompts
+from utils.turn_timing import set_turn_mode
 
 logger = getLogger(__name__)
 
+# Stream the plan and act on fields as they complete. "0" restores the single
+# blocking structured-output call, e.g. to compare time-to-first-token.
+DM_PLAN_STREAMING = os.environ.get("DM_PLAN_STREAMING", "1").lower() not in ("0", "false", "no")
+
 
 def make_dm_planner(ctx: DMContext):
-    plan_llm = dm_planner_model.with_structured_output(DMPlan, strict=True)
+    # JSON-schema output, so the plan streams as message content (the
+    # OpenAI-compatible default would be a function call).
+    plan_llm = dm_planner_model.with_structured_output(DMPlan, method="json_schema", strict=True)
+    # The same response_format-bound model minus the final parser, so the raw
+    # JSON can be parsed while it streams.
+    plan_stream_llm = plan_llm.first
+
+    def _prefetch_responders(directives: Any, state: DungeonMasterState) -> None:
+        """🔮 Warm each responding NPC's Graphiti context while the plan finishes."""
+        query = ctx.last_human_query(state, fallback="")
+        if not query or not isinstance(directives, list):
+            return
+        by_name = {c.name: c for c in ctx.conversation.characters}
+        for directive in directives:
+            character = by_name.get(directive.get("name")) if isinstance(directive, dict) else None
+            if character is not None:
+                prefetch_npc_context(character, ctx.conversation, query)
+
+    async def _stream_plan(prompt: PromptValue, state: DungeonMasterState) -> DMPlan:
+        def on_field(name: str, value: Any) -> None:
+            if name == "responding_npcs":
+                _prefetch_responders(value, state)
+
+        parser = PlanStreamParser(on_field)
+        message = await resilient_invoke(plan_stream_llm, prompt, policy="dm_planner", listener=parser)
+        plan = parser.finish(message)
+        logger.debug(f"📝 Plan fields completed at (s): {parser.field_times}")
+        return plan
 
     async def dm_planner(state: DungeonMasterState) -> dict:
         """🧠 Decide what happens this turn, honoring intent and adjudication."""
@@ -23,8 +63,8 @@ def make_dm_planner(ctx: DMContext):
         if state.continuity_notes:
             logger.info(f"🔁 Re-planning (attempt {state.plan_attempts + 1}) with continuity notes")
 
-        prompt = await dm_planner_prompt_template.ainvoke({
-            "messages": ctx.combined_messages(state),
+        prompt = await prompts.ainvoke("dm-planner", {
+            "messages": ctx.prompt_messages(state, CONTEXT_BUDGET_TOKENS),
             "lore": state.lore,
             "world_events": state.world_events,
             "secret_knowledge": state.secret_knowledge,
@@ -44,7 +84,12 @@ def make_dm_planner(ctx: DMContext):
             "continuity_notes": continuity_block,
         })
 
-        plan: DMPlan = await plan_llm.ainvoke(prompt)
+        if DM_PLAN_STREAMING:
+            set_turn_mode("plan_streaming")
+            plan = await _stream_plan(prompt, state)
+        else:
+            set_turn_mode("plan_blocking")
+            plan: DMPlan = await resilient_invoke(plan_llm, prompt, policy="dm_planner")
         logger.info(
             f"📝 Plan: {len(plan.responding_npcs)} NPC(s), "
             f"{len(plan.npcs_to_introduce)} intro(s), "
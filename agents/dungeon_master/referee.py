@@ -1,47 +1,200 @@
-"""Rules referee: adjudicate uncertain actions, then let deterministic dice decide."""
+"""Rules referee: adjudicate uncertain actions, then let deterministic dice decide.
+
+With ``DM_SPECULATIVE_REFEREE`` enabled, the ruling call is started before the
+intent is known: ``referee_speculator`` runs beside ``intent_router`` and, when
+a cheap local heuristic says the player is attempting something, launches the
+referee LLM call in the background. The router's summary does not exist yet,
+so the player's own words (the first ``SPECULATIVE_INTENT_CHARS`` characters)
+stand in for the intent summary; the referee prompt also sees the recent
+messages, which include the full text. ``context_join`` settles the bet: the
+call is cancelled when the intent needs no adjudication, otherwise
+``rules_referee`` claims its ruling instead of starting a fresh call.
+
+A speculation nobody claimed is forgotten when its turn is persisted, or
+``SPECULATION_TTL_S`` after it finished if the turn never got that far.
+"""
+import asyncio
+import functools
+import os
+import re
+from dataclasses import asdict, dataclass
 from logging import getLogger
 
+from agents.conversation_context import CONTEXT_RECENT_TOKENS
 from agents.dungeon_master.context import DMContext
+from agents.dungeon_master.intent import OOC_INTENTS
 from agents.dungeon_master.schemas import Adjudication, AdjudicationRuling, DungeonMasterState
 from tools.dice import resolve_check
 from utils.llm_models import dm_referee_model
-from utils.prompts import dm_rules_referee_prompt_template
+from utils.llm_resilience import resilient_invoke
+from utils.prompts import prompts
+from utils.turn_scope import spawn_child
 
 logger = getLogger(__name__)
 
 REFEREE_CONTEXT_WINDOW = 12
 DEFAULT_DC = 11
 
+DM_SPECULATIVE_REFEREE = os.environ.get("DM_SPECULATIVE_REFEREE", "0").lower() in ("1", "true", "yes")
+# How much of the player's message stands in for the intent summary.
+SPECULATIVE_INTENT_CHARS = 300
+# How long a finished, unclaimed speculation is kept for its turn.
+SPECULATION_TTL_S = 120
 
-def make_rules_referee(ctx: DMContext):
-    ruling_llm = dm_referee_model.with_structured_output(AdjudicationRuling, strict=True)
+# First-person attempts ("I try to...", "I sneak past..."), imperative openers
+# and *emote* actions. Deliberately loose: a false positive costs one
+# cancelled call, a false negative just falls back to the sequential path.
+ACTION_CUES = re.compile(
+    r"\b(i|we)\s+(try|tries|attempt|start to|begin to|carefully|quietly|quickly)\b"
+    r"|^\W*(?:i\s+|we\s+)?(sneak|climb|attack|strike|swing|shoot|fire|cast|pick|steal|grab|"
+    r"jump|leap|dodge|hide|force|break|push|pull|search|persuade|intimidate|deceive|bluff|"
+    r"disarm|sprint|stab|slash|throw|tackle|charge|flee|shove|pry|smash|kick|pickpocket|"
+    r"lunge|parry|block|bash|lift|swim|track|sabotage|unlock)\b"
+    r"|^\s*\*[^*]+\*",
+    re.IGNORECASE,
+)
 
-    async def rules_referee(state: DungeonMasterState) -> dict:
-        """⚖️ Rule on the player's attempted action and resolve dice when needed.
 
-        The LLM only sets up the situation (ruling, DC, stakes); the dice module
-        rolls deterministically. The resulting outcome is canon for the planner.
-        """
-        intent = state.intent
-        if intent is None or not intent.needs_adjudication:
-            return {"messages": [], "adjudication": None}
+def looks_like_action(text: str) -> bool:
+    return bool(ACTION_CUES.search(text))
+
+
+@dataclass
+class SpeculationStats:
+    launched: int = 0
+    hits: int = 0       # launched and the intent needed a ruling
+    wasted: int = 0     # launched but cancelled: no ruling needed
+    missed: int = 0     # not launched, yet the intent needed a ruling
+    failed: int = 0     # launched and needed, but errored -> sequential call
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.launched if self.launched else 0.0
+
+
+_stats = SpeculationStats()
+# In-flight speculative rulings keyed by the turn's player message id.
+_speculations: dict[str, asyncio.Task] = {}
+
+
+def settle_speculation(state: DungeonMasterState) -> None:
+    """Cancel this turn's speculative ruling unless the intent needs one."""
+    intent = state.intent
+    needed = intent is not None and intent.needs_adjudication and intent.intent_type not in OOC_INTENTS
+    key = DMContext.turn_key(state)
+    task = _speculations.get(key) if key else None
+    if task is None:
+        if needed and DM_SPECULATIVE_REFEREE:
+            _stats.missed += 1
+            logger.info(f"🎲 Speculative referee missed an action turn (missed={_stats.missed})")
+        return
+    if needed:
+        _stats.hits += 1
+        logger.info(f"🎲 Speculative referee hit (hit rate {_stats.hit_rate:.0%} of {_stats.launched})")
+        return
+    _speculations.pop(key, None)
+    task.cancel()
+    _stats.wasted += 1
+    logger.info(
+        f"🎲 Speculative referee discarded, no adjudication needed "
+        f"(hit rate {_stats.hit_rate:.0%} of {_stats.launched})"
+    )
+
+
+def discard_speculation(state: DungeonMasterState) -> None:
+    """Cancel and forget this turn's speculation, if it was never claimed."""
+    key = DMContext.turn_key(state)
+    task = _speculations.pop(key, None) if key else None
+    if task is not None and not task.done():
+        task.cancel()
+
+
+def _forget_speculation(key: str, task: asyncio.Task) -> None:
+    if _speculations.get(key) is task:
+        del _speculations[key]
 
-        prompt = await dm_rules_referee_prompt_template.ainvoke({
+
+def _on_speculation_done(key: str, task: asyncio.Task) -> None:
+    if task.cancelled():
+        # A preempted turn never settles its speculation.
+        _forget_speculation(key, task)
+        return
+    task.exception()
+    asyncio.get_running_loop().call_later(SPECULATION_TTL_S, _forget_speculation, key, task)
+
+
+def speculation_stats() -> dict[str, float | int]:
+    return {**asdict(_stats), "hit_rate": round(_stats.hit_rate, 3)}
+
+
+def make_referee_nodes(ctx: DMContext) -> dict:
+    """Build the referee node and its optional speculative launcher."""
+    ruling_llm = dm_referee_model.with_structured_output(AdjudicationRuling, strict=True)
+
+    async def _rule(state: DungeonMasterState, intent_summary: str) -> AdjudicationRuling:
+        prompt = await prompts.ainvoke("dm-rules-referee", {
             "contract": ctx.campaign.render_contract(),
             "player": ctx.player.description,
             "player_state": state.player_state,
             "location": ctx.location,
             "world_clock": ctx.world_clock,
             "lore": state.lore,
-            "intent_summary": intent.summary,
-            "messages": ctx.combined_messages(state, limit=REFEREE_CONTEXT_WINDOW),
+            "intent_summary": intent_summary,
+            "messages": ctx.prompt_messages(
+                state, CONTEXT_RECENT_TOKENS, limit=REFEREE_CONTEXT_WINDOW, summary=False,
+            ),
         })
+        return await resilient_invoke(ruling_llm, prompt, policy="dm_referee")
+
+    async def referee_speculator(state: DungeonMasterState) -> dict:
+        """🎲 Start the ruling early when the message reads like an attempted action.
+
+        Runs after lore retrieval, concurrently with the intent router; it
+        only launches the call and returns at once.
+        """
+        if not DM_SPECULATIVE_REFEREE:
+            return {"messages": []}
+        key = DMContext.turn_key(state)
+        query = ctx.last_human_query(state, fallback="")
+        if key is None or not looks_like_action(query):
+            return {"messages": []}
+        _stats.launched += 1
+        task = spawn_child(_rule(state, query[:SPECULATIVE_INTENT_CHARS]))
+        _speculations[key] = task
+        task.add_done_callback(functools.partial(_on_speculation_done, key))
+        logger.info(f"🎲 Speculatively adjudicating: {query[:80]}")
+        return {"messages": []}
+
+    async def _claim_speculation(state: DungeonMasterState) -> AdjudicationRuling | None:
+        key = DMContext.turn_key(state)
+        task = _speculations.pop(key, None) if key else None
+        if task is None:
+            return None
         try:
-            ruling: AdjudicationRuling = await ruling_llm.ainvoke(prompt)
+            return await task
         except Exception:
-            logger.exception("💥 Rules referee failed, proceeding without adjudication")
+            _stats.failed += 1
+            logger.exception("💥 Speculative ruling failed, adjudicating sequentially")
+            return None
+
+    async def rules_referee(state: DungeonMasterState) -> dict:
+        """⚖️ Rule on the player's attempted action and resolve dice when needed.
+
+        The LLM only sets up the situation (ruling, DC, stakes); the dice module
+        rolls deterministically. The resulting outcome is canon for the planner.
+        """
+        intent = state.intent
+        if intent is None or not intent.needs_adjudication:
             return {"messages": [], "adjudication": None}
 
+        ruling = await _claim_speculation(state)
+        if ruling is None:
+            try:
+                ruling = await _rule(state, intent.summary)
+            except Exception:
+                logger.exception("💥 Rules referee failed, proceeding without adjudication")
+                return {"messages": [], "adjudication": None}
+
         adjudication = Adjudication(**ruling.model_dump())
         if ruling.ruling == "roll":
             check = resolve_check(dc=ruling.dc or DEFAULT_DC, advantage=ruling.advantage)
@@ -56,4 +209,4 @@ def make_rules_referee(ctx: DMContext):
         logger.info(f"⚖️ Adjudication:\n{adjudication.render()}")
         return {"messages": [], "adjudication": adjudication}
 
-    return rules_referee
+    return {"referee_speculator": referee_speculator, "rules_referee": rules_referee}
@@ -165,6 +165,11 @@ class NPCIntroduction(BaseModel):
         "Brief note on how this NPC enters the scene (expanded by the DM narrator)."))
 
 
+class NPCBuildTask(BaseModel):
+    """Input of one ``npc_build_negotiation`` branch (sent per introduction)."""
+    intro: NPCIntroduction
+
+
 class BuildReview(BaseModel):
     """The DM's verdict on a character card drafted by the NPC builder."""
     approved: bool = Field(description=(
@@ -287,8 +292,7 @@ class DungeonMasterState(BaseModel):
     # Live participant mechanical state (rendered prompt-ready by the context loader)
     player_state: str = "(no tracked mechanical state)"
     active_npc_states: str = "(no tracked mechanical state for active NPCs)"
-    # NPC build negotiation loop (DM <-> npc_builder argument)
+    # NPCs to build this turn; each negotiates in its own npc_build_negotiation branch
     build_queue: list[NPCIntroduction] = Field(default_factory=list)
-    build_transcript: list[AnyMessage] = Field(default_factory=list)
-    build_rounds: int = 0
-    build_created: bool = False
+    # Express lane: the sole NPC responder, decided once per turn in context_join
+    express_npc: str | None = None
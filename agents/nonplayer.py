@@ -1,12 +1,21 @@
 import asyncio
+import json
 import operator
+import os
+import random
 import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
 from logging import getLogger
-from typing import TYPE_CHECKING, Annotated
+from typing import TYPE_CHECKING, Annotated, Any
 from uuid import uuid4
 
 from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig, ensure_config
 from langgraph.graph import END, START, StateGraph
+from langgraph.graph.state import CompiledStateGraph
 from pydantic import BaseModel, Field
 
 from hephaestus.helpers import Oligaton
@@ -20,15 +29,15 @@ from database.graphiti_utils import (
     process_and_save_memory,
 )
 from database.models import Character as CharacterModel
+from agents.conversation_context import CONTEXT_BUDGET_TOKENS, assemble_context, recent_messages
 from database.models.conversation import Conversation
 from tools.participants import render_npc_state, render_player_state
 from utils.llm_models import npc_emotions, npc_narration, npc_thoughts
-from utils.prompts import (
-    character_episodic_memory,
-    emotions_prompt_template,
-    narrator_prompt_template,
-    plan_prompt_template,
-)
+from utils.llm_governor import reported_tokens
+from utils.llm_resilience import resilient_invoke
+from utils.metrics import instrument_node
+from utils.prompts import compile_text, prompts
+from utils.turn_scope import spawn_child
 
 if TYPE_CHECKING:
     from agents.dungeon_master import NPCDirective
@@ -36,6 +45,37 @@ if TYPE_CHECKING:
 info_limits = settings.graphiti.information_limits
 logger = getLogger(__name__)
 
+# Graphiti context fetched ahead of an NPC's turn (see ``prefetch_npc_context``),
+# keyed by (conversation id, character id, query). Unclaimed entries expire.
+PREFETCH_TTL_S = 120.0
+_prefetched_context: dict[tuple[int, int, str], tuple[float, asyncio.Task]] = {}
+
+# NPCState fields produced by the preparation stage (context, emotions, plan).
+# Passing them back in with the input resumes the graph at npc_narrator.
+PREPARED_FIELDS = ("lore", "memories", "self_state", "player_state", "thoughts", "prepared")
+
+# Where npc_turn_config puts the NPCTurn in ``config["configurable"]``.
+NPC_TURN_KEY = "npc_turn"
+
+# How an NPC forms its feelings and intentions before speaking:
+#   split -- emotion_updater then planner, two calls on the same context
+#   fused -- one structured "mind" call returning both
+# NPC_MIND_OVERRIDES picks a mode per campaign or per thoughts model, e.g.
+# {"campaign:12": "fused", "model:deepseek-v3.2": "fused"}; campaign wins.
+# NPC_MIND_AB_SHARE sends that fraction of the remaining NPC turns to the
+# other mode so both keep producing comparable latency/token samples.
+NPC_MIND_MODES = ("split", "fused")
+NPC_MIND_MODE = os.environ.get("NPC_MIND_MODE", "split")
+NPC_MIND_OVERRIDES: dict[str, str] = json.loads(os.environ.get("NPC_MIND_OVERRIDES") or "{}")
+NPC_MIND_AB_SHARE = float(os.environ.get("NPC_MIND_AB_SHARE", "0"))
+
+FUSED_MIND_INSTRUCTION = (
+    "Besides your private thoughts, report how this moment shifts your feelings. "
+    "emotion_delta is the CHANGE for each emotion, not its new level: usually "
+    "between -3 and 3, 0 when the moment leaves that feeling untouched. "
+    "thoughts is your private reasoning and what you intend to say or do next."
+)
+
 
 class EmotionalState(BaseModel, metaclass=Oligaton):
     love: int = Field(default=0, ge=-20, le=20, description="Intensity of affectionate attachment.")
@@ -46,6 +86,21 @@ class EmotionalState(BaseModel, metaclass=Oligaton):
     hope: int = Field(default=0, ge=-20, le=20, description="Intensity of positive expectation for outcomes.")
 
 
+class EmotionDelta(BaseModel):
+    love: int = Field(ge=-20, le=20, description="Change in affectionate attachment.")
+    hate: int = Field(ge=-20, le=20, description="Change in hostile aversion.")
+    fear: int = Field(ge=-20, le=20, description="Change in perceived threat or dread.")
+    joy: int = Field(ge=-20, le=20, description="Change in happiness or delight.")
+    sadness: int = Field(ge=-20, le=20, description="Change in sorrow or grief.")
+    hope: int = Field(ge=-20, le=20, description="Change in positive expectation for outcomes.")
+
+
+class NPCMind(BaseModel):
+    """The fused mind call: feelings and intentions from one look at the scene."""
+    emotion_delta: EmotionDelta
+    thoughts: str = Field(description="Private reasoning and what the character intends to say or do next.")
+
+
 def strip_speaker_prefix(raw: str, name: str) -> str:
     """Remove any leading '{name}:' speaker labels (repeated, any casing) from narration."""
     pattern = re.compile(
@@ -93,7 +148,7 @@ async def narrate_with_retry(
     messages = list(prompt.messages)
     response = None
     for attempt in range(1, max_attempts + 1):
-        response = await npc_narration.ainvoke(messages)
+        response = await resilient_invoke(npc_narration, messages, policy="npc_narration")
         content = strip_speaker_prefix(response.content, name)
         content, truncated = truncate_foreign_turns(content, other_speakers)
         if truncated:
@@ -122,143 +177,375 @@ async def narrate_with_retry(
     return response, ""
 
 
-def spawn_npc_directed(
-    character: CharacterModel,
-    conversation: Conversation,
-    directive: "NPCDirective",
-) -> StateGraph:
-    """Build an NPC graph that honors a DM directive.
+async def _load_npc_context(character: CharacterModel, conversation: Conversation, query: str) -> tuple[str, str]:
+    """Lore and this NPC's own memories relevant to ``query``."""
+    return await asyncio.gather(
+        load_information(
+            query=query,
+            group_ids=[make_group_id("lore", conversation.campaign.lore_world)],
+            limit=info_limits.lore,
+        ),
+        load_information(
+            query=query,
+            group_ids=[make_memory_group_id(conversation.campaign.id, character.name)],
+            limit=info_limits.memories,
+        ),
+    )
+
+
+def prefetch_npc_context(character: CharacterModel, conversation: Conversation, query: str) -> None:
+    """Start loading an NPC's Graphiti context before its graph runs.
 
-    The ``directive`` provides ``.guidance`` (what to focus on) and
-    ``.withheld_info`` (facts to avoid revealing). The DM planner has
-    already decided this NPC responds this turn, so there is no veto.
+    The NPC's ``context_loader`` claims the result if it asks for the same
+    query; otherwise the entry expires after ``PREFETCH_TTL_S``.
     """
+    now = time.monotonic()
+    for key, (created, task) in list(_prefetched_context.items()):
+        if now - created > PREFETCH_TTL_S:
+            _prefetched_context.pop(key)
+            task.cancel()
+    key = (conversation.id, character.id, query)
+    if key not in _prefetched_context:
+        task = spawn_child(_load_npc_context(character, conversation, query))
+        # Failures are re-raised to the claimer; don't warn if nobody claims it.
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        _prefetched_context[key] = (now, task)
+        logger.info(f"🔮 Prefetching context for {character.name}")
+
+
+async def _claim_npc_context(character: CharacterModel, conversation: Conversation, query: str) -> tuple[str, str]:
+    entry = _prefetched_context.pop((conversation.id, character.id, query), None)
+    if entry is not None:
+        try:
+            return await entry[1]
+        except Exception:
+            logger.exception(f"💥 Prefetched context for {character.name} failed, reloading")
+    return await _load_npc_context(character, conversation, query)
+
+
+@dataclass(frozen=True)
+class NPCPersona:
+    """Prompt values derived from a character card, cached per character id
+    so turns don't rebuild them; replaced when the description version changes."""
+    id: int
+    version: int | None
+    name: str
+    description: str
+
+    @property
+    def card(self) -> str:
+        return f"**{self.name}**:\n{self.description}"
+
+
+_personas: dict[int, NPCPersona] = {}
+
+
+def npc_persona(character: CharacterModel) -> NPCPersona:
+    persona = _personas.get(character.id)
+    if persona is None or persona.version != character.description_version:
+        persona = NPCPersona(character.id, character.description_version, character.name, character.description or "")
+        _personas[character.id] = persona
+    return persona
+
+
+@lru_cache(maxsize=512)
+def _other_characters(character_id: int, roster: tuple[tuple[int, int | None], ...]) -> str:
+    # The roster's personas were fetched just before this call, so they are current.
+    return "\n\n\n".join(_personas[npc_id].card for npc_id, _ in roster if npc_id != character_id)
+
+
+def npc_mind_mode(campaign_id: int) -> str:
+    """Pick split or fused mind mode for one NPC turn (see ``NPC_MIND_MODE``)."""
+    model = getattr(npc_thoughts, "model_name", "")
+    mode = NPC_MIND_OVERRIDES.get(f"campaign:{campaign_id}") or NPC_MIND_OVERRIDES.get(f"model:{model}")
+    if mode is None:
+        mode = NPC_MIND_MODE
+        if NPC_MIND_AB_SHARE > 0 and random.random() < NPC_MIND_AB_SHARE:
+            mode = "fused" if mode == "split" else "split"
+    if mode not in NPC_MIND_MODES:
+        logger.warning(f"⚠️ Unknown NPC mind mode '{mode}', using split")
+        return "split"
+    return mode
+
+
+@dataclass
+class MindStats:
+    """A/B counters for one mind mode, per NPC turn."""
+    turns: int = 0
+    calls: int = 0
+    seconds: float = 0.0
+    tokens: int = 0
+    calls_without_usage: int = 0
+
+    def record(self, seconds: float, result: Any, completes_turn: bool) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        tokens = reported_tokens(result)
+        if tokens is None:
+            self.calls_without_usage += 1
+        else:
+            self.tokens += tokens
+        self.turns += completes_turn
+
+    def snapshot(self) -> dict[str, Any]:
+        turns = max(self.turns, 1)
+        return {
+            "turns": self.turns,
+            "calls": self.calls,
+            "mean_latency_s": round(self.seconds / turns, 3),
+            "mean_tokens": round(self.tokens / turns, 1),
+            "calls_without_usage": self.calls_without_usage,
+        }
 
-    other_characters = "\n\n\n".join(
-        f"**{c.name}**:\n{c.description}"
-        for c in conversation.characters
-        if c.id != character.id
-    )
-    other_speakers = [c.name for c in conversation.characters if c.id != character.id]
-    other_speakers.append(conversation.player.name)
-
-    emotional_state_model = npc_emotions.with_structured_output(EmotionalState.model_json_schema(), strict=True)
-    emotional_state = EmotionalState(_key=character.name)
-
-    withheld_block = "".join(f"\n- {fact}" for fact in directive.withheld_info)
-    if withheld_block:
-        withheld_block = "\n[INFORMATION YOU DO NOT KNOW - never reference these facts]" + withheld_block
-
-    class NPCState(BaseModel):
-        messages: Annotated[list[AnyMessage], operator.add]
-        thoughts: str = Field(default="")
-        lore: str = Field(default="")
-        memories: str = Field(default="")
-        self_state: str = Field(default="", description="This NPC's live mechanical state, rendered prompt-ready.")
-        player_state: str = Field(default="", description="The player character's live mechanical state, rendered prompt-ready.")
-
-        @property
-        def combined_messages(self) -> list[AnyMessage]:
-            combo = [*conversation.message_buffer, *self.messages]
-            return combo[-min(settings.context_size, len(combo)):]
-
-        @property
-        def emotional_state(self) -> str:
-            raw = emotional_state.model_dump(exclude_unset=True)
-            return "\n".join(f"{k}: {v}" for k, v in raw.items())
-
-        @property
-        def combined_dump(self) -> dict:
-            return {
-                "name": character.name,
-                "description": character.description + withheld_block,
-                "other_characters": other_characters,
-                "player": conversation.player.description,
-                "player_name": conversation.player.name,
-                "location": conversation.campaign.location,
-                "story_background": conversation.campaign.story_background,
-                "messages": self.combined_messages,
-                "emotional_state": self.emotional_state,
-                "dm_guidance": directive.guidance,
-                **self.model_dump(exclude={"messages"}),
-            }
-
-    async def context_loader(state: NPCState) -> dict:
-        last_human = next((m for m in reversed(state.messages) if isinstance(m, HumanMessage)), None)
-        query = last_human.content if last_human else character.name
-        lore, memories = await asyncio.gather(
-            load_information(
-                query=query,
-                group_ids=[make_group_id("lore", conversation.campaign.lore_world)],
-                limit=info_limits.lore,
-            ),
-            load_information(
-                query=query,
-                group_ids=[make_memory_group_id(conversation.campaign.id, character.name)],
-                limit=info_limits.memories,
-            ),
+
+_mind_stats: dict[str, MindStats] = defaultdict(MindStats)
+
+
+def npc_mind_stats() -> dict[str, dict[str, Any]]:
+    """Latency and token cost of NPC preparation, split vs fused."""
+    return {mode: stats.snapshot() for mode, stats in _mind_stats.items()}
+
+
+@dataclass
+class NPCTurn:
+    """One NPC's part in one DM turn, handed to the shared NPC graph via config."""
+    character: CharacterModel
+    conversation: Conversation
+    directive: "NPCDirective"
+    persona: NPCPersona = field(init=False)
+    other_characters: str = field(init=False)
+    other_speakers: list[str] = field(init=False)
+    withheld_block: str = field(init=False)
+    mind_mode: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.persona = npc_persona(self.character)
+        self.mind_mode = npc_mind_mode(self.conversation.campaign.id)
+        roster = tuple((p.id, p.version) for p in map(npc_persona, self.conversation.characters))
+        self.other_characters = _other_characters(self.character.id, roster)
+        self.other_speakers = [
+            *(c.name for c in self.conversation.characters if c.id != self.character.id),
+            self.conversation.player.name,
+        ]
+        withheld = "".join(f"\n- {fact}" for fact in self.directive.withheld_info)
+        self.withheld_block = (
+            "\n[INFORMATION YOU DO NOT KNOW - never reference these facts]" + withheld if withheld else ""
         )
-        self_state = render_npc_state(conversation.campaign.id, character.id, character.name)
-        player_state = render_player_state(conversation.campaign.id, conversation.player.id)
+
+    @property
+    def emotional_state(self) -> EmotionalState:
+        return EmotionalState(_key=self.character.name)
+
+    def combined_messages(self, state: "NPCState") -> list[AnyMessage]:
+        """The raw last ``settings.context_size`` messages, for memory."""
+        return recent_messages(self.conversation, state.messages, settings.context_size)
+
+    def prompt_messages(self, state: "NPCState") -> list[AnyMessage]:
+        return assemble_context(self.conversation, state.messages, budget_tokens=CONTEXT_BUDGET_TOKENS)
+
+    def prompt_values(self, state: "NPCState") -> dict:
+        raw = self.emotional_state.model_dump(exclude_unset=True)
+        campaign = self.conversation.campaign
         return {
-            "lore": lore,
-            "memories": memories,
-            "self_state": self_state,
-            "player_state": player_state,
-            "messages": [],
+            "name": self.persona.name,
+            "description": self.persona.description + self.withheld_block,
+            "other_characters": self.other_characters,
+            "player": self.conversation.player.description,
+            "player_name": self.conversation.player.name,
+            "location": campaign.location,
+            "story_background": campaign.story_background,
+            "messages": self.prompt_messages(state),
+            "emotional_state": "\n".join(f"{k}: {v}" for k, v in raw.items()),
+            "dm_guidance": self.directive.guidance,
+            **state.model_dump(exclude={"messages", "prepare_only", "prepared"}),
         }
 
-    async def emotion_updater(state: NPCState) -> dict:
-        prompt = await emotions_prompt_template.ainvoke(state.combined_dump)
-        delta = await emotional_state_model.ainvoke(prompt)
-        logger.info(f"💖 Emotion delta for {character.name}: {delta}")
 
-        for field_name, value in delta.items():
-            current = getattr(emotional_state, field_name)
-            setattr(emotional_state, field_name, max(-20, min(20, current + value)))
+def npc_turn_config(character: CharacterModel, conversation: Conversation, directive: "NPCDirective") -> RunnableConfig:
+    """Config that runs the shared NPC graph as ``character`` for this turn.
+
+    Merged over the caller's config so callbacks and streaming still flow to
+    the DM graph the NPC runs inside.
+    """
+    config = ensure_config()
+    return {
+        **config,
+        "run_name": character.name,
+        "configurable": {
+            **config.get("configurable", {}),
+            NPC_TURN_KEY: NPCTurn(character, conversation, directive),
+        },
+    }
+
+
+def _turn(config: RunnableConfig) -> NPCTurn:
+    return config["configurable"][NPC_TURN_KEY]
+
+
+class NPCState(BaseModel):
+    messages: Annotated[list[AnyMessage], operator.add]
+    thoughts: str = Field(default="")
+    lore: str = Field(default="")
+    memories: str = Field(default="")
+    self_state: str = Field(default="", description="This NPC's live mechanical state, rendered prompt-ready.")
+    player_state: str = Field(default="", description="The player character's live mechanical state, rendered prompt-ready.")
+    prepare_only: bool = Field(default=False, description="Stop after the planner; narration runs separately.")
+    prepared: bool = Field(default=False, description="Context, emotions and thoughts are already in place.")
+
+
+async def context_loader(state: NPCState, config: RunnableConfig) -> dict:
+    turn = _turn(config)
+    character, conversation = turn.character, turn.conversation
+    last_human = next((m for m in reversed(state.messages) if isinstance(m, HumanMessage)), None)
+    query = last_human.content if last_human else character.name
+    lore, memories = await _claim_npc_context(character, conversation, query)
+    self_state = render_npc_state(conversation.campaign.id, character.id, character.name)
+    player_state = render_player_state(conversation.campaign.id, conversation.player.id)
+    return {
+        "lore": lore,
+        "memories": memories,
+        "self_state": self_state,
+        "player_state": player_state,
+        "messages": [],
+    }
+
+
+def _parsed(result: dict) -> Any:
+    """Unwrap an ``include_raw`` structured-output result, raising on a bad parse."""
+    if result.get("parsing_error") is not None:
+        raise result["parsing_error"]
+    return result["parsed"]
+
+
+def _apply_emotion_delta(turn: NPCTurn, delta: dict[str, int]) -> None:
+    logger.info(f"💖 Emotion delta for {turn.persona.name}: {delta}")
+    emotional_state = turn.emotional_state
+    for field_name, value in delta.items():
+        current = getattr(emotional_state, field_name)
+        setattr(emotional_state, field_name, max(-20, min(20, current + value)))
+
+
+def _tag_thoughts(name: str, thoughts: str | None) -> str:
+    tagged = f"## {name} THOUGHTS:\n{thoughts}"
+    logger.info(f"🧠 {name}: {tagged[:200]}...")
+    return tagged
+
+
+async def emotion_updater(state: NPCState, config: RunnableConfig) -> dict:
+    turn = _turn(config)
+    prompt = await prompts.ainvoke("npc-emotions", turn.prompt_values(state))
+    started = time.monotonic()
+    result = await resilient_invoke(_emotional_state_model(), prompt, policy="npc_emotions")
+    _mind_stats["split"].record(time.monotonic() - started, result["raw"], completes_turn=False)
+    _apply_emotion_delta(turn, _parsed(result))
+    return {"messages": []}
+
+
+async def planner(state: NPCState, config: RunnableConfig) -> dict:
+    turn = _turn(config)
+    prompt = await prompts.ainvoke("npc-plan", turn.prompt_values(state))
+    started = time.monotonic()
+    thoughts = await resilient_invoke(npc_thoughts, prompt, policy="npc_thoughts")
+    _mind_stats["split"].record(time.monotonic() - started, thoughts, completes_turn=True)
+    if thoughts.content is None:
+        logger.warning(f"🧠 {turn.persona.name} planner returned None")
+    return {"thoughts": _tag_thoughts(turn.persona.name, thoughts.content), "prepared": True, "messages": []}
+
+
+async def mind(state: NPCState, config: RunnableConfig) -> dict:
+    """Fused alternative to emotion_updater + planner: one structured call
+    on the planner prompt returns both the emotion delta and the thoughts."""
+    turn = _turn(config)
+    prompt = await prompts.ainvoke("npc-plan", turn.prompt_values(state))
+    prompt.messages.append(SystemMessage(content=FUSED_MIND_INSTRUCTION))
+    started = time.monotonic()
+    result = await resilient_invoke(_fused_mind_model(), prompt, policy="npc_mind")
+    _mind_stats["fused"].record(time.monotonic() - started, result["raw"], completes_turn=True)
+    reading: NPCMind = _parsed(result)
+    _apply_emotion_delta(turn, reading.emotion_delta.model_dump())
+    return {"thoughts": _tag_thoughts(turn.persona.name, reading.thoughts), "prepared": True, "messages": []}
+
+
+async def npc_narrator(state: NPCState, config: RunnableConfig) -> dict:
+    turn = _turn(config)
+    persona, conversation = turn.persona, turn.conversation
+    prompt = await prompts.ainvoke("npc-narrator", turn.prompt_values(state))
+    prefix = f"{persona.name}: "
+    prompt.messages.append(AIMessage(content=prefix))
+
+    response, content = await narrate_with_retry(prompt, persona.name, turn.other_speakers)
+    if not content:
+        logger.error(f"💀 {persona.name} skipping turn: no usable narration produced")
         return {"messages": []}
 
-    async def planner(state: NPCState) -> dict:
-        prompt = await plan_prompt_template.ainvoke(state.combined_dump)
-        thoughts = await npc_thoughts.ainvoke(prompt)
-        if thoughts.content is None:
-            logger.warning(f"🧠 {character.name} planner returned None")
-
-        tagged = f"## {character.name} THOUGHTS:\n{thoughts.content}"
-        logger.info(f"🧠 {character.name}: {tagged[:200]}...")
-        return {"thoughts": tagged, "messages": []}
-
-    async def npc_narrator(state: NPCState) -> dict:
-        prompt = await narrator_prompt_template.ainvoke(state.combined_dump)
-        prefix = f"{character.name}: "
-        prompt.messages.append(AIMessage(content=prefix))
-
-        response, content = await narrate_with_retry(prompt, character.name, other_speakers)
-        if not content:
-            logger.error(f"💀 {character.name} skipping turn: no usable narration produced")
-            return {"messages": []}
-
-        response.content = prefix + content
-        response.name = character.name
-        response.id = str(uuid4())
-        fire_and_forget(process_and_save_memory(
-            messages=state.combined_messages,
-            group_id=make_memory_group_id(conversation.campaign.id, character.name),
-            source_description=f"session:{conversation.campaign.lore_world}",
-            perspective=character_episodic_memory.compile(name=character.name, description=character.description),
-            character_name=character.name,
-            character_description=character.description,
-        ))
-        return {"messages": [response]}
+    response.content = prefix + content
+    response.name = persona.name
+    response.id = str(uuid4())
+    perspective = compile_text(
+        await prompts.atext("character-episodic-memory"),
+        name=persona.name,
+        description=persona.description,
+    )
+    fire_and_forget(process_and_save_memory(
+        messages=turn.combined_messages(state),
+        group_id=make_memory_group_id(conversation.campaign.id, persona.name),
+        source_description=f"session:{conversation.campaign.lore_world}",
+        perspective=perspective,
+        character_name=persona.name,
+        character_description=persona.description,
+    ))
+    return {"messages": [response]}
+
+
+@lru_cache(maxsize=1)
+def _emotional_state_model():
+    # include_raw keeps the AIMessage so token usage can be recorded.
+    return npc_emotions.with_structured_output(EmotionalState.model_json_schema(), strict=True, include_raw=True)
+
+
+@lru_cache(maxsize=1)
+def _fused_mind_model():
+    return npc_thoughts.with_structured_output(NPCMind, strict=True, include_raw=True)
+
+
+def _route_mind(state: NPCState, config: RunnableConfig) -> str:
+    return "mind" if _turn(config).mind_mode == "fused" else "emotion_updater"
 
+
+def _after_mind(state: NPCState) -> str:
+    return END if state.prepare_only else "npc_narrator"
+
+
+def build_npc_graph() -> CompiledStateGraph:
+    """Compile the NPC graph. Directed by the DM, so there is no veto.
+
+    The character, conversation and ``NPCDirective`` (``.guidance`` to focus
+    on, ``.withheld_info`` never to reveal) come from ``npc_turn_config``.
+
+    The graph runs in two stages so the DM executor can prepare several NPCs
+    at once: invoked with ``prepare_only=True`` it stops after the planner
+    (or the fused ``mind`` node, per ``NPC_MIND_MODE``); invoked again with
+    the ``PREPARED_FIELDS`` of that run it goes straight to narration.
+    """
     graph = StateGraph(NPCState)
-    for node in (context_loader, emotion_updater, planner, npc_narrator):
-        graph.add_node(node.__name__, node)
+    for node in (context_loader, emotion_updater, planner, mind, npc_narrator):
+        graph.add_node(node.__name__, instrument_node("npc", node.__name__, node))
 
-    graph.add_edge(START, "context_loader")
-    graph.add_edge("context_loader", "emotion_updater")
+    graph.add_conditional_edges(
+        START, lambda s: "npc_narrator" if s.prepared else "context_loader", ["context_loader", "npc_narrator"],
+    )
+    graph.add_conditional_edges("context_loader", _route_mind, ["emotion_updater", "mind"])
     graph.add_edge("emotion_updater", "planner")
-    graph.add_edge("planner", "npc_narrator")
+    graph.add_conditional_edges("planner", _after_mind, ["npc_narrator", END])
+    graph.add_conditional_edges("mind", _after_mind, ["npc_narrator", END])
     graph.add_edge("npc_narrator", END)
 
-    return graph.compile(name=character.name)
+    # NPC runs are nested in the DM's npc_executor node, which is the unit a
+    # resumed DM turn replays; they never checkpoint on their own.
+    return graph.compile(name="npc", checkpointer=False)
+
+
+@lru_cache(maxsize=1)
+def get_npc_graph() -> CompiledStateGraph:
+    """The process-wide compiled NPC graph."""
+    return build_npc_graph()
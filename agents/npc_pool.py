@@ -0,0 +1,298 @@
+"""🧩 Pre-generated NPC card pool for instant mid-scene introductions.
+
+Negotiating a fresh NPC with ``spawn_npc_builder`` takes several builder and
+reviewer rounds on the player's critical path. During idle time (no new turn
+for ``NPC_POOL_IDLE_S``) a background generator keeps up to
+``NPC_POOL_TARGET`` ready-made W++ cards per lore world, one archetype at a
+time, at ``BACKGROUND`` priority.
+
+When the DM introduces an NPC, ``claim_template`` scores the pool's tags
+against the ``NPCIntroduction.build_instructions``. The best card is adapted
+to the requested name and brief in one cheap call. When no card scores at
+least ``NPC_POOL_MIN_SCORE`` the caller falls back to the full negotiation.
+
+    NPC_POOL_ENABLED    0 disables both generation and claiming (default 1)
+    NPC_POOL_TARGET     ready cards kept per lore world (default 12)
+    NPC_POOL_IDLE_S     seconds without a new turn before generating (default 30)
+    NPC_POOL_POLL_S     how often the generator checks for idle time (default 15)
+    NPC_POOL_MIN_SCORE  tag-match score a card needs to be used (default 2)
+    NPC_POOL_BACKOFF_S  longest wait between rounds after repeated failures (default 900)
+"""
+import asyncio
+import os
+import re
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any
+
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel, Field
+from sqlalchemy import func
+
+from database.models import Campaign, NPCTemplate
+from database.postgres_connection import Session
+from utils.llm_governor import reported_tokens
+from utils.llm_models import npc_builder, npc_template_adapter
+from utils.llm_resilience import resilient_invoke
+from utils.prompts import prompts
+from utils.turn_timing import seconds_since_last_turn
+
+logger = getLogger(__name__)
+
+NPC_POOL_ENABLED = os.environ.get("NPC_POOL_ENABLED", "1").lower() not in ("0", "false", "no")
+NPC_POOL_TARGET = int(os.environ.get("NPC_POOL_TARGET", "12"))
+NPC_POOL_IDLE_S = float(os.environ.get("NPC_POOL_IDLE_S", "30"))
+NPC_POOL_POLL_S = float(os.environ.get("NPC_POOL_POLL_S", "15"))
+NPC_POOL_MIN_SCORE = int(os.environ.get("NPC_POOL_MIN_SCORE", "2"))
+NPC_POOL_BACKOFF_S = float(os.environ.get("NPC_POOL_BACKOFF_S", "900"))
+
+# Archetypes the pool is stocked with, each with the role words that point
+# to it in a DM's build instructions.
+ARCHETYPES: dict[str, tuple[str, ...]] = {
+    "innkeeper": ("innkeeper", "tavern", "barkeep", "bartender", "inn"),
+    "merchant": ("merchant", "trader", "shopkeeper", "peddler", "vendor"),
+    "guard": ("guard", "soldier", "watchman", "sentry", "patrol"),
+    "noble": ("noble", "lord", "lady", "aristocrat", "courtier"),
+    "priest": ("priest", "cleric", "acolyte", "monk", "temple"),
+    "thief": ("thief", "rogue", "pickpocket", "smuggler", "fence"),
+    "scholar": ("scholar", "sage", "librarian", "scribe", "archivist"),
+    "mercenary": ("mercenary", "sellsword", "bounty", "veteran", "hireling"),
+    "villager": ("villager", "farmer", "peasant", "herder", "miller"),
+    "sailor": ("sailor", "dockhand", "fisherman", "boatman", "pirate"),
+    "healer": ("healer", "herbalist", "physician", "midwife", "apothecary"),
+    "smith": ("blacksmith", "smith", "armorer", "craftsman", "forge"),
+    "bard": ("bard", "minstrel", "performer", "musician", "storyteller"),
+    "guide": ("guide", "ranger", "scout", "tracker", "hunter"),
+}
+
+
+class GeneratedCard(BaseModel):
+    """A reusable NPC card drafted for the pool."""
+    card: str = Field(description=(
+        f"Complete W++ character card. Use the literal placeholder {NPCTemplate.NAME_PLACEHOLDER} "
+        "wherever the character's name appears."))
+    tags: list[str] = Field(description="3-8 lowercase single-word role/trait keywords for this character.")
+
+
+@dataclass
+class PoolStats:
+    hits: int = 0
+    misses: int = 0
+    generated: int = 0
+    generation_failures: int = 0
+    generation_tokens: int = 0
+    adaptation_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        claims = self.hits + self.misses
+        return self.hits / claims if claims else 0.0
+
+
+_stats = PoolStats()
+_generator: asyncio.Task | None = None
+
+
+def npc_pool_stats() -> dict[str, Any]:
+    """Pool size per lore world, hit rate, and tokens spent generating and adapting."""
+    with Session() as s:
+        sizes = dict(
+            s.query(NPCTemplate.lore_world, func.count(NPCTemplate.id)).group_by(NPCTemplate.lore_world).all()
+        )
+    return {
+        "enabled": NPC_POOL_ENABLED,
+        "pool_size": sizes,
+        "target_per_world": NPC_POOL_TARGET,
+        "hits": _stats.hits,
+        "misses": _stats.misses,
+        "hit_rate": round(_stats.hit_rate, 3),
+        "generated": _stats.generated,
+        "generation_failures": _stats.generation_failures,
+        "generation_tokens": _stats.generation_tokens,
+        "mean_generation_tokens": round(_stats.generation_tokens / _stats.generated) if _stats.generated else None,
+        "adaptation_tokens": _stats.adaptation_tokens,
+    }
+
+
+def _words(text: str) -> set[str]:
+    return set(re.findall(r"[a-z]+", text.lower()))
+
+
+def _score(template: NPCTemplate, words: set[str]) -> int:
+    """Tag words found in the brief; naming the archetype itself counts double."""
+    return len(set(template.tags) & words) + (template.archetype in words)
+
+
+# ------------------------------------------------------------------
+# Claiming
+# ------------------------------------------------------------------
+
+async def _builder_prompt(world_name: str, request: str) -> Any:
+    return await prompts.ainvoke("npc-builder", {
+        "messages": [HumanMessage(content=request)],
+        "world_name": world_name,
+        "existing_lore_context": "",
+    })
+
+
+async def claim_template(world_name: str, name: str, build_instructions: str) -> str | None:
+    """Take the best-matching pooled card and adapt it to ``name`` and the brief.
+
+    Returns the adapted W++ card, or None when nothing in the pool fits.
+    """
+    if not NPC_POOL_ENABLED:
+        return None
+    words = _words(build_instructions)
+    # Its own session: the row lock, delete and rollback must not touch
+    # whatever a concurrent turn has pending on the shared one.
+    with Session() as s:
+        candidates = s.query(NPCTemplate).filter(NPCTemplate.lore_world == world_name).all()
+        scored = sorted(((_score(t, words), t.id) for t in candidates), reverse=True)
+        template = None
+        for score, template_id in scored:
+            if score < NPC_POOL_MIN_SCORE:
+                break
+            # Another worker may be claiming the same card; take the next one.
+            template = (
+                s.query(NPCTemplate)
+                .filter(NPCTemplate.id == template_id)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if template is not None:
+                break
+        if template is None:
+            _stats.misses += 1
+            logger.info(f"🧩 No pooled card fits '{name}' ({len(candidates)} in pool, hit rate {_stats.hit_rate:.0%})")
+            return None
+
+        card = template.card.replace(NPCTemplate.NAME_PLACEHOLDER, name)
+        archetype = template.archetype
+        s.delete(template)
+        s.commit()
+
+    prompt = await _builder_prompt(world_name, (
+        f"Here is a finished W++ character card for '{name}':\n\n{card}\n\n"
+        f"Lightly adapt it so it fits this brief, keeping everything that already fits:\n{build_instructions}\n\n"
+        f"The name must stay exactly '{name}'. Reply with only the complete adapted W++ card."
+    ))
+    try:
+        response = await resilient_invoke(npc_template_adapter, prompt, policy="npc_template_adapter")
+    except Exception:
+        logger.exception(f"💥 Adapting pooled {archetype} card for '{name}' failed, using it unadapted")
+        response = None
+    _stats.adaptation_tokens += reported_tokens(response) or 0
+    if response is not None and response.content.strip():
+        card = response.content.strip()
+    _stats.hits += 1
+    logger.info(f"🧩 '{name}' built from a pooled {archetype} card (hit rate {_stats.hit_rate:.0%})")
+    return card
+
+
+# ------------------------------------------------------------------
+# Background generation
+# ------------------------------------------------------------------
+
+async def generate_template(world_name: str, archetype: str) -> NPCTemplate | None:
+    """Draft one reusable card of ``archetype`` for the world's pool."""
+    structured = npc_builder.with_structured_output(GeneratedCard, include_raw=True)
+    prompt = await _builder_prompt(world_name, (
+        f"Design a reusable {archetype} NPC for this world, ready to drop into any scene. "
+        f"Do not call any tools. Write the complete W++ card, using the placeholder "
+        f"{NPCTemplate.NAME_PLACEHOLDER} in place of the character's name."
+    ))
+    try:
+        result = await resilient_invoke(structured, prompt, policy="npc_template_generator")
+    except Exception:
+        _stats.generation_failures += 1
+        logger.exception(f"💥 Generating a pooled {archetype} card for world '{world_name}' failed")
+        return None
+    tokens = reported_tokens(result.get("raw")) or 0
+    _stats.generation_tokens += tokens
+    parsed: GeneratedCard | None = result["parsed"]
+    if parsed is None or NPCTemplate.NAME_PLACEHOLDER not in parsed.card:
+        _stats.generation_failures += 1
+        logger.warning(f"⚠️ Pooled {archetype} card for world '{world_name}' was unusable, discarding")
+        return None
+
+    tags = sorted(set(ARCHETYPES[archetype]) | {t.strip().lower() for t in parsed.tags if t.strip()})
+    template = NPCTemplate(
+        lore_world=world_name, archetype=archetype, tags=tags, card=parsed.card, generation_tokens=tokens,
+    )
+    with Session() as s:
+        s.add(template)
+        s.commit()
+        s.refresh(template)
+    _stats.generated += 1
+    logger.info(f"🧩 Pooled a {archetype} card for world '{world_name}' ({tokens} tokens)")
+    return template
+
+
+def _next_to_generate() -> tuple[str, str] | None:
+    """The (world, archetype) most in need of a card: the emptiest world's
+    scarcest archetype, or None when every world is at target."""
+    with Session() as s:
+        worlds = [w for (w,) in s.query(Campaign.lore_world).distinct().all()]
+        counts = s.query(
+            NPCTemplate.lore_world, NPCTemplate.archetype, func.count(NPCTemplate.id),
+        ).group_by(NPCTemplate.lore_world, NPCTemplate.archetype).all()
+    per_world = {w: {a: 0 for a in ARCHETYPES} for w in worlds}
+    for world, archetype, count in counts:
+        if world in per_world and archetype in per_world[world]:
+            per_world[world][archetype] = count
+    below = [(sum(c.values()), w) for w, c in per_world.items() if sum(c.values()) < NPC_POOL_TARGET]
+    if not below:
+        return None
+    _, world = min(below)
+    archetype = min(per_world[world], key=per_world[world].get)
+    return world, archetype
+
+
+def _retry_delay(failures: int) -> float:
+    if not failures:
+        return NPC_POOL_POLL_S
+    return min(NPC_POOL_POLL_S * 2 ** min(failures, 16), NPC_POOL_BACKOFF_S)
+
+
+async def _generate_when_idle() -> None:
+    # Consecutive failed rounds; each one doubles the wait before the next,
+    # so a broken model or prompt is not retried every poll.
+    failures = 0
+    while True:
+        await asyncio.sleep(_retry_delay(failures))
+        if seconds_since_last_turn() < NPC_POOL_IDLE_S:
+            continue
+        try:
+            target = _next_to_generate()
+            if target is None:
+                failures = 0
+                continue
+            failed = await generate_template(*target) is None
+        except Exception:
+            logger.exception("💥 NPC pool generation round failed")
+            failed = True
+        if failed:
+            failures += 1
+            logger.warning(
+                f"⚠️ NPC pool generation failed {failures} time(s) in a row, next try in {_retry_delay(failures):.0f}s"
+            )
+        else:
+            failures = 0
+
+
+def start_pool_generator() -> None:
+    global _generator
+    if NPC_POOL_ENABLED and _generator is None:
+        _generator = asyncio.create_task(_generate_when_idle())
+        logger.info(f"🧩 NPC pool generator started (target {NPC_POOL_TARGET} cards per lore world)")
+
+
+async def stop_pool_generator() -> None:
+    global _generator
+    if _generator is not None:
+        _generator.cancel()
+        try:
+            await _generator
+        except asyncio.CancelledError:
+            pass
+        _generator = None
@@ -1,13 +1,10 @@
 """Generic lore-aware tool-loop agent, specialized as the lore creator and NPC builder."""
-import asyncio
 import operator
 from logging import getLogger
 from typing import Annotated, Literal
 
-import openai
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate
 from langgraph.graph import END, START, StateGraph
 from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel
@@ -26,7 +23,8 @@ from tools.lore_management import (
 )
 from tools.npc_management import create_character
 from utils.llm_models import lore_creator, npc_builder
-from utils.prompts import lore_creator_prompt_template, npc_builder_prompt_template
+from utils.llm_resilience import resilient_invoke
+from utils.prompts import prompts
 
 info_limits = settings.graphiti.information_limits
 
@@ -43,24 +41,6 @@ LORE_TOOLS = [
 ]
 BUILDER_TOOLS = [search_lore, search_entities, create_character]
 
-# Model call resilience: the nano-gpt endpoint intermittently returns a
-# server-side "Request timed out" SSE error (raised as openai.APIError) or
-# silently stalls. Give each attempt a generous 3-minute cap and retry with
-# backoff so a single flaky call doesn't kill the whole turn.
-MODEL_TIMEOUT_S = 180.0
-MODEL_MAX_ATTEMPTS = 3
-MODEL_BACKOFF_S = (10.0, 20.0)
-
-# Permanent client errors — retrying won't change the outcome, so fail fast.
-_NON_RETRYABLE_API_ERRORS = (
-    openai.BadRequestError,
-    openai.AuthenticationError,
-    openai.PermissionDeniedError,
-    openai.NotFoundError,
-    openai.UnprocessableEntityError,
-    openai.ConflictError,
-)
-
 
 class ToolAgentState(BaseModel):
     messages: Annotated[list[AnyMessage], operator.add]
@@ -72,7 +52,7 @@ def spawn_tool_agent(
     world_name: str,
     *,
     tools: list,
-    prompt_template: ChatPromptTemplate,
+    prompt_name: str,
     model: BaseChatModel,
     name: str,
 ) -> StateGraph:
@@ -103,49 +83,14 @@ def spawn_tool_agent(
         logger.info(f"🌍 [{name}] Loaded {len(context.splitlines())} lore facts for world '{world_name}'")
         return {"messages": [], "world_name": world_name, "existing_lore_context": context}
 
-    async def _invoke_model_with_retry(bound_model, prompt):
-        """Call ``bound_model.ainvoke(prompt)`` with a 3-minute per-attempt cap
-        and retry-with-backoff on transient upstream failures (timeouts,
-        connection errors, server-side 'Request timed out' APIErrors).
-
-        Permanent client errors (4xx) are re-raised immediately. After
-        ``MODEL_MAX_ATTEMPTS`` transient failures the last error is re-raised
-        so langfuse/langgraph still record the failure.
-        """
-        last_exc: Exception | None = None
-        for attempt in range(1, MODEL_MAX_ATTEMPTS + 1):
-            try:
-                return await asyncio.wait_for(
-                    bound_model.ainvoke(prompt), timeout=MODEL_TIMEOUT_S
-                )
-            except _NON_RETRYABLE_API_ERRORS as e:
-                logger.error(f"🤖 [{name}] model call hit non-retryable {type(e).__name__}: {e}")
-                raise
-            except (openai.APIError, asyncio.TimeoutError) as e:
-                last_exc = e
-                if attempt >= MODEL_MAX_ATTEMPTS:
-                    logger.error(
-                        f"🤖 [{name}] model call failed after {attempt}/{MODEL_MAX_ATTEMPTS} "
-                        f"attempts: {type(e).__name__}: {e}"
-                    )
-                    raise
-                backoff = MODEL_BACKOFF_S[min(attempt - 1, len(MODEL_BACKOFF_S) - 1)]
-                logger.warning(
-                    f"🤖 [{name}] model call attempt {attempt}/{MODEL_MAX_ATTEMPTS} "
-                    f"failed ({type(e).__name__}: {e}); retrying in {backoff:.0f}s"
-                )
-                await asyncio.sleep(backoff)
-        # Defensive: should be unreachable.
-        raise last_exc or RuntimeError(f"[{name}] model invoke failed without exception")
-
     async def agent(state: ToolAgentState) -> dict:
         """🧠 LLM agent that converses, asks follow-ups, and uses its tools."""
-        prompt = await prompt_template.ainvoke({
+        prompt = await prompts.ainvoke(prompt_name, {
             "messages": state.messages,
             "world_name": state.world_name,
             "existing_lore_context": state.existing_lore_context,
         })
-        response = await _invoke_model_with_retry(model.bind_tools(tools), prompt)
+        response = await resilient_invoke(model.bind_tools(tools), prompt, policy=name)
         logger.info(f"🤖 [{name}] response for world '{world_name}', tool_calls={bool(response.tool_calls)}")
         return {"messages": [response]}
 
@@ -171,7 +116,7 @@ def spawn_lore_creator(world_name: str) -> StateGraph:
     return spawn_tool_agent(
         world_name,
         tools=LORE_TOOLS,
-        prompt_template=lore_creator_prompt_template,
+        prompt_name="lore-creator",
         model=lore_creator,
         name="lore_creator",
     )
@@ -182,7 +127,7 @@ def spawn_npc_builder(world_name: str) -> StateGraph:
     return spawn_tool_agent(
         world_name,
         tools=BUILDER_TOOLS,
-        prompt_template=npc_builder_prompt_template,
+        prompt_name="npc-builder",
         model=npc_builder,
         name="npc_builder",
     )
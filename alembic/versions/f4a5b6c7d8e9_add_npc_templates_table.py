@@ -0,0 +1,44 @@
+"""add npc templates table
+
+Per-lore-world pool of pre-generated NPC cards, filled in the background and
+claimed (deleted) when the DM introduces an NPC that matches one.
+
+Revision ID: f4a5b6c7d8e9
+Revises: e3f4a5b6c7d8
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a5b6c7d8e9'
+down_revision: Union[str, Sequence[str], None] = 'e3f4a5b6c7d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'npc_templates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('lore_world', sa.String(), nullable=False),
+        sa.Column('archetype', sa.String(), nullable=False),
+        sa.Column('tags', JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+        sa.Column('card', sa.Text(), nullable=False),
+        sa.Column('generation_tokens', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_npc_templates_lore_world'), 'npc_templates', ['lore_world'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_npc_templates_lore_world'), table_name='npc_templates')
+    op.drop_table('npc_templates')
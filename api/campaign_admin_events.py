@@ -1,22 +1,41 @@
 import logging
+from functools import lru_cache
 
 import socketio
 from langchain_core.messages import AIMessage, AIMessageChunk, AnyMessage, HumanMessage, ToolMessage, ToolMessageChunk
 from langchain_core.runnables import RunnableConfig
 
 from agents.campaign_admin import spawn_campaign_admin
+from api.session_store import (
+    ChatSessionState,
+    bind_session_key,
+    dump_messages,
+    load_messages,
+    load_state,
+    open_chat_state,
+    save_state,
+    session_key,
+)
 from hephaestus.langfuse_handler import langfuse_callback_handler
+from utils.stream_coalescing import TokenCoalescer
 
 logger = logging.getLogger(__name__)
 
 CAMPAIGN_ADMIN_NS = "/campaign-admin"
 
 
+@lru_cache(maxsize=32)
+def _admin_graph(campaign_id: int):
+    """Campaign admin graphs hold no state of their own; one per campaign per worker."""
+    return spawn_campaign_admin(campaign_id)
+
+
 def register_campaign_admin_events(sio: socketio.AsyncServer) -> None:
     """Register Socket.IO event handlers on the /campaign-admin namespace."""
 
     @sio.event(namespace=CAMPAIGN_ADMIN_NS)
-    async def connect(sid: str, environ: dict[str, object]) -> None:
+    async def connect(sid: str, environ: dict[str, object], auth: object = None) -> None:
+        await bind_session_key(sio, sid, auth, namespace=CAMPAIGN_ADMIN_NS)
         logger.info(f"🔌 [campaign-admin] Client connected: {sid}")
 
     @sio.event(namespace=CAMPAIGN_ADMIN_NS)
@@ -48,19 +67,15 @@ def register_campaign_admin_events(sio: socketio.AsyncServer) -> None:
             return
 
         try:
-            graph = spawn_campaign_admin(campaign_id_int)
-            await sio.save_session(sid, {
-                "graph": graph,
-                "campaign_id": campaign_id_int,
-                "history": [],
-            }, namespace=CAMPAIGN_ADMIN_NS)
+            _admin_graph(campaign_id_int)
+            await open_chat_state(sio, sid, CAMPAIGN_ADMIN_NS, campaign_id=campaign_id_int)
 
             logger.info(
                 f"📋 [campaign-admin] Session initialized for campaign {campaign_id_int} (sid={sid})"
             )
             await sio.emit(
                 "campaign_admin_session_ready",
-                {"campaign_id": campaign_id_int},
+                {"campaign_id": campaign_id_int, "session_key": await session_key(sio, sid, CAMPAIGN_ADMIN_NS)},
                 to=sid,
                 namespace=CAMPAIGN_ADMIN_NS,
             )
@@ -82,12 +97,8 @@ def register_campaign_admin_events(sio: socketio.AsyncServer) -> None:
 
         logger.info(f"💬 [campaign-admin] message from {sid}: {str(content)[:120]}")
 
-        sock_session = await sio.get_session(sid, namespace=CAMPAIGN_ADMIN_NS)
-        graph = sock_session.get("graph")
-        history: list[AnyMessage] = sock_session.get("history", [])
-        campaign_id: int = sock_session.get("campaign_id", 0)
-
-        if graph is None:
+        state = await load_state(sio, sid, ChatSessionState, namespace=CAMPAIGN_ADMIN_NS)
+        if state is None or state.campaign_id is None:
             await sio.emit(
                 "error",
                 {"message": "No campaign admin session active. Call init_campaign_admin_session first."},
@@ -96,11 +107,17 @@ def register_campaign_admin_events(sio: socketio.AsyncServer) -> None:
             )
             return
 
+        campaign_id = state.campaign_id
+        graph = _admin_graph(campaign_id)
+        history: list[AnyMessage] = load_messages(state.history)
         human_msg = HumanMessage(content=str(content))
         history.append(human_msg)
 
         config = RunnableConfig(callbacks=[langfuse_callback_handler])
         collected_text = ""
+        tokens = TokenCoalescer(
+            sio, "campaign_admin_token", {}, to=sid, namespace=CAMPAIGN_ADMIN_NS, stream="campaign_admin",
+        )
 
         try:
             stream = graph.astream(
@@ -118,17 +135,13 @@ def register_campaign_admin_events(sio: socketio.AsyncServer) -> None:
                     if msg.content:
                         token = str(msg.content)
                         collected_text += token
-                        await sio.emit(
-                            "campaign_admin_token",
-                            {"token": token},
-                            to=sid,
-                            namespace=CAMPAIGN_ADMIN_NS,
-                        )
+                        await tokens.push(token)
 
                 elif isinstance(msg, (ToolMessage, ToolMessageChunk)):
                     tool_content = str(msg.content) if msg.content else ""
                     # Any tool that reports success changed campaign state; tell
                     # the UI so it can refresh its cached campaign view.
+                    await tokens.flush()
                     if tool_content.startswith("✅"):
                         await sio.emit(
                             "campaign_admin_updated",
@@ -143,11 +156,8 @@ def register_campaign_admin_events(sio: socketio.AsyncServer) -> None:
             if collected_text:
                 history.append(AIMessage(content=collected_text))
 
-            await sio.save_session(sid, {
-                "graph": graph,
-                "campaign_id": campaign_id,
-                "history": history,
-            }, namespace=CAMPAIGN_ADMIN_NS)
+            state.history = dump_messages(history)
+            await save_state(sio, sid, state, namespace=CAMPAIGN_ADMIN_NS)
 
         except Exception:
             logger.exception(f"💥 [campaign-admin] Stream error for sid={sid}")
@@ -158,5 +168,6 @@ def register_campaign_admin_events(sio: socketio.AsyncServer) -> None:
                 namespace=CAMPAIGN_ADMIN_NS,
             )
         finally:
+            await tokens.close()
             await sio.emit("campaign_admin_done", {}, to=sid, namespace=CAMPAIGN_ADMIN_NS)
             logger.debug(f"🏁 [campaign-admin] campaign_admin_done emitted for sid={sid}")
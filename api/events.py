@@ -1,24 +1,66 @@
+import asyncio
 import logging
+import time
 from uuid import uuid4
 
 import socketio
 from langchain_core.messages import HumanMessage
 from langchain_core.runnables import RunnableConfig
 
-from agents.dungeon_master import NARRATOR_NAME, spawn_dungeon_master
+from agents.dungeon_master import NARRATOR_NAME, dm_session_config, get_dungeon_master
+from agents.dungeon_master.checkpoints import (
+    mark_turn_done,
+    mark_turn_running,
+    prune_turns,
+    resumable_turn,
+    turn_checkpoint_config,
+)
+from api.session_store import (
+    SESSION_WINDOW,
+    GameSessionState,
+    bind_session_key,
+    dump_messages,
+    load_messages,
+    load_state,
+    save_state,
+    session_key,
+)
 from api.stream_handler import SocketStreamHandler
+from api.turns import retract_turn, run_owned_turn
 from database.models.conversation import Conversation
 from database.postgres_connection import session as db_session
 from hephaestus.langfuse_handler import langfuse_callback_handler
+from utils.turn_scope import open_scope
+from utils.turn_timing import TURN_TIMING_DEBUG, start_turn
 
 logger = logging.getLogger(__name__)
 
+# Messages loaded from the database for a session with no stored window.
+INIT_WINDOW = 12
+
+
+def _restore_buffer(conversation: Conversation, state: GameSessionState | None) -> None:
+    """Seed the agents' message window from the stored session, else the DB."""
+    if state is not None and state.conversation_id == conversation.id and state.message_window:
+        conversation.message_buffer = load_messages(state.message_window)
+        return
+    lc_messages = conversation.langchain_messages()
+    conversation.message_buffer = lc_messages[-min(INIT_WINDOW, len(lc_messages)):]
+
+
+def _game_state(conversation: Conversation) -> GameSessionState:
+    return GameSessionState(
+        conversation_id=conversation.id,
+        message_window=dump_messages(conversation.message_buffer[-SESSION_WINDOW:]),
+    )
+
 
 def register_events(sio: socketio.AsyncServer) -> None:
     """Register all Socket.IO event handlers on the given server instance."""
 
     @sio.event
-    async def connect(sid: str, environ: dict[str, object]) -> None:
+    async def connect(sid: str, environ: dict[str, object], auth: object = None) -> None:
+        await bind_session_key(sio, sid, auth)
         logger.info(f"🔌 Client connected: {sid}")
 
     @sio.event
@@ -29,8 +71,9 @@ def register_events(sio: socketio.AsyncServer) -> None:
     async def init_session(sid: str, data: dict[str, object]) -> None:
         """Initialise a game session from a conversation_id.
 
-        Loads the Conversation from DB, builds the agent graph, and
-        stores both in the SocketIO session for this client.
+        Loads the Conversation from DB and stores its id and message window
+        in the session store, so any worker can serve this client's next
+        message. The DM graph itself is shared by all sessions.
         """
 
         conversation_id = data.get("conversation_id")
@@ -38,31 +81,28 @@ def register_events(sio: socketio.AsyncServer) -> None:
             await sio.emit("error", {"message": "conversation_id is required."}, to=sid)
             return
 
+        started = time.monotonic()
         try:
             conversation = db_session.query(Conversation).filter(Conversation.id == conversation_id).first()
             if conversation is None:
                 await sio.emit("error", {"message": f"Conversation {conversation_id} not found."}, to=sid)
                 return
 
-            lc_messages = conversation.langchain_messages()
-            window = min(12, len(lc_messages))
-            conversation.message_buffer = lc_messages[-window:]
-
-            graph = spawn_dungeon_master(conversation, sio=sio, sid=sid)
-
-            await sio.save_session(sid, {
-                "conversation": conversation,
-                "graph": graph,
-            })
+            _restore_buffer(conversation, await load_state(sio, sid, GameSessionState))
+            await save_state(sio, sid, _game_state(conversation))
 
             character_list = [c.name for c in conversation.characters]
             logger.info(f"🎮 init_session from {sid}: player={conversation.player.name} characters={character_list}")
 
-            await sio.emit("session_ready", {
+            ready = {
                 "conversation_id": conversation.id,
                 "player": {"id": conversation.player.id, "name": conversation.player.name},
                 "characters": [{"id": c.id, "name": c.name} for c in conversation.characters],
-            }, to=sid)
+                "session_key": await session_key(sio, sid),
+            }
+            if TURN_TIMING_DEBUG:
+                ready["timing"] = {"init_s": round(time.monotonic() - started, 3)}
+            await sio.emit("session_ready", ready, to=sid)
 
         except Exception:
             logger.exception(f"💥 Failed to init session for sid={sid}")
@@ -70,86 +110,106 @@ def register_events(sio: socketio.AsyncServer) -> None:
 
     @sio.event
     async def send_message(sid: str, data: dict[str, object]) -> None:
-        """Handle a user chat message: stream the dungeon master response back."""
+        """Handle a user chat message: stream the dungeon master response back.
+
+        ``preempt: true`` cancels the conversation's running turn instead of
+        queueing behind it.
+        """
         content = data.get("content", "")
         if not content:
             return
 
         logger.info(f"💬 send_message from {sid}: {content[:120]}")
 
-        sock_session = await sio.get_session(sid)
-        conversation: Conversation | None = sock_session.get("conversation")
-        graph = sock_session.get("graph")
-
+        state = await load_state(sio, sid, GameSessionState)
+        conversation_id = state.conversation_id if state is not None else data.get("conversation_id")
+        conversation = db_session.query(Conversation).filter(Conversation.id == conversation_id).first()
         if conversation is None:
-            conversation = db_session.query(Conversation).filter(Conversation.id == data.get("conversation_id")).first()
-            if conversation is None:
-                logger.error(f"❌ No conversation found for sid={sid}")
-                await sio.emit("error", {"message": "No conversation found."}, to=sid)
-                return
-            await sio.save_session(sid, {
-                "conversation": conversation,
-            })
+            logger.error(f"❌ No conversation found for sid={sid}")
+            await sio.emit("error", {"message": "No conversation found."}, to=sid)
+            return
+        if not conversation.message_buffer:
+            # First message this worker serves for the table (or it restarted).
+            _restore_buffer(conversation, state)
         if conversation.id != data.get("conversation_id"):
             logger.error(f"❌ Conversation ID mismatch for sid={sid}")
             await sio.emit("error", {"message": "Conversation ID mismatch."}, to=sid)
             return
-        if graph is None:
-            logger.warning(f"🔄 No graph found for sid={sid}, spawning new graph")
-            graph = spawn_dungeon_master(conversation, sio=sio, sid=sid)
-            await sio.save_session(sid, {
-                "conversation": conversation,
-                "graph": graph,
-            })
-
-        msg_id = str(uuid4())
-        await sio.emit("message_created", {"messageId": msg_id}, to=sid)
-        logger.info(f"🪪 message_created emitted: id={msg_id}")
-
 
-        # NPC build negotiation loops add several super-steps per introduced
-        # NPC, so the default recursion limit of 25 is too tight.
-        config = RunnableConfig(callbacks=[langfuse_callback_handler], recursion_limit=80)
-
-        try:
-            stream = graph.astream(
-                {"messages": [HumanMessage(content=content, name=conversation.player.name, id=msg_id)]},
-                stream_mode="messages",
-                config=config,
-                subgraphs=True,
+        async def run_turn() -> None:
+            dungeon_master = get_dungeon_master()
+            # A turn cut short by a crash resumes when the player re-sends it:
+            # same turn id, and no input so the graph continues from its checkpoint.
+            resumed = await resumable_turn(dungeon_master, conversation.id, content)
+            msg_id = resumed.turn_id if resumed else str(uuid4())
+            await sio.emit("message_created", {"messageId": msg_id}, to=sid)
+            logger.info(f"🪪 message_created emitted: id={msg_id}")
+
+            # NPC build negotiation loops add several super-steps per introduced
+            # NPC, so the default recursion limit of 25 is too tight.
+            config = dm_session_config(
+                conversation, sio=sio, sid=sid,
+                config=turn_checkpoint_config(
+                    conversation.id, msg_id,
+                    RunnableConfig(callbacks=[langfuse_callback_handler], recursion_limit=80),
+                ),
             )
-
-            pre_ai_count = sum(1 for m in conversation.messages if m.role == "ai")
-
-            character_list = [c.name for c in conversation.characters]
-            handler = SocketStreamHandler(sio, sid, character_list)
-            await handler.process(stream)
-
-            # NPC bubbles already stream with the same UUID that gets persisted,
-            # so only DM narrator messages need their ids remapped.
-            if handler.message_ids:
-                new_ai_msgs = [m for m in conversation.messages if m.role == "ai"][pre_ai_count:]
-                narrator_msgs = [m for m in new_ai_msgs if m.speaker_name == NARRATOR_NAME]
-                id_map = [
-                    {"oldId": stream_id, "newId": str(db_msg.id)}
-                    for stream_id, db_msg in zip(handler.message_ids, narrator_msgs)
-                ]
-                if id_map:
-                    await sio.emit("messages_persisted", {"mapping": id_map}, to=sid)
-
-            if getattr(conversation, "_npcs_introduced", False):
-                conversation._npcs_introduced = False
-                graph = spawn_dungeon_master(conversation, sio=sio, sid=sid)
-                await sio.save_session(sid, {
-                    "conversation": conversation,
-                    "graph": graph,
-                })
-                logger.info(f"🔄 Graph rebuilt after NPC introduction for sid={sid}")
-
-        except Exception:
-            logger.exception(f"💥 Stream error for sid={sid}")
-            await sio.emit(
-                "error",
-                {"message": "The AI connection was interrupted. Please try again."},
-                to=sid,
+            graph_input = None if resumed else {
+                "messages": [HumanMessage(content=content, name=conversation.player.name, id=msg_id)],
+            }
+
+            await mark_turn_running(conversation.id, msg_id)
+            scope = open_scope(conversation.id, msg_id)
+            try:
+                start_turn()
+                stream = dungeon_master.astream(
+                    graph_input,
+                    stream_mode="messages",
+                    config=config,
+                    subgraphs=True,
+                )
+
+                pre_ai_count = sum(1 for m in conversation.messages if m.role == "ai")
+
+                character_list = [c.name for c in conversation.characters]
+                handler = SocketStreamHandler(sio, sid, character_list)
+                await handler.process(stream)
+
+                # NPC bubbles already stream with the same UUID that gets persisted,
+                # so only DM narrator messages need their ids remapped.
+                if handler.message_ids:
+                    new_ai_msgs = [m for m in conversation.messages if m.role == "ai"][pre_ai_count:]
+                    narrator_msgs = [m for m in new_ai_msgs if m.speaker_name == NARRATOR_NAME]
+                    id_map = [
+                        {"oldId": stream_id, "newId": str(db_msg.id)}
+                        for stream_id, db_msg in zip(handler.message_ids, narrator_msgs)
+                    ]
+                    if id_map:
+                        await sio.emit("messages_persisted", {"mapping": id_map}, to=sid)
+
+                await prune_turns(conversation.id, msg_id)
+
+            except asyncio.CancelledError:
+                await retract_turn(sio, sid, scope)
+                raise
+            except Exception:
+                logger.exception(f"💥 Stream error for sid={sid}")
+                await sio.emit(
+                    "error",
+                    {"message": "The AI connection was interrupted. Please try again."},
+                    to=sid,
+                )
+            finally:
+                await mark_turn_done(conversation.id, msg_id)
+
+        async def on_queued(position: int) -> None:
+            await sio.emit("turn_queued", {"position": position}, to=sid)
+
+        # One turn per conversation: queue behind the running one, or cancel
+        # it when the client asks to preempt (e.g. a correction).
+        try:
+            await run_owned_turn(
+                conversation.id, run_turn, preempt=bool(data.get("preempt")), on_queued=on_queued,
             )
+        finally:
+            await save_state(sio, sid, _game_state(conversation))
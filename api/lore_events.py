@@ -1,22 +1,60 @@
 import logging
+from functools import lru_cache
 
 import socketio
 from langchain_core.messages import AIMessage, AIMessageChunk, AnyMessage, HumanMessage, ToolMessage, ToolMessageChunk
 from langchain_core.runnables import RunnableConfig
 
 from agents.tool_agent import spawn_lore_creator
+from api.session_store import (
+    ChatSessionState,
+    bind_session_key,
+    dump_messages,
+    load_messages,
+    load_state,
+    open_chat_state,
+    save_state,
+    session_key,
+)
 from hephaestus.langfuse_handler import langfuse_callback_handler
+from tools.ingestion_jobs import IngestionEntry, IngestionJob, add_progress_listener
+from utils.stream_coalescing import TokenCoalescer
 
 logger = logging.getLogger(__name__)
 
 LORE_NS = "/lore"
 
 
+@lru_cache(maxsize=32)
+def _lore_graph(world_name: str):
+    """Lore creator graphs hold no state of their own; one per world per worker."""
+    return spawn_lore_creator(world_name)
+
+
+def world_room(world_name: str) -> str:
+    """Socket.IO room for every /lore client working on *world_name*."""
+    return f"lore_world:{world_name}"
+
+
 def register_lore_events(sio: socketio.AsyncServer) -> None:
     """Register Socket.IO event handlers on the /lore namespace."""
 
+    async def emit_ingest_progress(job: IngestionJob, entry: IngestionEntry) -> None:
+        """📦 Broadcast one entry's status change to everyone watching the world."""
+        await sio.emit("lore_ingest_progress", {
+            "job_id": job.job_id,
+            "world_name": job.world_name,
+            "entry": entry.model_dump(mode="json"),
+            "counts": job.counts,
+            "total": len(job.entries),
+            "finished": job.finished,
+        }, room=world_room(job.world_name), namespace=LORE_NS)
+
+    add_progress_listener(emit_ingest_progress)
+
     @sio.event(namespace=LORE_NS)
-    async def connect(sid: str, environ: dict[str, object]) -> None:
+    async def connect(sid: str, environ: dict[str, object], auth: object = None) -> None:
+        await bind_session_key(sio, sid, auth, namespace=LORE_NS)
         logger.info(f"🔌 [lore] Client connected: {sid}")
 
     @sio.event(namespace=LORE_NS)
@@ -31,15 +69,15 @@ def register_lore_events(sio: socketio.AsyncServer) -> None:
             return
 
         try:
-            graph = spawn_lore_creator(world_name)
-            await sio.save_session(sid, {
-                "graph": graph,
-                "world_name": world_name,
-                "history": [],
-            }, namespace=LORE_NS)
+            _lore_graph(world_name)
+            await sio.enter_room(sid, world_room(world_name), namespace=LORE_NS)
+            await open_chat_state(sio, sid, LORE_NS, world_name=world_name)
 
             logger.info(f"🌍 [lore] Session initialized for world '{world_name}' (sid={sid})")
-            await sio.emit("lore_session_ready", {"world_name": world_name}, to=sid, namespace=LORE_NS)
+            await sio.emit("lore_session_ready", {
+                "world_name": world_name,
+                "session_key": await session_key(sio, sid, LORE_NS),
+            }, to=sid, namespace=LORE_NS)
 
         except Exception:
             logger.exception(f"💥 [lore] Failed to init session for sid={sid}")
@@ -53,20 +91,19 @@ def register_lore_events(sio: socketio.AsyncServer) -> None:
 
         logger.info(f"💬 [lore] message from {sid}: {str(content)[:120]}")
 
-        sock_session = await sio.get_session(sid, namespace=LORE_NS)
-        graph = sock_session.get("graph")
-        history: list[AnyMessage] = sock_session.get("history", [])
-        world_name: str = sock_session.get("world_name", "")
-
-        if graph is None:
+        state = await load_state(sio, sid, ChatSessionState, namespace=LORE_NS)
+        if state is None or not state.world_name:
             await sio.emit("error", {"message": "No lore session active. Call init_lore_session first."}, to=sid, namespace=LORE_NS)
             return
 
+        graph = _lore_graph(state.world_name)
+        history: list[AnyMessage] = load_messages(state.history)
         human_msg = HumanMessage(content=str(content))
         history.append(human_msg)
 
         config = RunnableConfig(callbacks=[langfuse_callback_handler])
         collected_text = ""
+        tokens = TokenCoalescer(sio, "lore_token", {}, to=sid, namespace=LORE_NS, stream="lore")
 
         try:
             stream = graph.astream(
@@ -84,10 +121,11 @@ def register_lore_events(sio: socketio.AsyncServer) -> None:
                     if msg.content:
                         token = str(msg.content)
                         collected_text += token
-                        await sio.emit("lore_token", {"token": token}, to=sid, namespace=LORE_NS)
+                        await tokens.push(token)
 
                 elif isinstance(msg, (ToolMessage, ToolMessageChunk)):
                     tool_content = str(msg.content) if msg.content else ""
+                    await tokens.flush()
                     if "✅ Saved" in tool_content or "📦 Queued" in tool_content:
                         title = tool_content.split("'")[1] if "'" in tool_content else "entry"
                         await sio.emit("lore_saving", {"title": title}, to=sid, namespace=LORE_NS)
@@ -96,15 +134,13 @@ def register_lore_events(sio: socketio.AsyncServer) -> None:
             if collected_text:
                 history.append(AIMessage(content=collected_text))
 
-            await sio.save_session(sid, {
-                "graph": graph,
-                "world_name": world_name,
-                "history": history,
-            }, namespace=LORE_NS)
+            state.history = dump_messages(history)
+            await save_state(sio, sid, state, namespace=LORE_NS)
 
         except Exception:
             logger.exception(f"💥 [lore] Stream error for sid={sid}")
             await sio.emit("error", {"message": "An error occurred while processing your request."}, to=sid, namespace=LORE_NS)
         finally:
+            await tokens.close()
             await sio.emit("lore_done", {}, to=sid, namespace=LORE_NS)
             logger.debug(f"🏁 [lore] lore_done emitted for sid={sid}")
@@ -3,9 +3,11 @@ import logging
 from hephaestus.logging import init_logger
 init_logger()
 
+from contextlib import asynccontextmanager
+
 import socketio
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -14,6 +16,7 @@ from api.lore_events import register_lore_events
 from api.npc_builder_events import register_npc_builder_events
 from api.campaign_admin_events import register_campaign_admin_events
 from api.routes.routes import router
+from api.session_store import client_manager, close_session_store, open_session_store
 from api.routes.session import session_router
 from api.routes.conversations import conversations_router
 from api.routes.lore import lore_router
@@ -21,18 +24,44 @@ from api.routes.players import players_router
 from api.routes.npcs import npcs_router
 from api.routes.campaigns import campaigns_router
 from api.routes.character_memories import character_memories_router
+from agents.dungeon_master import get_dungeon_master
+from agents.dungeon_master.checkpoints import close_checkpointer, open_checkpointer
+from agents.npc_pool import start_pool_generator, stop_pool_generator
+from utils.http_transport import close_shared_clients
+from utils.metrics import METRICS_CONTENT_TYPE, render_metrics
+from utils.prompts import prompts
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await prompts.warm()
+    await open_session_store()
+    # The checkpointer is compiled into the shared DM graph, so open it first.
+    await open_checkpointer()
+    get_dungeon_master()
+    start_pool_generator()
+    yield
+    await stop_pool_generator()
+    await prompts.stop_background_refresh()
+    await close_checkpointer()
+    await close_session_store()
+    await close_shared_clients()
+
+
+# With SOCKETIO_MESSAGE_QUEUE set, emits reach clients on every worker.
 sio = socketio.AsyncServer(
     async_mode="asgi",
     cors_allowed_origins=["*"],
+    client_manager=client_manager(),
 )
 
 app = FastAPI(
     title="Dionysus",
     version="0.1.0",
     debug=True,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -53,6 +82,12 @@ async def log_exceptions_middleware(request: Request, call_next):
         return JSONResponse(status_code=500, content={"detail": "Internal server error"})
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus scrape endpoint."""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 app.include_router(router)
 register_events(sio)
 register_lore_events(sio)
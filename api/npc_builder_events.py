@@ -1,22 +1,41 @@
 import logging
+from functools import lru_cache
 
 import socketio
 from langchain_core.messages import AIMessage, AIMessageChunk, AnyMessage, HumanMessage, ToolMessage, ToolMessageChunk
 from langchain_core.runnables import RunnableConfig
 
 from agents.tool_agent import spawn_npc_builder
+from api.session_store import (
+    ChatSessionState,
+    bind_session_key,
+    dump_messages,
+    load_messages,
+    load_state,
+    open_chat_state,
+    save_state,
+    session_key,
+)
 from hephaestus.langfuse_handler import langfuse_callback_handler
+from utils.stream_coalescing import TokenCoalescer
 
 logger = logging.getLogger(__name__)
 
 NPC_BUILDER_NS = "/npc-builder"
 
 
+@lru_cache(maxsize=32)
+def _builder_graph(world_name: str):
+    """NPC builder graphs hold no state of their own; one per world per worker."""
+    return spawn_npc_builder(world_name)
+
+
 def register_npc_builder_events(sio: socketio.AsyncServer) -> None:
     """Register Socket.IO event handlers on the /npc-builder namespace."""
 
     @sio.event(namespace=NPC_BUILDER_NS)
-    async def connect(sid: str, environ: dict[str, object]) -> None:
+    async def connect(sid: str, environ: dict[str, object], auth: object = None) -> None:
+        await bind_session_key(sio, sid, auth, namespace=NPC_BUILDER_NS)
         logger.info(f"🔌 [npc-builder] Client connected: {sid}")
 
     @sio.event(namespace=NPC_BUILDER_NS)
@@ -31,15 +50,14 @@ def register_npc_builder_events(sio: socketio.AsyncServer) -> None:
             return
 
         try:
-            graph = spawn_npc_builder(world_name)
-            await sio.save_session(sid, {
-                "graph": graph,
-                "world_name": world_name,
-                "history": [],
-            }, namespace=NPC_BUILDER_NS)
+            _builder_graph(world_name)
+            await open_chat_state(sio, sid, NPC_BUILDER_NS, world_name=world_name)
 
             logger.info(f"🏗️ [npc-builder] Session initialized for world '{world_name}' (sid={sid})")
-            await sio.emit("npc_builder_session_ready", {"world_name": world_name}, to=sid, namespace=NPC_BUILDER_NS)
+            await sio.emit("npc_builder_session_ready", {
+                "world_name": world_name,
+                "session_key": await session_key(sio, sid, NPC_BUILDER_NS),
+            }, to=sid, namespace=NPC_BUILDER_NS)
 
         except Exception:
             logger.exception(f"💥 [npc-builder] Failed to init session for sid={sid}")
@@ -53,20 +71,19 @@ def register_npc_builder_events(sio: socketio.AsyncServer) -> None:
 
         logger.info(f"💬 [npc-builder] message from {sid}: {str(content)[:120]}")
 
-        sock_session = await sio.get_session(sid, namespace=NPC_BUILDER_NS)
-        graph = sock_session.get("graph")
-        history: list[AnyMessage] = sock_session.get("history", [])
-        world_name: str = sock_session.get("world_name", "")
-
-        if graph is None:
+        state = await load_state(sio, sid, ChatSessionState, namespace=NPC_BUILDER_NS)
+        if state is None or not state.world_name:
             await sio.emit("error", {"message": "No NPC builder session active. Call init_npc_builder first."}, to=sid, namespace=NPC_BUILDER_NS)
             return
 
+        graph = _builder_graph(state.world_name)
+        history: list[AnyMessage] = load_messages(state.history)
         human_msg = HumanMessage(content=str(content))
         history.append(human_msg)
 
         config = RunnableConfig(callbacks=[langfuse_callback_handler])
         collected_text = ""
+        tokens = TokenCoalescer(sio, "npc_builder_token", {}, to=sid, namespace=NPC_BUILDER_NS, stream="npc_builder")
 
         try:
             stream = graph.astream(
@@ -84,10 +101,11 @@ def register_npc_builder_events(sio: socketio.AsyncServer) -> None:
                     if msg.content:
                         token = str(msg.content)
                         collected_text += token
-                        await sio.emit("npc_builder_token", {"token": token}, to=sid, namespace=NPC_BUILDER_NS)
+                        await tokens.push(token)
 
                 elif isinstance(msg, (ToolMessage, ToolMessageChunk)):
                     tool_content = str(msg.content) if msg.content else ""
+                    await tokens.flush()
                     if "Created character" in tool_content or tool_content == "true":
                         name = tool_content.split("'")[1] if "'" in tool_content else "NPC"
                         await sio.emit("npc_builder_created", {"name": name}, to=sid, namespace=NPC_BUILDER_NS)
@@ -96,15 +114,13 @@ def register_npc_builder_events(sio: socketio.AsyncServer) -> None:
             if collected_text:
                 history.append(AIMessage(content=collected_text))
 
-            await sio.save_session(sid, {
-                "graph": graph,
-                "world_name": world_name,
-                "history": history,
-            }, namespace=NPC_BUILDER_NS)
+            state.history = dump_messages(history)
+            await save_state(sio, sid, state, namespace=NPC_BUILDER_NS)
 
         except Exception:
             logger.exception(f"💥 [npc-builder] Stream error for sid={sid}")
             await sio.emit("error", {"message": "An error occurred while processing your request."}, to=sid, namespace=NPC_BUILDER_NS)
         finally:
+            await tokens.close()
             await sio.emit("npc_builder_done", {}, to=sid, namespace=NPC_BUILDER_NS)
             logger.debug(f"🏁 [npc-builder] npc_builder_done emitted for sid={sid}")
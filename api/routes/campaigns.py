@@ -6,7 +6,7 @@ from fastapi.exceptions import HTTPException
 from database.models import Campaign, Conversation, WorldState
 from database.postgres_connection import session
 from database.graphiti_utils import wipe_campaign_memories
-from utils.prompts import placeholder_location, placeholder_scenario
+from utils.prompts import prompts
 
 logger = logging.getLogger(__name__)
 
@@ -57,7 +57,7 @@ def get_campaign(campaign_id: int) -> dict[str, object]:
 
 
 @campaigns_router.post("", status_code=201)
-def create_campaign(
+async def create_campaign(
     name: str = Body(..., embed=True),
     lore_world: str = Body(..., embed=True),
 ) -> dict[str, object]:
@@ -65,10 +65,12 @@ def create_campaign(
     if existing:
         raise HTTPException(status_code=409, detail=f"Campaign '{name}' already exists")
 
-    campaign = Campaign(name=name, lore_world=lore_world, story_background=placeholder_scenario)
+    # A cache miss fetches from Langfuse; atext does that off the event loop.
+    story_background = await prompts.atext("placeholder_scenario")
+    campaign = Campaign(name=name, lore_world=lore_world, story_background=story_background)
     # Seed the 1:1 world state with a placeholder scene location; narrative
     # time starts empty and advances during play.
-    campaign.world_state = WorldState(location=placeholder_location)
+    campaign.world_state = WorldState(location=await prompts.atext("placeholder_location"))
     session.add(campaign)
     session.commit()
     logger.info(f"🏰 Created campaign '{name}' with lore_world='{lore_world}'")
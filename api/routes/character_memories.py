@@ -1,6 +1,6 @@
 import logging
 
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Response
 from fastapi.exceptions import HTTPException
 
 from database.models import Character
@@ -61,12 +61,17 @@ async def api_list_entries(campaign_id: int, npc_id: int) -> list[dict[str, obje
 async def api_create_entry(
     campaign_id: int,
     npc_id: int,
+    response: Response,
     title: str = Body(..., embed=True),
     content: str = Body(..., embed=True),
 ) -> dict[str, object]:
     npc = _resolve_npc(npc_id)
     gid = _memory_group(campaign_id, npc.name)
     entry = await create_entry(gid, title, content, source_description=f"manual:{npc.name}")
+    if entry["duplicate"]:
+        # Nothing was created: hand back the existing memory with a plain 200.
+        response.status_code = 200
+        return _entry_to_response(entry)
     logger.info(f"🧠 Created memory '{title}' for NPC '{npc.name}' in campaign {campaign_id}")
     return _entry_to_response(entry)
 
@@ -1,6 +1,6 @@
 import logging
 
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Response
 from fastapi.exceptions import HTTPException
 
 from database.graphiti_worlds import (
@@ -17,6 +17,7 @@ from database.graphiti_worlds import (
     world_exists,
     delete_world,
 )
+from tools.ingestion_jobs import get_job, list_jobs
 
 logger = logging.getLogger(__name__)
 
@@ -84,11 +85,15 @@ async def api_get_entry(episode_uuid: str) -> dict[str, object]:
 @lore_router.post("/worlds/{world_name}/entries", status_code=201)
 async def api_create_entry(
     world_name: str,
+    response: Response,
     title: str = Body(..., embed=True),
     content: str = Body(..., embed=True),
 ) -> dict[str, object]:
     gid = lore_group_id(world_name)
     entry = await create_entry(gid, title, content, source_description=f"lore_creator:{world_name}")
+    if entry["duplicate"]:
+        # Nothing was created: hand back the existing entry with a plain 200.
+        response.status_code = 200
     return _entry_to_lore_response(entry)
 
 
@@ -111,3 +116,21 @@ async def api_delete_entry(episode_uuid: str) -> dict[str, str]:
     if not deleted:
         raise HTTPException(status_code=404, detail=f"Entry {episode_uuid} not found")
     return {"detail": f"Entry {episode_uuid} deleted"}
+
+
+# ---------------------------------------------------------------------------
+# Ingestion job endpoints
+# ---------------------------------------------------------------------------
+
+
+@lore_router.get("/worlds/{world_name}/ingestion-jobs")
+async def api_list_ingestion_jobs(world_name: str) -> list[dict[str, object]]:
+    return [job.model_dump(mode="json", exclude={"entries"}) for job in list_jobs(world_name)]
+
+
+@lore_router.get("/ingestion-jobs/{job_id}")
+async def api_get_ingestion_job(job_id: str) -> dict[str, object]:
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+    return job.model_dump(mode="json")
@@ -4,10 +4,23 @@ from uuid import UUID
 from fastapi import APIRouter, Body, Path, Query
 from fastapi.exceptions import HTTPException
 
+from agents.conversation_context import context_stats, invalidate_summary
+from agents.dungeon_master.continuity import continuity_stats
+from agents.dungeon_master.epilogue import epilogue_lane_stats
+from agents.dungeon_master.express import express_stats
+from agents.dungeon_master.referee import speculation_stats
+from agents.nonplayer import npc_mind_stats
+from agents.npc_pool import npc_pool_stats
 from database.models import Character, Player, Message
 from database.models.conversation import Conversation
 from database.postgres_connection import session
 from tools.world_state import ensure_world_state, get_world_state
+from utils.http_transport import transport_stats
+from utils.llm_governor import governor_stats
+from utils.llm_resilience import invoke_stats
+from utils.prompts import prompts
+from utils.turn_scope import cancellation_stats
+from utils.turn_timing import ttfnt_stats
 
 logger = logging.getLogger(__name__)
 
@@ -82,6 +95,7 @@ def edit_message(message_id: UUID = Path(...), content: str = Body(..., embed=Tr
         if str(buffered.id) == str(message_id):
             buffered.content = content
             logger.info(f"🧹 Patched message {message_id} in buffer of conversation {conversation.id}")
+    invalidate_summary(conversation.id)
 
     logger.info(f"📝 Message {message_id} edited")
     return {"message": "Message edited"}
@@ -101,6 +115,91 @@ def delete_message(message_id: UUID = Path(...)) -> dict[str, str]:
     if len(pruned) != len(buffer):
         conversation.message_buffer = pruned
         logger.info(f"🧹 Pruned message {message_id} from buffer of conversation {conversation.id}")
+    invalidate_summary(conversation.id)
 
     logger.info(f"📝 Message {message_id} deleted")
     return {"message": "Message deleted"}
+
+
+@router.get("/diagnostics/llm-transport")
+def get_llm_transport_stats() -> dict[str, object]:
+    """Connection-reuse counters for the shared NanoGPT HTTP pool."""
+    return transport_stats()
+
+
+@router.get("/diagnostics/llm-invoke")
+def get_llm_invoke_stats() -> dict[str, dict[str, object]]:
+    """Hedging, retry and time-to-first-token stats per model-call policy."""
+    return invoke_stats()
+
+
+@router.get("/diagnostics/llm-governor")
+def get_llm_governor_stats() -> dict[str, object]:
+    """Admission queue wait per priority class and per-model occupancy."""
+    return governor_stats()
+
+
+@router.get("/diagnostics/referee-speculation")
+def get_referee_speculation_stats() -> dict[str, float | int]:
+    """How often a speculatively started referee call turned out to be needed."""
+    return speculation_stats()
+
+
+@router.get("/diagnostics/continuity")
+def get_continuity_stats() -> dict[str, float | int | bool]:
+    """Plan approval rate and the latency optimistic narration saved."""
+    return continuity_stats()
+
+
+@router.get("/diagnostics/npc-mind")
+def get_npc_mind_stats() -> dict[str, dict[str, object]]:
+    """Per-NPC-turn preparation latency and tokens: split emotion+planner vs fused mind."""
+    return npc_mind_stats()
+
+
+@router.get("/diagnostics/context-window")
+def get_context_window_stats() -> dict[str, object]:
+    """Prompt history tokens vs raw history, and rolling summary state per conversation."""
+    return context_stats()
+
+
+@router.get("/diagnostics/epilogue-lanes")
+def get_epilogue_lane_stats() -> dict[str, object]:
+    """Epilogue jobs merged, superseded or dropped by the per-campaign lanes."""
+    return epilogue_lane_stats()
+
+
+@router.get("/diagnostics/npc-pool")
+def get_npc_pool_stats() -> dict[str, object]:
+    """Pre-generated NPC cards per lore world, claim hit rate and generation cost."""
+    return npc_pool_stats()
+
+
+@router.get("/diagnostics/express-lane")
+def get_express_lane_stats() -> dict[str, float | int | bool]:
+    """Share of story turns that skipped the planner via the express lane."""
+    return express_stats()
+
+
+@router.get("/prompts")
+def get_prompt_versions() -> dict[str, int | None]:
+    """Langfuse version of every prompt currently loaded."""
+    return prompts.versions()
+
+
+@router.post("/prompts/reload")
+async def reload_prompts(name: str | None = Query(None, description="Reload one prompt; omit for all.")) -> dict:
+    """🔄 Hot-reload prompts from Langfuse; new versions apply from the next call."""
+    return await prompts.reload(name)
+
+
+@router.get("/diagnostics/turn-cancellation")
+def get_turn_cancellation_stats() -> dict[str, object]:
+    """Turns preempted by a newer message, and the bubbles and tokens they threw away."""
+    return cancellation_stats()
+
+
+@router.get("/diagnostics/turn-latency")
+def get_turn_latency_stats() -> dict[str, dict[str, object]]:
+    """Time-to-first-narration-token per turn mode (e.g. plan streaming on/off)."""
+    return ttfnt_stats()
@@ -0,0 +1,270 @@
+"""🗃️ Socket session state that survives restarts and spans workers.
+
+``sio.save_session`` lives in one process's memory, so a table was tied to
+the worker it connected to and lost on restart. Handlers keep only a session
+key there now. The state itself is a small serializable model -- ids, the
+game's message window, a chat namespace's history -- kept in a pluggable
+``SessionStore``:
+
+- ``memory``   -- in-process, bounded; the single-worker default.
+- ``postgres`` -- LangGraph's ``AsyncPostgresStore`` in the app database
+  (the same driver the DM checkpoints use), with a TTL.
+
+The server issues each connection a random ``session_key`` and sends it back
+in the namespace's ready event (``session_ready``, ``lore_session_ready``,
+...). Clients pass it in the Socket.IO ``auth`` payload when they reconnect,
+so a reconnect -- to any worker -- finds its state again. Keys the store never
+issued are ignored and replaced with a fresh one, so a client cannot choose
+its way into another table's state.
+
+With ``SOCKETIO_MESSAGE_QUEUE`` set, emits go through a Redis client manager,
+so an emit to a room or a sid reaches clients connected to other workers. Together with ``SESSION_STORE=
+postgres`` this lets the app run with ``uvicorn --workers N`` behind a load
+balancer with sticky sessions. Set ``PROMETHEUS_MULTIPROC_DIR`` as well so
+``/metrics`` aggregates every worker (see ``utils.metrics``).
+
+    SESSION_STORE            memory | postgres (default memory)
+    SESSION_STORE_DSN        database for the postgres store (default: the app's own)
+    SESSION_TTL_MINUTES      idle minutes before a stored session expires (default 1440)
+    SESSION_WINDOW           game messages kept in a session's window (default 50)
+    SOCKETIO_MESSAGE_QUEUE   redis:// URL of the cross-worker message queue
+"""
+import os
+import re
+import secrets
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from logging import getLogger
+from typing import Any, TypeVar
+
+import socketio
+from langchain_core.messages import AnyMessage, messages_from_dict, messages_to_dict
+from langgraph.store.postgres.aio import AsyncPostgresStore
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from pydantic import BaseModel, Field
+
+from database.postgres_connection import ALCHEMY_CONNECTION_STRING
+
+logger = getLogger(__name__)
+
+SESSION_STORE = os.environ.get("SESSION_STORE", "memory").lower()
+# SQLAlchemy URLs name the driver ("postgresql+psycopg2://"); libpq does not.
+SESSION_STORE_DSN = os.environ.get("SESSION_STORE_DSN") or re.sub(
+    r"^postgresql\+\w+://", "postgresql://", ALCHEMY_CONNECTION_STRING,
+)
+SESSION_TTL_MINUTES = float(os.environ.get("SESSION_TTL_MINUTES", "1440"))
+SESSION_WINDOW = int(os.environ.get("SESSION_WINDOW", "50"))
+SOCKETIO_MESSAGE_QUEUE = os.environ.get("SOCKETIO_MESSAGE_QUEUE")
+
+# Sessions the memory store keeps before evicting the least recently used.
+MEMORY_STORE_MAX_SESSIONS = 10_000
+# Store namespace recording the session keys the server has issued.
+ISSUED_KEYS_NAMESPACE = "/session_keys"
+
+State = TypeVar("State", bound=BaseModel)
+
+
+# ------------------------------------------------------------------
+# Session state
+# ------------------------------------------------------------------
+
+def dump_messages(messages: list[AnyMessage]) -> list[dict]:
+    return messages_to_dict(messages)
+
+
+def load_messages(data: list[dict]) -> list[AnyMessage]:
+    return messages_from_dict(data)
+
+
+class GameSessionState(BaseModel):
+    """A game table: which conversation, and the message window agents see."""
+    conversation_id: int
+    message_window: list[dict] = Field(default_factory=list)
+
+
+class ChatSessionState(BaseModel):
+    """A /lore, /npc-builder or /campaign-admin chat and its history."""
+    world_name: str | None = None
+    campaign_id: int | None = None
+    history: list[dict] = Field(default_factory=list)
+
+
+# ------------------------------------------------------------------
+# Stores
+# ------------------------------------------------------------------
+
+class SessionStore(ABC):
+    name: str
+
+    @abstractmethod
+    async def load(self, namespace: str, key: str) -> dict[str, Any] | None: ...
+
+    @abstractmethod
+    async def save(self, namespace: str, key: str, state: dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    async def delete(self, namespace: str, key: str) -> None: ...
+
+    async def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    name = "memory"
+
+    def __init__(self, max_sessions: int = MEMORY_STORE_MAX_SESSIONS):
+        self._states: OrderedDict[tuple[str, str], dict[str, Any]] = OrderedDict()
+        self._max_sessions = max_sessions
+
+    async def load(self, namespace: str, key: str) -> dict[str, Any] | None:
+        state = self._states.get((namespace, key))
+        if state is not None:
+            self._states.move_to_end((namespace, key))
+        return state
+
+    async def save(self, namespace: str, key: str, state: dict[str, Any]) -> None:
+        self._states[(namespace, key)] = state
+        self._states.move_to_end((namespace, key))
+        while len(self._states) > self._max_sessions:
+            self._states.popitem(last=False)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        self._states.pop((namespace, key), None)
+
+
+class PostgresSessionStore(SessionStore):
+    name = "postgres"
+
+    def __init__(self, pool: AsyncConnectionPool, store: AsyncPostgresStore):
+        self._pool = pool
+        self._store = store
+
+    @classmethod
+    async def open(cls) -> "PostgresSessionStore":
+        pool = AsyncConnectionPool(
+            SESSION_STORE_DSN,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            open=False,
+        )
+        await pool.open(wait=True)
+        try:
+            store = AsyncPostgresStore(
+                pool, ttl={"default_ttl": SESSION_TTL_MINUTES, "refresh_on_read": True},
+            )
+            await store.setup()
+            await store.start_ttl_sweeper()
+        except Exception:
+            await pool.close()
+            raise
+        return cls(pool, store)
+
+    @staticmethod
+    def _namespace(namespace: str) -> tuple[str, ...]:
+        return ("socket_sessions", namespace.strip("/") or "game")
+
+    async def load(self, namespace: str, key: str) -> dict[str, Any] | None:
+        item = await self._store.aget(self._namespace(namespace), key)
+        return item.value if item is not None else None
+
+    async def save(self, namespace: str, key: str, state: dict[str, Any]) -> None:
+        await self._store.aput(self._namespace(namespace), key, state)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        await self._store.adelete(self._namespace(namespace), key)
+
+    async def close(self) -> None:
+        await self._store.stop_ttl_sweeper()
+        await self._pool.close()
+
+
+_store: SessionStore = MemorySessionStore()
+
+
+async def open_session_store() -> SessionStore:
+    """Connect the configured store; falls back to memory if it is unavailable."""
+    global _store
+    if SESSION_STORE == "postgres":
+        try:
+            _store = await PostgresSessionStore.open()
+        except Exception:
+            logger.exception("💥 Postgres session store unavailable, keeping sessions in memory")
+    elif SESSION_STORE != "memory":
+        logger.error(f"❌ Unknown SESSION_STORE '{SESSION_STORE}', keeping sessions in memory")
+    logger.info(f"🗃️ Socket sessions stored in {_store.name}")
+    return _store
+
+
+async def close_session_store() -> None:
+    global _store
+    await _store.close()
+    _store = MemorySessionStore()
+
+
+def session_store() -> SessionStore:
+    return _store
+
+
+# ------------------------------------------------------------------
+# Socket.IO glue
+# ------------------------------------------------------------------
+
+def client_manager() -> socketio.AsyncManager | None:
+    """Cross-worker client manager from ``SOCKETIO_MESSAGE_QUEUE``, if set."""
+    if not SOCKETIO_MESSAGE_QUEUE:
+        return None
+    if not SOCKETIO_MESSAGE_QUEUE.startswith(("redis://", "rediss://", "unix://")):
+        # AsyncAioPikaManager would need aio-pika, which is not a dependency.
+        raise ValueError(
+            f"SOCKETIO_MESSAGE_QUEUE must be a Redis URL (redis://, rediss:// or unix://), "
+            f"got '{SOCKETIO_MESSAGE_QUEUE}'"
+        )
+    manager = socketio.AsyncRedisManager(SOCKETIO_MESSAGE_QUEUE)
+    logger.info(f"📡 Socket.IO emits shared across workers via {type(manager).__name__}")
+    return manager
+
+
+async def bind_session_key(
+    sio: socketio.AsyncServer, sid: str, auth: object, namespace: str = "/",
+) -> str:
+    """Remember which stored session this connection works on (call on connect).
+
+    Reuses the client's ``auth.session_key`` only if this server issued it;
+    otherwise issues a new one.
+    """
+    key = auth.get("session_key") if isinstance(auth, dict) else None
+    if not isinstance(key, str) or await _store.load(ISSUED_KEYS_NAMESPACE, key) is None:
+        key = secrets.token_urlsafe(32)
+        await _store.save(ISSUED_KEYS_NAMESPACE, key, {"issued_at": time.time()})
+    await sio.save_session(sid, {"session_key": key}, namespace=namespace)
+    return key
+
+
+async def session_key(sio: socketio.AsyncServer, sid: str, namespace: str = "/") -> str:
+    """The key to send back in the ready event, for the client's next reconnect."""
+    return (await sio.get_session(sid, namespace=namespace)).get("session_key", sid)
+
+
+async def load_state(
+    sio: socketio.AsyncServer, sid: str, model: type[State], namespace: str = "/",
+) -> State | None:
+    data = await _store.load(namespace, await session_key(sio, sid, namespace))
+    return model.model_validate(data) if data is not None else None
+
+
+async def save_state(sio: socketio.AsyncServer, sid: str, state: BaseModel, namespace: str = "/") -> None:
+    await _store.save(namespace, await session_key(sio, sid, namespace), state.model_dump(mode="json"))
+
+
+async def open_chat_state(
+    sio: socketio.AsyncServer, sid: str, namespace: str, *,
+    world_name: str | None = None, campaign_id: int | None = None,
+) -> ChatSessionState:
+    """Start a chat on ``world_name`` or ``campaign_id``, keeping the stored
+    history when a reconnecting session was already on the same one."""
+    state = await load_state(sio, sid, ChatSessionState, namespace=namespace)
+    if state is None or (state.world_name, state.campaign_id) != (world_name, campaign_id):
+        state = ChatSessionState(world_name=world_name, campaign_id=campaign_id)
+    await save_state(sio, sid, state, namespace=namespace)
+    return state
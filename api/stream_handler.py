@@ -3,7 +3,9 @@
 
 Processes LangGraph stream output and emits Socket.IO events
 (stream_start, stream_token, stream_end) with character/narrator attribution.
+Tokens are coalesced into fewer ``stream_token`` frames (``utils.stream_coalescing``).
 """
+import asyncio
 from logging import getLogger
 from uuid import uuid4
 
@@ -11,6 +13,9 @@ import socketio
 from langchain_core.messages import AIMessageChunk, ToolMessageChunk
 
 from agents.dungeon_master import NARRATOR_NAME
+from utils.stream_coalescing import TokenCoalescer
+from utils.turn_scope import note_bubble, note_token
+from utils.turn_timing import TURN_TIMING_DEBUG, current_turn, mark_first_token
 
 
 logger = getLogger(__name__)
@@ -77,10 +82,12 @@ class SocketStreamHandler:
         self._current_node: str | None = None
         self._prefix_buffer: str = ""
         self._prefix_stripped: bool = False
+        self._coalescer: TokenCoalescer | None = None
         self.message_ids: list[str] = []
 
     async def _start_new_message(self, speaker: str) -> None:
         if self._current_message_id:
+            await self._coalescer.close()
             await self.sio.emit(
                 "stream_end",
                 {"messageId": self._current_message_id},
@@ -92,21 +99,26 @@ class SocketStreamHandler:
         self._prefix_buffer = ""
         self._prefix_stripped = False
         self.message_ids.append(self._current_message_id)
+        note_bubble(self._current_message_id)
         await self.sio.emit(
             "stream_start",
             {"messageId": self._current_message_id, "name": speaker},
             to=self.sid,
         )
+        self._coalescer = TokenCoalescer(
+            self.sio, "stream_token", {"messageId": self._current_message_id}, to=self.sid, stream="dm",
+        )
         logger.debug("🎬 stream_start: speaker=%s, id=%s", speaker, self._current_message_id)
 
+    async def _emit_token(self, token: str) -> None:
+        mark_first_token()
+        note_token()
+        await self._coalescer.push(token)
+
     async def _emit_stripped_token(self, content: str, speaker: str) -> None:
         """Buffer initial tokens to strip the `Name: ` prefix, then forward the rest."""
         if self._prefix_stripped:
-            await self.sio.emit(
-                "stream_token",
-                {"messageId": self._current_message_id, "token": content},
-                to=self.sid,
-            )
+            await self._emit_token(content)
             return
 
         self._prefix_buffer += content
@@ -117,25 +129,13 @@ class SocketStreamHandler:
                 remainder = self._prefix_buffer[len(expected):]
                 self._prefix_stripped = True
                 if remainder:
-                    await self.sio.emit(
-                        "stream_token",
-                        {"messageId": self._current_message_id, "token": remainder},
-                        to=self.sid,
-                    )
+                    await self._emit_token(remainder)
             else:
                 self._prefix_stripped = True
-                await self.sio.emit(
-                    "stream_token",
-                    {"messageId": self._current_message_id, "token": self._prefix_buffer},
-                    to=self.sid,
-                )
+                await self._emit_token(self._prefix_buffer)
         elif not expected.startswith(self._prefix_buffer):
             self._prefix_stripped = True
-            await self.sio.emit(
-                "stream_token",
-                {"messageId": self._current_message_id, "token": self._prefix_buffer},
-                to=self.sid,
-            )
+            await self._emit_token(self._prefix_buffer)
 
     async def _handle_ai_chunk(
         self, msg: AIMessageChunk, ns_path: list[str], langgraph_node: str
@@ -176,6 +176,12 @@ class SocketStreamHandler:
                     await self._handle_tool_chunk(msg, ns_path)
                 else:
                     logger.debug("📦 Unhandled message type: %s", type(msg).__name__)
+        except asyncio.CancelledError:
+            # Preempted: the turn owner retracts every bubble of this turn.
+            if self._coalescer is not None:
+                self._coalescer.discard()
+            self._current_message_id = None
+            raise
         except Exception:
             logger.exception("💥 Error processing stream for sid=%s", self.sid)
             await self.sio.emit(
@@ -185,9 +191,10 @@ class SocketStreamHandler:
             )
         finally:
             if self._current_message_id:
-                await self.sio.emit(
-                    "stream_end",
-                    {"messageId": self._current_message_id},
-                    to=self.sid,
-                )
+                await self._coalescer.close()
+                payload: dict[str, object] = {"messageId": self._current_message_id}
+                timer = current_turn()
+                if TURN_TIMING_DEBUG and timer is not None:
+                    payload["timing"] = timer.breakdown()
+                await self.sio.emit("stream_end", payload, to=self.sid)
                 logger.debug("🏁 stream_end: id=%s", self._current_message_id)
@@ -0,0 +1,84 @@
+"""🎟️ Per-conversation turn ownership.
+
+Only one DM turn runs per conversation. ``send_message`` hands its turn to
+``run_owned_turn``: a new message queues behind the running turn (FIFO), or
+-- when the client sends ``preempt: true`` -- cancels it first.
+
+Cancelling the turn's task closes the DM graph stream. LangGraph cancels the
+running nodes and ``resilient_invoke`` cancels their model streams, which
+closes the HTTP responses. ``retract_turn`` then cancels the turn's child
+tasks (``utils.turn_scope``) and tells the client to drop every bubble the
+turn streamed.
+"""
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from logging import getLogger
+
+import socketio
+
+from utils.turn_scope import TurnScope, cancel_children, record_cancellation
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class ConversationTurns:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    running: asyncio.Task | None = None
+    waiting: int = 0
+
+
+_turns: dict[int, ConversationTurns] = {}
+
+
+async def run_owned_turn(
+    conversation_id: int,
+    turn: Callable[[], Awaitable[None]],
+    *,
+    preempt: bool = False,
+    on_queued: Callable[[int], Awaitable[None]] | None = None,
+) -> bool:
+    """Run ``turn()`` as the conversation's only turn.
+
+    Returns False when the turn was itself preempted by a later message.
+    """
+    turns = _turns.setdefault(conversation_id, ConversationTurns())
+    if turns.lock.locked():
+        if preempt and turns.running is not None:
+            logger.info(f"✂️ Preempting the running turn of conversation {conversation_id}")
+            turns.running.cancel()
+        elif on_queued is not None:
+            await on_queued(turns.waiting + 1)
+    turns.waiting += 1
+    try:
+        async with turns.lock:
+            turns.waiting -= 1
+            task = asyncio.create_task(turn())
+            turns.running = task
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                turns.running = None
+            if task.cancelled():
+                return False
+            task.result()
+            return True
+    finally:
+        if not turns.lock.locked() and turns.waiting == 0:
+            _turns.pop(conversation_id, None)
+
+
+async def retract_turn(sio: socketio.AsyncServer, sid: str, scope: TurnScope) -> None:
+    """Tear down a cancelled turn: stop its children and drop its bubbles."""
+    if scope.committed:
+        logger.info(f"✂️ Turn {scope.turn_id} was already persisted, keeping its messages")
+        return
+    children = cancel_children(scope)
+    for message_id in scope.bubbles:
+        await sio.emit("stream_end", {"messageId": message_id, "content": ""}, to=sid)
+    await sio.emit("turn_cancelled", {"messageId": scope.turn_id, "retracted": scope.bubbles}, to=sid)
+    record_cancellation(scope, children)
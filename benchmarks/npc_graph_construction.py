@@ -0,0 +1,49 @@
+"""⏱️ Per-turn NPC graph construction overhead, before and after graph sharing.
+
+"Per turn (rebuilt)" is what every NPC turn used to pay: binding the emotion
+schema and compiling a fresh graph. "Per turn (shared)" is what it pays now:
+fetching the process-wide graph and building its ``NPCTurn`` config from the
+cached persona. No model or database calls are made.
+
+    python -m benchmarks.npc_graph_construction [turns]
+"""
+import sys
+import timeit
+from types import SimpleNamespace
+
+from agents.nonplayer import _emotional_state_model, build_npc_graph, get_npc_graph, npc_turn_config
+
+
+def _stand_in_conversation(npc_count: int = 3) -> SimpleNamespace:
+    characters = [
+        SimpleNamespace(id=i, name=f"NPC {i}", description=f"A character card for NPC {i}. " * 40,
+                        description_version=1)
+        for i in range(1, npc_count + 1)
+    ]
+    player = SimpleNamespace(id=1, name="Player", description="The player.")
+    campaign = SimpleNamespace(id=1)
+    return SimpleNamespace(characters=characters, player=player, campaign=campaign)
+
+
+def main(turns: int = 200) -> None:
+    conversation = _stand_in_conversation()
+    character = conversation.characters[0]
+    directive = SimpleNamespace(guidance="Greet the player.", withheld_info=["The vault code."])
+
+    def rebuilt() -> None:
+        _emotional_state_model.cache_clear()
+        _emotional_state_model()
+        build_npc_graph()
+
+    def shared() -> None:
+        get_npc_graph()
+        npc_turn_config(character, conversation, directive)
+
+    shared()  # warm the persona and roster caches
+    for label, fn in (("rebuilt", rebuilt), ("shared", shared)):
+        seconds = timeit.timeit(fn, number=turns)
+        print(f"Per turn ({label}): {seconds / turns * 1000:.3f} ms over {turns} turns")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
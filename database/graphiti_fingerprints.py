@@ -0,0 +1,183 @@
+"""🧬 Content fingerprints on Graphiti episodes (duplicate detection).
+
+Every episode written through :func:`add_fingerprinted_episode` carries, on
+its Episodic node:
+
+- ``content_hash``: SHA-256 of the whitespace-normalized body (exact matches).
+- ``content_minhash``: MinHash signature of the body's word shingles.
+- ``content_lsh_0`` .. ``content_lsh_{LSH_BANDS - 1}``: one key per band of
+  the signature (locality-sensitive hashing).  Each band property is indexed
+  together with ``group_id``, so near-duplicate candidates are found by index
+  seeks instead of reading every signature in the group.
+
+Episodes written before fingerprints existed are backfilled lazily by
+:func:`backfill_group_fingerprints`.
+"""
+
+import hashlib
+import random
+from logging import getLogger
+
+from graphiti_core.graphiti import AddEpisodeResults
+
+from database.init_graphiti import graphiti
+
+logger = getLogger(__name__)
+
+SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 64
+# 8 bands of 8 rows: two bodies with similarity s share at least one band with
+# probability 1 - (1 - s**8)**8 -- ~99% at 0.9, ~4% at 0.5.
+LSH_BANDS = 8
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+_MINHASH_PRIME = (1 << 61) - 1
+# Fixed seed: signatures are persisted on nodes, so they must be reproducible
+# across processes and restarts.
+_minhash_rng = random.Random(0xD10)
+_MINHASH_COEFFS = [
+    (_minhash_rng.randrange(1, _MINHASH_PRIME), _minhash_rng.randrange(0, _MINHASH_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+LSH_PROPERTIES = [f"content_lsh_{band}" for band in range(LSH_BANDS)]
+
+_indexes_ready = False
+_fingerprinted_groups: set[str] = set()
+
+
+def normalize_content(content: str) -> str:
+    """Collapse whitespace so formatting-only edits compare (and hash) equal."""
+    return " ".join(content.split())
+
+
+def content_hash(content: str) -> str:
+    """Stable SHA-256 hex digest of an entry body, after normalization."""
+    return hashlib.sha256(normalize_content(content).encode("utf-8")).hexdigest()
+
+
+def minhash_signature(content: str) -> list[int]:
+    """MinHash signature of the body's lower-cased word shingles.
+
+    Two signatures agree in roughly the same fraction of slots as the Jaccard
+    similarity of the underlying shingle sets.  Empty for empty content.
+    """
+    words = normalize_content(content).lower().split()
+    if not words:
+        return []
+    shingles = {
+        " ".join(words[i : i + SHINGLE_SIZE])
+        for i in range(max(1, len(words) - SHINGLE_SIZE + 1))
+    }
+    hashes = [
+        int.from_bytes(hashlib.blake2b(sh.encode("utf-8"), digest_size=8).digest(), "big")
+        for sh in shingles
+    ]
+    return [min((a * h + b) % _MINHASH_PRIME for h in hashes) for a, b in _MINHASH_COEFFS]
+
+
+def minhash_similarity(left: list[int], right: list[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    if not left or len(left) != len(right):
+        return 0.0
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+def lsh_bands(signature: list[int]) -> list[str | None]:
+    """One bucket key per band of *signature*; all None for an empty signature."""
+    if len(signature) != MINHASH_PERMUTATIONS:
+        return [None] * LSH_BANDS
+    return [
+        hashlib.blake2b(
+            ",".join(map(str, signature[band * LSH_ROWS : (band + 1) * LSH_ROWS])).encode("ascii"),
+            digest_size=8,
+        ).hexdigest()
+        for band in range(LSH_BANDS)
+    ]
+
+
+def fingerprint(content: str) -> dict[str, object]:
+    """All fingerprint properties for *content*, keyed by node property name."""
+    signature = minhash_signature(content)
+    return {
+        "content_hash": content_hash(content),
+        "content_minhash": signature,
+        **dict(zip(LSH_PROPERTIES, lsh_bands(signature))),
+    }
+
+
+async def ensure_fingerprint_indexes() -> None:
+    """Create the (group_id, content_hash) and per-band LSH indexes if missing."""
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    await graphiti.driver.execute_query(
+        "CREATE INDEX episodic_group_content_hash IF NOT EXISTS "
+        "FOR (e:Episodic) ON (e.group_id, e.content_hash)"
+    )
+    for prop in LSH_PROPERTIES:
+        await graphiti.driver.execute_query(
+            f"CREATE INDEX episodic_group_{prop} IF NOT EXISTS "
+            f"FOR (e:Episodic) ON (e.group_id, e.{prop})"
+        )
+    _indexes_ready = True
+    logger.info(f"🏗️ Ensured Episodic content fingerprint indexes ({LSH_BANDS} LSH bands)")
+
+
+async def fingerprint_episode(episode_uuid: str, content: str, group_id: str) -> None:
+    """Store the fingerprint properties of *content* on an existing episode.
+
+    If the write fails the group is marked for another backfill pass, so the
+    episode is not left invisible to duplicate checks for the process lifetime.
+    """
+    try:
+        await ensure_fingerprint_indexes()
+        await graphiti.driver.execute_query(
+            "MATCH (e:Episodic {uuid: $uuid}) SET e += $props",
+            params={"uuid": episode_uuid, "props": fingerprint(content)},
+        )
+    except Exception:
+        _fingerprinted_groups.discard(group_id)
+        raise
+
+
+async def add_fingerprinted_episode(**kwargs: object) -> AddEpisodeResults:
+    """``graphiti.add_episode`` followed by :func:`fingerprint_episode`.
+
+    Takes the same keyword arguments as ``graphiti.add_episode``.  Use this
+    for every episode write so duplicate detection sees all of them.
+    """
+    result = await graphiti.add_episode(**kwargs)
+    await fingerprint_episode(result.episode.uuid, str(kwargs["episode_body"]), str(kwargs["group_id"]))
+    return result
+
+
+async def backfill_group_fingerprints(group_id: str, seed_source: str) -> None:
+    """Fingerprint episodes in *group_id* written before fingerprints existed.
+
+    Runs once per group per process (again after a failed fingerprint write).
+    Episodes whose ``source_description`` is *seed_source* are skipped.
+    """
+    if group_id in _fingerprinted_groups:
+        return
+    await ensure_fingerprint_indexes()
+    records, _, _ = await graphiti.driver.execute_query(
+        f"""
+        MATCH (e:Episodic {{group_id: $gid}})
+        WHERE (e.content_hash IS NULL OR e.{LSH_PROPERTIES[0]} IS NULL)
+          AND e.source_description <> $seed_src
+        RETURN e.uuid AS uuid, e.content AS content
+        """,
+        params={"gid": group_id, "seed_src": seed_source},
+    )
+    if records:
+        rows = [{"uuid": r["uuid"], "props": fingerprint(r["content"] or "")} for r in records]
+        await graphiti.driver.execute_query(
+            """
+            UNWIND $rows AS row
+            MATCH (e:Episodic {uuid: row.uuid})
+            SET e += row.props
+            """,
+            params={"rows": rows},
+        )
+        logger.info(f"🧬 Backfilled content fingerprints for {len(rows)} episodes in group_id={group_id!r}")
+    _fingerprinted_groups.add(group_id)
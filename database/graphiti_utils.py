@@ -7,11 +7,15 @@ from langchain_core.messages import HumanMessage, AIMessage, AnyMessage
 
 from graphiti_core.nodes import EpisodeType
 
+from database.graphiti_fingerprints import add_fingerprinted_episode
 from database.init_graphiti import graphiti
 from database.graphiti_types import ENTITY_TYPES, EDGE_TYPES, EDGE_TYPE_MAP
 from hephaestus.settings import settings
 from utils.llm_models import memory_filter
-from utils.prompts import memory_significance_prompt
+from utils.llm_resilience import resilient_invoke
+from utils.metrics import graphiti_timed, timed_job
+from utils.prompts import prompts
+from utils.turn_scope import adopt
 
 logger = getLogger(__name__)
 
@@ -51,6 +55,7 @@ def make_player_prefs_group_id(campaign_id: int) -> str:
     return make_group_id("player_prefs", f"campaign_{campaign_id}")
 
 
+@graphiti_timed("search")
 async def load_information(
     query: str,
     group_ids: list[str] | None = None,
@@ -84,6 +89,7 @@ async def load_information(
     return "\n".join(facts)
 
 
+@graphiti_timed("add_episode")
 async def insert_information(
     messages: list[AnyMessage],
     group_id: str,
@@ -108,7 +114,7 @@ async def insert_information(
     episode_body = "\n".join(lines)
     name = f"conversation_{datetime.now(timezone.utc).isoformat()}"
 
-    result = await graphiti.add_episode(
+    result = await add_fingerprinted_episode(
         name=name,
         episode_body=episode_body,
         source=EpisodeType.message,
@@ -137,12 +143,17 @@ def fire_and_forget(coro: object) -> asyncio.Task[None]:
     """Schedule a coroutine as a background task with automatic error logging.
 
     Uses a blank ``contextvars.Context`` so LangChain/LangGraph streaming
-    callbacks from the calling graph node are NOT inherited by the task.
+    callbacks from the calling graph node are NOT inherited by the task --
+    nor is the run's config, so ``coro`` must already hold every value it
+    needs (a ``DMContext`` or ``NPCTurn`` lookup inside it raises).
+    Wall time and failures are recorded per job in ``utils.metrics``. A job
+    started by a turn that is later preempted is cancelled with it.
     """
     import contextvars
-    task = asyncio.create_task(coro, context=contextvars.Context())
+    task = asyncio.create_task(timed_job(coro), context=contextvars.Context())
     task.add_done_callback(_log_background_task_exception)
-    return task
+    # Still owned by the calling turn: a preempted turn's writes are dropped.
+    return adopt(task)
 
 
 async def process_and_save_memory(
@@ -166,13 +177,13 @@ async def process_and_save_memory(
 
     conversation_text = "\n".join(lines)
 
-    prompt = await memory_significance_prompt.ainvoke({
+    prompt = await prompts.ainvoke("memory-significance-filter", {
         "name": character_name,
         "description": character_description,
         "conversation": conversation_text,
     })
 
-    result = await memory_filter.ainvoke(prompt)
+    result = await resilient_invoke(memory_filter, prompt, policy="memory_filter")
     extracted: str = result.content.strip()
 
     if not extracted or extracted.upper().startswith(NOTHING_MARKER):
@@ -183,7 +194,7 @@ async def process_and_save_memory(
 
     name = f"memory_{character_name}_{datetime.now(timezone.utc).isoformat()}"
 
-    await graphiti.add_episode(
+    await add_fingerprinted_episode(
         name=name,
         episode_body=extracted,
         source=EpisodeType.message,
@@ -213,7 +224,7 @@ async def save_world_events(
 
     logger.info(f"🌍 Saving {len(events)} world event(s) to {group_id}")
 
-    await graphiti.add_episode(
+    await add_fingerprinted_episode(
         name=name,
         episode_body=body,
         source=EpisodeType.text,
@@ -241,7 +252,7 @@ async def save_secret_notes(
 
     logger.info(f"🤫 Saving DM secret notes to {group_id}")
 
-    await graphiti.add_episode(
+    await add_fingerprinted_episode(
         name=name,
         episode_body=notes,
         source=EpisodeType.text,
@@ -269,7 +280,7 @@ async def save_player_preferences(
 
     logger.info(f"🎯 Saving player preference notes to {group_id}")
 
-    await graphiti.add_episode(
+    await add_fingerprinted_episode(
         name=name,
         episode_body=notes,
         source=EpisodeType.text,
@@ -283,6 +294,7 @@ async def save_player_preferences(
     logger.debug(f"🎯 Player preferences persisted for campaign {campaign_id}")
 
 
+@graphiti_timed("load_lorebook")
 async def load_lorebook( lorebook: dict, world_name: str, *, batch_size: int = 5) -> int:
     """Load a SillyTavern-format lorebook dict into the Graphiti knowledge graph.
 
@@ -322,7 +334,7 @@ async def load_lorebook( lorebook: dict, world_name: str, *, batch_size: int = 5
 
             name = entry["comment"]
             tasks.append(
-                graphiti.add_episode(
+                add_fingerprinted_episode(
                     name=name,
                     episode_body=content,
                     source=EpisodeType.text,
@@ -352,6 +364,7 @@ async def load_lorebook( lorebook: dict, world_name: str, *, batch_size: int = 5
     return ingested
 
 
+@graphiti_timed("wipe_campaign")
 async def wipe_campaign_memories(campaign_id: int) -> int:
     """Remove all Graphiti nodes whose group_id belongs to this campaign.
 
@@ -373,6 +386,7 @@ async def wipe_campaign_memories(campaign_id: int) -> int:
     return deleted
 
 
+@graphiti_timed("wipe_group")
 async def wipe_agent_memories(group_id: str) -> int:
     """Remove all episodes for a given group_id.
 
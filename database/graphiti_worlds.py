@@ -5,11 +5,23 @@ group_ids for their domain (lore, character memories, etc.) and pass them
 in directly.  Entry (episode) operations are fully group_id-agnostic.
 """
 
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from logging import getLogger
 
 from graphiti_core.nodes import EpisodeType
 
+from database.graphiti_fingerprints import (
+    LSH_PROPERTIES,
+    add_fingerprinted_episode,
+    backfill_group_fingerprints,
+    content_hash,
+    lsh_bands,
+    minhash_signature,
+    minhash_similarity,
+)
 from database.graphiti_types import EDGE_TYPE_MAP, EDGE_TYPES, ENTITY_TYPES
 from database.graphiti_utils import GROUP_SEP, make_group_id, wipe_agent_memories
 from database.init_graphiti import graphiti
@@ -21,6 +33,10 @@ SEED_SOURCE = "seed"
 
 LORE_PREFIX = f"lore{GROUP_SEP}"
 
+# Estimated Jaccard similarity (over word shingles) at or above which a new
+# entry counts as a near-duplicate of an existing entry in the same group.
+NEAR_DUPLICATE_THRESHOLD = 0.9
+
 
 def lore_group_id(world_name: str) -> str:
     """Build the Graphiti group_id for a lore world."""
@@ -32,6 +48,16 @@ def name_from_group_id(group_id: str, prefix: str) -> str:
     return group_id[len(prefix) :].replace("_", " ")
 
 
+def _record_to_entry(r: object) -> dict[str, object]:
+    return {
+        "uuid": r["uuid"],
+        "title": r["title"],
+        "content": r["content"],
+        "group_id": r["group_id"],
+        "created_at": r["created_at"].isoformat() if hasattr(r["created_at"], "isoformat") else str(r["created_at"]),
+    }
+
+
 # ---------------------------------------------------------------------------
 # World operations
 # ---------------------------------------------------------------------------
@@ -139,14 +165,165 @@ async def get_entry(episode_uuid: str) -> dict[str, object] | None:
     }
 
 
+# ---------------------------------------------------------------------------
+# Duplicate detection
+# ---------------------------------------------------------------------------
+#
+# Fingerprints (content hash, MinHash signature, LSH band keys) are written on
+# every episode by ``add_fingerprinted_episode``; see graphiti_fingerprints.
+# Near-duplicate candidates are the episodes sharing at least one LSH band
+# with the new content, fetched through the per-band indexes; only their
+# signatures are compared.
+#
+# Creates are serialized per group while they check for duplicates, and a
+# create that passed the check stays registered as pending until its episode
+# is stored, so concurrent creates of the same content in this process cannot
+# both slip through.
+
+_LSH_CANDIDATES_QUERY = (
+    "CALL {\n"
+    + "\nUNION\n".join(
+        f"    MATCH (e:Episodic {{group_id: $gid, {prop}: $band_{band}}}) RETURN e"
+        for band, prop in enumerate(LSH_PROPERTIES)
+    )
+    + """
+}
+WITH e
+WHERE e.content_minhash IS NOT NULL AND e.source_description <> $seed_src
+RETURN e.uuid AS uuid, e.content_minhash AS minhash
+"""
+)
+
+
+@dataclass
+class _PendingEntry:
+    """A create that passed the duplicate check and is still being ingested.
+
+    ``created`` resolves to the stored entry, or None if ingestion failed.
+    """
+
+    digest: str
+    signature: list[int]
+    created: asyncio.Future[dict[str, object] | None]
+
+
+_group_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+_pending_entries: defaultdict[str, list[_PendingEntry]] = defaultdict(list)
+
+
+async def find_duplicate_entry(group_id: str, content: str) -> dict[str, object] | None:
+    """Return an existing entry in *group_id* whose content duplicates *content*.
+
+    Exact duplicates are found through the indexed content hash; failing that,
+    entries sharing an LSH band with *content* are compared by MinHash and the
+    most similar one at or above ``NEAR_DUPLICATE_THRESHOLD`` is returned.
+    None if nothing matches.
+    """
+    await backfill_group_fingerprints(group_id, SEED_SOURCE)
+
+    records, _, _ = await graphiti.driver.execute_query(
+        """
+        MATCH (e:Episodic {group_id: $gid, content_hash: $hash})
+        WHERE e.source_description <> $seed_src
+        RETURN e.uuid AS uuid, e.name AS title, e.content AS content,
+               e.group_id AS group_id, e.created_at AS created_at
+        LIMIT 1
+        """,
+        params={"gid": group_id, "hash": content_hash(content), "seed_src": SEED_SOURCE},
+    )
+    if records:
+        return _record_to_entry(records[0])
+
+    signature = minhash_signature(content)
+    if not signature:
+        return None
+    records, _, _ = await graphiti.driver.execute_query(
+        _LSH_CANDIDATES_QUERY,
+        params={
+            "gid": group_id,
+            "seed_src": SEED_SOURCE,
+            **{f"band_{band}": key for band, key in enumerate(lsh_bands(signature))},
+        },
+    )
+    best_uuid, best_score = None, 0.0
+    for r in records:
+        score = minhash_similarity(signature, list(r["minhash"]))
+        if score > best_score:
+            best_uuid, best_score = r["uuid"], score
+    if best_uuid is None or best_score < NEAR_DUPLICATE_THRESHOLD:
+        return None
+    logger.info(
+        f"🧬 Near-duplicate of {best_uuid} in group_id={group_id!r} "
+        f"(similarity={best_score:.2f}, candidates={len(records)})"
+    )
+    return await get_entry(best_uuid)
+
+
+def _pending_duplicate(group_id: str, digest: str, signature: list[int]) -> _PendingEntry | None:
+    for pending in _pending_entries[group_id]:
+        if pending.digest == digest or minhash_similarity(signature, pending.signature) >= NEAR_DUPLICATE_THRESHOLD:
+            return pending
+    return None
+
+
+def _release_pending(group_id: str, claim: _PendingEntry, entry: dict[str, object] | None) -> None:
+    _pending_entries[group_id].remove(claim)
+    if not _pending_entries[group_id]:
+        del _pending_entries[group_id]
+    if not claim.created.done():
+        claim.created.set_result(entry)
+
+
 async def create_entry(
     group_id: str,
     title: str,
     content: str,
     source_description: str = "manual",
+    dedupe: bool = True,
 ) -> dict[str, object]:
-    """Add an episode to a group.  Returns the created entry dict."""
-    result = await graphiti.add_episode(
+    """Add an episode to a group.  Returns the created entry dict.
+
+    With *dedupe* (the default), content that already exists in the group --
+    exactly or as a near-duplicate, stored or still being ingested by a
+    concurrent create -- is not ingested again; the existing entry is returned
+    instead.  The returned dict's ``duplicate`` flag tells the two cases apart.
+    """
+    if not dedupe:
+        return await _ingest_entry(group_id, title, content, source_description)
+
+    digest, signature = content_hash(content), minhash_signature(content)
+    claim = None
+    async with _group_locks[group_id]:
+        pending = _pending_duplicate(group_id, digest, signature)
+        existing = None if pending is not None else await find_duplicate_entry(group_id, content)
+        if pending is None and existing is None:
+            claim = _PendingEntry(digest, signature, asyncio.get_running_loop().create_future())
+            _pending_entries[group_id].append(claim)
+
+    if pending is not None:
+        existing = await asyncio.shield(pending.created)
+        if existing is None:
+            # The concurrent create failed, so the content is not stored after all.
+            return await create_entry(group_id, title, content, source_description)
+    if existing is not None:
+        logger.info(
+            f"♻️ Skipped duplicate entry '{title}' in group_id={group_id!r}, "
+            f"matches '{existing['title']}' (uuid={existing['uuid']})"
+        )
+        return {**existing, "duplicate": True}
+
+    entry = None
+    try:
+        entry = await _ingest_entry(group_id, title, content, source_description)
+        return entry
+    finally:
+        _release_pending(group_id, claim, entry)
+
+
+async def _ingest_entry(
+    group_id: str, title: str, content: str, source_description: str,
+) -> dict[str, object]:
+    result = await add_fingerprinted_episode(
         name=title,
         episode_body=content,
         source=EpisodeType.text,
@@ -165,29 +342,81 @@ async def create_entry(
         "content": ep.content,
         "group_id": group_id,
         "created_at": ep.created_at.isoformat(),
+        "duplicate": False,
     }
 
 
+async def rename_entry(
+    episode_uuid: str, title: str, content: str | None = None,
+) -> dict[str, object] | None:
+    """Change an episode's title in place.  No re-extraction, UUID is kept.
+
+    *content* replaces the stored body verbatim; only pass it for
+    formatting-only edits, which leave the extracted facts and the
+    fingerprints valid.
+    """
+    records, _, _ = await graphiti.driver.execute_query(
+        """
+        MATCH (e:Episodic {uuid: $uuid})
+        SET e.name = $name, e.content = coalesce($content, e.content)
+        RETURN e.uuid AS uuid, e.name AS title, e.content AS content,
+               e.group_id AS group_id, e.created_at AS created_at
+        """,
+        params={"uuid": episode_uuid, "name": title, "content": content},
+    )
+    if not records:
+        return None
+    logger.info(f"✏️ Renamed entry to '{title}' (uuid={episode_uuid})")
+    return _record_to_entry(records[0])
+
+
 async def update_entry(
     episode_uuid: str, title: str | None = None, content: str | None = None,
 ) -> dict[str, object] | None:
-    """Update an entry by removing the old episode and creating a new one.
+    """Update an entry, doing only as much work as the change requires.
+
+    The returned entry dict's ``change`` says what happened:
+
+    - ``"unchanged"``: same title, same content; nothing is written.
+    - ``"renamed"``: only the title changed; renamed in place, UUID kept.
+    - ``"reformatted"``: the content changed only in whitespace (the title may
+      have changed too); the new text is stored in place without re-running
+      extraction, UUID kept.
+    - ``"updated"``: the content changed; the old episode is removed and a new
+      one created, which re-runs Graphiti extraction and assigns a new UUID.
 
-    Returns the new entry dict (with a new UUID), or None if the old episode
-    was not found.
+    Returns None if the old episode was not found.
     """
     old = await get_entry(episode_uuid)
     if old is None:
         return None
 
+    old_content = str(old["content"] or "")
     new_title = title if title is not None else str(old["title"])
-    new_content = content if content is not None else str(old["content"])
+    new_content = content if content is not None else old_content
     old_group_id = str(old["group_id"])
 
+    title_changed = new_title != old["title"]
+
+    if new_content == old_content:
+        if not title_changed:
+            logger.info(f"⏭️ Entry {episode_uuid} unchanged, skipping update")
+            return {**old, "change": "unchanged"}
+        renamed = await rename_entry(episode_uuid, new_title)
+        return None if renamed is None else {**renamed, "change": "renamed"}
+
+    if content_hash(new_content) == content_hash(old_content):
+        reformatted = await rename_entry(episode_uuid, new_title, new_content)
+        logger.info(f"✏️ Stored whitespace-only edit of entry {episode_uuid} without re-extraction")
+        return None if reformatted is None else {**reformatted, "change": "reformatted"}
+
     await graphiti.remove_episode(episode_uuid)
     logger.info(f"✏️ Removed old episode {episode_uuid} for update")
 
-    return await create_entry(old_group_id, new_title, new_content, source_description="update")
+    created = await create_entry(
+        old_group_id, new_title, new_content, source_description="update", dedupe=False,
+    )
+    return {**created, "change": "updated"}
 
 
 async def delete_entry(episode_uuid: str) -> bool:
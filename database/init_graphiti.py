@@ -3,6 +3,7 @@ from collections.abc import Iterable
 from logging import getLogger
 
 from langchain_ollama import OllamaEmbeddings
+from openai import AsyncOpenAI
 
 from graphiti_core import Graphiti
 from graphiti_core.llm_client.config import LLMConfig
@@ -10,6 +11,7 @@ from graphiti_core.llm_client.openai_generic_client import OpenAIGenericClient
 from graphiti_core.embedder.client import EmbedderClient, EmbedderConfig
 from graphiti_core.cross_encoder.openai_reranker_client import OpenAIRerankerClient
 from hephaestus.settings import settings
+from utils.llm_cassette import cassette_http_client
 
 s = settings.graphiti
 
@@ -48,11 +50,18 @@ llm_config = LLMConfig(
     small_model=XAI_SMALL_MODEL,
 )
 
-llm_client = OpenAIGenericClient(config=llm_config)
+# Only set when an LLM cassette mode is active; otherwise Graphiti builds its own.
+_cassette_http_client = cassette_http_client()
+_xai_client = (
+    AsyncOpenAI(api_key=XAI_API_KEY, base_url=XAI_BASE_URL, http_client=_cassette_http_client)
+    if _cassette_http_client is not None else None
+)
+
+llm_client = OpenAIGenericClient(config=llm_config, client=_xai_client)
 
 embedder = OllamaEmbedder()
 
-cross_encoder = OpenAIRerankerClient(config=llm_config)
+cross_encoder = OpenAIRerankerClient(config=llm_config, client=_xai_client)
 
 graphiti = Graphiti(
     uri=settings.NEO4J.NEO4J_URI,
@@ -6,6 +6,7 @@ from database.models.character import (
 )
 from database.models.campaign import Campaign
 from database.models.conversation import Conversation, Message, conversation_characters
+from database.models.npc_template import NPCTemplate
 from database.models.participants import CampaignNPC, CampaignPlayer
 from database.models.world_state import FactionClock, QuestThread, WorldState
 
@@ -18,6 +19,7 @@ __all__ = [
     "Conversation",
     "FactionClock",
     "Message",
+    "NPCTemplate",
     "Player",
     "PlayerDescription",
     "QuestThread",
@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+from logging import getLogger
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from database.postgres_connection import Base
+
+logger = getLogger(__name__)
+
+
+class NPCTemplate(Base):
+    """🧩 A ready-made NPC card waiting in a lore world's pool.
+
+    Generated in the background by ``agents.npc_pool`` so a mid-scene
+    introduction can adapt a card instead of negotiating one from scratch.
+    The card is a W++ description whose name is the ``{{name}}`` placeholder;
+    ``tags`` are lowercase archetype/role keywords matched against the DM's
+    build instructions. A row is deleted when a scene claims it.
+    """
+
+    __tablename__ = "npc_templates"
+
+    NAME_PLACEHOLDER = "{{name}}"
+
+    id = Column(Integer, primary_key=True)
+    lore_world = Column(String, nullable=False, index=True)
+    archetype = Column(String, nullable=False)
+    tags = Column(JSONB, nullable=False, default=list)
+    card = Column(Text, nullable=False)
+    generation_tokens = Column(Integer, nullable=False, default=0)
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
+
+    def __repr__(self) -> str:
+        return f"<NPCTemplate(id={self.id}, world='{self.lore_world}', archetype='{self.archetype}')>"
@@ -3,9 +3,11 @@ import "./MessageInput.css";
 
 interface MessageInputProps {
   onSend: (text: string) => void;
+  /** When set, a "Correct" button sends the text in place of the running turn. */
+  onCorrect?: (text: string) => void;
 }
 
-const MessageInput = ({ onSend }: MessageInputProps) => {
+const MessageInput = ({ onSend, onCorrect }: MessageInputProps) => {
   const [message, setMessage] = useState("");
   const textareaRef = useRef<HTMLTextAreaElement>(null);
 
@@ -21,13 +23,15 @@ const MessageInput = ({ onSend }: MessageInputProps) => {
     resetHeight();
   };
 
-  const handleSend = useCallback(() => {
+  const submit = useCallback((send: (text: string) => void) => {
     const trimmed = message.trim();
     if (!trimmed) return;
-    onSend(trimmed);
+    send(trimmed);
     setMessage("");
     requestAnimationFrame(() => resetHeight());
-  }, [message, resetHeight, onSend]);
+  }, [message, resetHeight]);
+
+  const handleSend = useCallback(() => submit(onSend), [submit, onSend]);
 
   const handleKeyDown = (e: React.KeyboardEvent<HTMLTextAreaElement>) => {
     if (e.ctrlKey && e.key === "Enter") {
@@ -49,6 +53,17 @@ const MessageInput = ({ onSend }: MessageInputProps) => {
           onChange={handleChange}
           onKeyDown={handleKeyDown}
         />
+        {onCorrect && (
+          <button
+            type="button"
+            className="message-input-send btn btn-outline btn-secondary"
+            disabled={!message.trim()}
+            title="Cancel the turn in progress and send this instead"
+            onClick={() => submit(onCorrect)}
+          >
+            Correct
+          </button>
+        )}
         <button
           type="button"
           className="message-input-send btn-action btn btn-primary"
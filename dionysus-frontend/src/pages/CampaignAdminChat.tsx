@@ -9,6 +9,7 @@ import type {
   SocketErrorPayload,
 } from "../types/socket";
 import { restService } from "../services/restService";
+import { rememberSessionKey, sessionAuth } from "../services/sessionKeys";
 import type { CampaignDetailResponse } from "../types/rest";
 import "./CampaignAdminChat.css";
 
@@ -64,6 +65,7 @@ const CampaignAdminChat = () => {
       transports: ["websocket"],
       autoConnect: true,
       forceNew: true,
+      auth: sessionAuth("/campaign-admin"),
     });
 
     socketRef.current = adminSocket;
@@ -80,8 +82,9 @@ const CampaignAdminChat = () => {
       setSessionReady(false);
     });
 
-    adminSocket.on("campaign_admin_session_ready", ({ campaign_id }) => {
+    adminSocket.on("campaign_admin_session_ready", ({ campaign_id, session_key }) => {
       console.log("📋 CampaignAdminChat: session ready for campaign", campaign_id);
+      rememberSessionKey("/campaign-admin", session_key);
       setSessionReady(true);
     });
 
@@ -13,6 +13,8 @@ import type {
   StreamTokenPayload,
   StreamEndPayload,
   MessagesPersistedPayload,
+  TurnQueuedPayload,
+  TurnCancelledPayload,
 } from "../types/socket";
 import "./Chat.css";
 
@@ -23,13 +25,17 @@ interface ChatProps {
 
 const Chat = ({ sidebarOpen, onToggleSidebar }: ChatProps) => {
   const socket = useSocketStore();
-  const { messages, addUserMessage, confirmUserMessage, replaceMessageId, startStream, appendToken, finalizeStream } = useMessageStore();
+  const { messages, addUserMessage, confirmUserMessage, replaceMessageId, removeMessage, startStream, appendToken, finalizeStream } = useMessageStore();
   const { player, characters } = useSessionStore();
   const activeConversationId = useConversationStore((s) => s.activeConversationId);
   const activeConversationTitle = useConversationStore((s) => s.activeConversationTitle);
   const renameConversation = useConversationStore((s) => s.renameConversation);
   const bottomRef = useRef<HTMLDivElement>(null);
 
+  const [queuePosition, setQueuePosition] = useState<number | null>(null);
+  // A turn is in progress while the player's message is unconfirmed or a reply streams.
+  const turnRunning = messages.some((m) => (m.role === "user" && m.id === null) || m.streaming);
+
   const [editingTitle, setEditingTitle] = useState(false);
   const [draftTitle, setDraftTitle] = useState("");
   const titleInputRef = useRef<HTMLInputElement>(null);
@@ -65,6 +71,20 @@ const Chat = ({ sidebarOpen, onToggleSidebar }: ChatProps) => {
   useEffect(() => {
     const handleMessageCreated = ({ messageId }: MessageCreatedPayload) => {
       confirmUserMessage(messageId);
+      // The next queued turn has started.
+      setQueuePosition((p) => (p !== null && p > 1 ? p - 1 : null));
+    };
+
+    const handleTurnQueued = ({ position }: TurnQueuedPayload) => {
+      setQueuePosition(position);
+    };
+
+    const handleTurnCancelled = ({ messageId, retracted }: TurnCancelledPayload) => {
+      // A preempted turn is dropped entirely, the player's message included.
+      removeMessage(messageId);
+      for (const id of retracted) {
+        removeMessage(id);
+      }
     };
 
     const handleStreamStart = ({ messageId, name }: StreamStartPayload) => {
@@ -90,6 +110,8 @@ const Chat = ({ sidebarOpen, onToggleSidebar }: ChatProps) => {
     socket.on("stream_token", handleStreamToken);
     socket.on("stream_end", handleStreamEnd);
     socket.on("messages_persisted", handleMessagesPersisted);
+    socket.on("turn_queued", handleTurnQueued);
+    socket.on("turn_cancelled", handleTurnCancelled);
 
     socket.connect();
 
@@ -99,8 +121,10 @@ const Chat = ({ sidebarOpen, onToggleSidebar }: ChatProps) => {
       socket.off("stream_token", handleStreamToken);
       socket.off("stream_end", handleStreamEnd);
       socket.off("messages_persisted", handleMessagesPersisted);
+      socket.off("turn_queued", handleTurnQueued);
+      socket.off("turn_cancelled", handleTurnCancelled);
     };
-  }, [socket, confirmUserMessage, replaceMessageId, startStream, appendToken, finalizeStream]);
+  }, [socket, confirmUserMessage, replaceMessageId, removeMessage, startStream, appendToken, finalizeStream]);
 
   const connectionId = useSocketStore((s) => s.connectionId);
 
@@ -110,17 +134,19 @@ const Chat = ({ sidebarOpen, onToggleSidebar }: ChatProps) => {
   }, [socket, activeConversationId, connectionId]);
 
   const handleSend = useCallback(
-    (text: string) => {
+    (text: string, preempt = false) => {
       if (!player || activeConversationId === null) {
         console.error("🔥 Cannot send message: player or activeConversationId is null");
         return;
       }
       addUserMessage(text, player.name);
-      socket.sendMessage({ conversation_id: activeConversationId, content: text });
+      socket.sendMessage({ conversation_id: activeConversationId, content: text, preempt });
     },
     [socket, player, addUserMessage, activeConversationId],
   ); 
 
+  const handleCorrect = useCallback((text: string) => handleSend(text, true), [handleSend]);
+
   return (
     <div className="page-layout">
       <ChatSidebar
@@ -175,7 +201,12 @@ const Chat = ({ sidebarOpen, onToggleSidebar }: ChatProps) => {
           </div>
         </div>
 
-        <MessageInput onSend={handleSend} />
+        {queuePosition !== null && (
+          <p className="chat-queue-notice">
+            Waiting for {queuePosition} turn{queuePosition === 1 ? "" : "s"} to finish…
+          </p>
+        )}
+        <MessageInput onSend={handleSend} onCorrect={turnRunning ? handleCorrect : undefined} />
       </main>
     </div>
   );
@@ -8,6 +8,7 @@ import type {
   LoreSavingPayload,
   SocketErrorPayload,
 } from "../types/socket";
+import { rememberSessionKey, sessionAuth } from "../services/sessionKeys";
 import "./LoreChat.css";
 
 type LoreSocket = Socket<LoreServerToClientEvents, LoreClientToServerEvents>;
@@ -45,6 +46,7 @@ const LoreChat = () => {
       transports: ["websocket"],
       autoConnect: true,
       forceNew: true,
+      auth: sessionAuth("/lore"),
     });
 
     socketRef.current = loreSocket;
@@ -61,8 +63,9 @@ const LoreChat = () => {
       setSessionReady(false);
     });
 
-    loreSocket.on("lore_session_ready", () => {
+    loreSocket.on("lore_session_ready", ({ session_key }) => {
       console.log("🌍 LoreChat: session ready for", worldName);
+      rememberSessionKey("/lore", session_key);
       setSessionReady(true);
     });
 
@@ -10,6 +10,7 @@ import type {
 } from "../types/socket";
 import type { WorldResponse } from "../types/rest";
 import { restService } from "../services/restService";
+import { rememberSessionKey, sessionAuth } from "../services/sessionKeys";
 import "./NPCBuilderChat.css";
 
 type BuilderSocket = Socket<NPCBuilderServerToClientEvents, NPCBuilderClientToServerEvents>;
@@ -63,6 +64,7 @@ const NPCBuilderChat = () => {
       transports: ["websocket"],
       autoConnect: true,
       forceNew: true,
+      auth: sessionAuth("/npc-builder"),
     });
 
     socketRef.current = builderSocket;
@@ -77,7 +79,8 @@ const NPCBuilderChat = () => {
       setSessionReady(false);
     });
 
-    builderSocket.on("npc_builder_session_ready", () => {
+    builderSocket.on("npc_builder_session_ready", ({ session_key }) => {
+      rememberSessionKey("/npc-builder", session_key);
       setSessionReady(true);
     });
 
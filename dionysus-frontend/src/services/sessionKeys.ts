@@ -0,0 +1,22 @@
+/**
+ * Socket session keys issued by the server, one per namespace.
+ *
+ * The server sends a key in each namespace's ready event; passing it back in
+ * the `auth` payload on reconnect lets any server worker pick up the stored
+ * session (chat history, game message window) where it left off. Kept in
+ * sessionStorage, so each browser tab is its own session.
+ */
+
+const storageKey = (namespace: string) => `dionysus:session_key:${namespace}`;
+
+export function sessionAuth(namespace: string) {
+  // socket.io-client calls this on every (re)connect.
+  return (cb: (data: object) => void) => {
+    const key = sessionStorage.getItem(storageKey(namespace));
+    cb(key ? { session_key: key } : {});
+  };
+}
+
+export function rememberSessionKey(namespace: string, key: string | undefined): void {
+  if (key) sessionStorage.setItem(storageKey(namespace), key);
+}
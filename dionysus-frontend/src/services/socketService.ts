@@ -4,6 +4,7 @@ import type {
   ClientToServerEvents,
   SendMessagePayload,
 } from "../types/socket";
+import { rememberSessionKey, sessionAuth } from "./sessionKeys";
 
 type TypedSocket = Socket<ServerToClientEvents, ClientToServerEvents>;
 
@@ -34,6 +35,11 @@ export class SocketService {
     this.socket = io(url, {
       transports: ["websocket"],
       autoConnect: true,
+      auth: sessionAuth("/"),
+    });
+
+    this.socket.on("session_ready", ({ session_key }) => {
+      rememberSessionKey("/", session_key);
     });
 
     this.socket.on("connect", () => {
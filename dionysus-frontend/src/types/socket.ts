@@ -33,6 +33,23 @@ export interface MessagesPersistedPayload {
 export interface SendMessagePayload {
   conversation_id: number;
   content: string;
+  /**
+   * Cancel the conversation's running turn instead of queueing behind it
+   * (e.g. a correction). The cancelled turn is announced with `turn_cancelled`.
+   */
+  preempt?: boolean;
+}
+
+export interface TurnQueuedPayload {
+  /** How many turns will run before this one. */
+  position: number;
+}
+
+export interface TurnCancelledPayload {
+  /** The cancelled turn's player message. */
+  messageId: string;
+  /** Bubbles the turn had streamed; each also gets an empty `stream_end`. */
+  retracted: string[];
 }
 
 export interface InitSessionPayload {
@@ -48,6 +65,8 @@ export interface SessionReadyPayload {
   conversation_id: number;
   player: ParticipantInfo;
   characters: ParticipantInfo[];
+  /** Send back as `auth.session_key` on reconnect to resume this session. */
+  session_key: string;
 }
 
 export interface ServerToClientEvents {
@@ -57,6 +76,8 @@ export interface ServerToClientEvents {
   stream_end: (payload: StreamEndPayload) => void;
   messages_persisted: (payload: MessagesPersistedPayload) => void;
   session_ready: (payload: SessionReadyPayload) => void;
+  turn_queued: (payload: TurnQueuedPayload) => void;
+  turn_cancelled: (payload: TurnCancelledPayload) => void;
   error: (payload: SocketErrorPayload) => void;
 }
 
@@ -77,10 +98,36 @@ export interface LoreSavingPayload {
   title: string;
 }
 
+export type LoreIngestStatus = "queued" | "extracting" | "done" | "failed";
+
+export interface LoreIngestEntry {
+  index: number;
+  title: string;
+  status: LoreIngestStatus;
+  uuid: string | null;
+  duplicate: boolean;
+  error: string | null;
+  queued_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+  wait_s: number | null;
+  extract_s: number | null;
+}
+
+export interface LoreIngestProgressPayload {
+  job_id: string;
+  world_name: string;
+  entry: LoreIngestEntry;
+  counts: Record<LoreIngestStatus, number>;
+  total: number;
+  finished: boolean;
+}
+
 export interface LoreServerToClientEvents {
-  lore_session_ready: (payload: { world_name: string }) => void;
+  lore_session_ready: (payload: { world_name: string; session_key: string }) => void;
   lore_token: (payload: LoreTokenPayload) => void;
   lore_saving: (payload: LoreSavingPayload) => void;
+  lore_ingest_progress: (payload: LoreIngestProgressPayload) => void;
   lore_done: () => void;
   error: (payload: SocketErrorPayload) => void;
 }
@@ -101,7 +148,7 @@ export interface NPCBuilderCreatedPayload {
 }
 
 export interface NPCBuilderServerToClientEvents {
-  npc_builder_session_ready: (payload: { world_name: string }) => void;
+  npc_builder_session_ready: (payload: { world_name: string; session_key: string }) => void;
   npc_builder_token: (payload: NPCBuilderTokenPayload) => void;
   npc_builder_created: (payload: NPCBuilderCreatedPayload) => void;
   npc_builder_done: () => void;
@@ -124,7 +171,7 @@ export interface CampaignAdminUpdatedPayload {
 }
 
 export interface CampaignAdminServerToClientEvents {
-  campaign_admin_session_ready: (payload: { campaign_id: number }) => void;
+  campaign_admin_session_ready: (payload: { campaign_id: number; session_key: string }) => void;
   campaign_admin_token: (payload: CampaignAdminTokenPayload) => void;
   campaign_admin_updated: (payload: CampaignAdminUpdatedPayload) => void;
   campaign_admin_done: () => void;
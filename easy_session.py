@@ -7,7 +7,7 @@ from database.postgres_connection import session
 from database.models import Player, Character, Conversation
 from hephaestus.langfuse_handler import langfuse_callback_handler
 
-from agents.dungeon_master import spawn_dungeon_master
+from agents.dungeon_master import dm_session_config, get_dungeon_master
 from langchain_core.messages import HumanMessage
 
 logger = getLogger(__name__)
@@ -33,13 +33,13 @@ class EasySession:
             characters=character_objs,
             campaign_id=campaign_id,
         )
-        self.graph = spawn_dungeon_master(self.conversation)
+        self.graph = get_dungeon_master()
         self._messages: list = []
 
     async def send_message(self, message: str) -> list[str]:
         resp = await self.graph.ainvoke(
             {"messages": [HumanMessage(content=message)]},
-            config={"callbacks": [langfuse_callback_handler]},
+            config=dm_session_config(self.conversation, config={"callbacks": [langfuse_callback_handler]}),
         )
         self._messages = resp['messages']
 
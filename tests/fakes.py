@@ -0,0 +1,45 @@
+"""Stand-in chat models for tests; no network, no API keys."""
+from operator import itemgetter
+from typing import Any
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.output_parsers import JsonOutputParser, PydanticOutputParser
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.runnables import Runnable, RunnableMap, RunnablePassthrough
+from pydantic import BaseModel
+
+
+def fake_model(*replies: str | AIMessage) -> GenericFakeChatModel:
+    """A chat model that streams ``replies`` in order, one per call."""
+    messages = [r if isinstance(r, AIMessage) else AIMessage(content=r) for r in replies]
+    return GenericFakeChatModel(messages=iter(messages))
+
+
+class UsageFakeChatModel(GenericFakeChatModel):
+    """Streams like ``GenericFakeChatModel``, then reports ``usage`` in a
+    final empty chunk the way OpenAI-compatible streams do."""
+    usage: dict
+
+    def _stream(self, *args: Any, **kwargs: Any):
+        yield from super()._stream(*args, **kwargs)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self.usage))
+
+
+def include_raw(model: Runnable, schema: type[BaseModel] | dict | None = None) -> Runnable:
+    """The chain ``with_structured_output(..., include_raw=True)`` builds."""
+    parser = PydanticOutputParser(pydantic_object=schema) if isinstance(schema, type) else JsonOutputParser()
+    parsed = RunnablePassthrough.assign(parsed=itemgetter("raw") | parser, parsing_error=lambda _: None)
+    unparsed = RunnablePassthrough.assign(parsed=lambda _: None)
+    return RunnableMap(raw=model) | parsed.with_fallbacks([unparsed], exception_key="parsing_error")
+
+
+class FakeStructuredModel:
+    """Replaces a model in ``utils.llm_models`` whose caller only uses
+    ``with_structured_output(..., include_raw=True)``."""
+
+    def __init__(self, *replies: str | AIMessage):
+        self.model = fake_model(*replies)
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Runnable:
+        return include_raw(self.model, schema)
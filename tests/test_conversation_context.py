@@ -0,0 +1,54 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agents import conversation_context
+from agents.conversation_context import RollingSummary, StorySoFar, _fold
+from tests.fakes import FakeStructuredModel
+
+
+def _conversation(messages):
+    return SimpleNamespace(
+        id=7,
+        player=SimpleNamespace(name="Ada"),
+        characters=[SimpleNamespace(name="Brom")],
+        campaign=SimpleNamespace(location="The Gilded Goat", world_clock=None),
+        message_buffer=messages,
+    )
+
+
+async def _prompt(name, values):
+    return f"{name}: {values['transcript']}"
+
+
+def test_fold_updates_summary_and_covered(monkeypatch):
+    reply = StorySoFar(summary="Ada haggled with Brom over a room.", key_facts=["Brom owes Ada a favour."])
+    monkeypatch.setattr(conversation_context.prompts, "ainvoke", _prompt)
+    monkeypatch.setattr(conversation_context, "context_summarizer", FakeStructuredModel(reply.model_dump_json()))
+    aged_out = [
+        HumanMessage(content="A room, please.", name="Ada", id="m1"),
+        AIMessage(content="Two silver.", name="Brom", id="m2"),
+    ]
+    rolling = RollingSummary()
+
+    asyncio.run(_fold(_conversation(aged_out), rolling, aged_out))
+
+    assert rolling.text == "Ada haggled with Brom over a room.\n- Brom owes Ada a favour."
+    assert rolling.covered == {"m1", "m2"}
+    assert rolling.updates == 1
+    assert rolling.failures == 0
+
+
+def test_fold_keeps_old_summary_when_unparsable(monkeypatch):
+    monkeypatch.setattr(conversation_context.prompts, "ainvoke", _prompt)
+    monkeypatch.setattr(conversation_context, "context_summarizer", FakeStructuredModel(json.dumps({"oops": 1})))
+    aged_out = [HumanMessage(content="Hello.", name="Ada", id="m1")]
+    rolling = RollingSummary(text="Earlier.", covered={"m0"})
+
+    asyncio.run(_fold(_conversation(aged_out), rolling, aged_out))
+
+    assert rolling.text == "Earlier."
+    assert rolling.covered == {"m0"}
+    assert rolling.failures == 1
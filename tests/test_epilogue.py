@@ -0,0 +1,57 @@
+import asyncio
+
+from agents.dungeon_master import epilogue
+from agents.dungeon_master.epilogue import EpilogueJob, _submit
+from utils.turn_scope import after_commit, mark_committed, open_scope
+
+
+def _job(turn, *, campaign_id=1, scene_ended=False, faction=False):
+    return EpilogueJob(
+        campaign_id=campaign_id, lore_world="Aldera", player_name="Ada", active_npcs="Brom",
+        location=f"location {turn}", world_clock="dusk", scene_ended=scene_ended, recent=[],
+        transcript=f"transcript {turn}", world_events="", secrets="", lore="",
+        faction_turns=[f"turn {turn}"] if faction else [],
+    )
+
+
+def test_merge_keeps_newest_snapshot_and_every_faction_turn():
+    merged = _job(1, scene_ended=True, faction=True).merged_into(_job(2)).merged_into(_job(3, faction=True))
+
+    assert merged.transcript == "transcript 3"
+    assert merged.scene_ended
+    assert merged.faction_turns == ["turn 1", "turn 3"]
+
+
+def test_work_waits_for_the_turn_to_commit():
+    ran = []
+
+    async def turn(commit: bool):
+        open_scope(1, "t1")
+        after_commit(lambda: ran.append("queued"))
+        if commit:
+            mark_committed()
+
+    asyncio.run(turn(commit=False))
+    assert ran == []
+    asyncio.run(turn(commit=True))
+    assert ran == ["queued"]
+
+
+def test_each_submission_restarts_the_debounce(monkeypatch):
+    monkeypatch.setattr(epilogue, "EPILOGUE_DEBOUNCE_S", 0.2)
+    ran = []
+
+    async def run(job, lane):
+        ran.append(job.transcript)
+
+    async def scenario():
+        _submit(_job(1, campaign_id=99), run)
+        await asyncio.sleep(0.15)
+        _submit(_job(2, campaign_id=99), run)
+        await asyncio.sleep(0.15)
+        # 0.3s after the first submission, but only 0.15s after the second.
+        assert ran == []
+        await epilogue._lanes[99].worker
+
+    asyncio.run(scenario())
+    assert ran == ["transcript 2"]
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from database import graphiti_worlds
+from database.graphiti_fingerprints import lsh_bands, minhash_signature
+
+BODY = (
+    "The Ember Court rules the volcanic isles from a palace of black glass, "
+    "and its queen has not been seen outside the caldera for a hundred years."
+)
+
+
+def test_near_duplicates_share_an_lsh_band():
+    bands = lsh_bands(minhash_signature(BODY))
+    edited = lsh_bands(minhash_signature(BODY.replace("hundred", "thousand")))
+    unrelated = lsh_bands(minhash_signature("Goblins of the northern marsh trade in eel skins and river salt."))
+
+    assert any(a == b for a, b in zip(bands, edited))
+    assert not any(a == b for a, b in zip(bands, unrelated))
+
+
+def test_concurrent_creates_of_the_same_content_ingest_once(monkeypatch):
+    ingested: list[str] = []
+
+    async def no_duplicates(group_id, content):
+        return None
+
+    async def slow_add_episode(**kwargs):
+        ingested.append(kwargs["name"])
+        await asyncio.sleep(0.05)
+        episode = SimpleNamespace(
+            uuid=f"uuid-{len(ingested)}",
+            name=kwargs["name"],
+            content=kwargs["episode_body"],
+            created_at=datetime.now(timezone.utc),
+        )
+        return SimpleNamespace(episode=episode)
+
+    monkeypatch.setattr(graphiti_worlds, "find_duplicate_entry", no_duplicates)
+    monkeypatch.setattr(graphiti_worlds, "add_fingerprinted_episode", slow_add_episode)
+
+    async def scenario():
+        return await asyncio.gather(
+            graphiti_worlds.create_entry("lore--Test", "Ember Court", BODY),
+            graphiti_worlds.create_entry("lore--Test", "The Ember Court", f"  {BODY}\n"),
+            graphiti_worlds.create_entry("lore--Other", "Ember Court", BODY),
+        )
+
+    first, second, other = asyncio.run(scenario())
+
+    assert ingested == ["Ember Court", "Ember Court"]
+    assert first["duplicate"] is False
+    assert second["duplicate"] is True and second["uuid"] == first["uuid"]
+    assert other["duplicate"] is False
+    assert not graphiti_worlds._pending_entries
+
+
+def test_update_entry_reports_what_changed(monkeypatch):
+    stored = {"uuid": "u1", "title": "Ember Court", "content": BODY, "group_id": "lore--Test", "created_at": "t"}
+    renames: list[tuple[str, str | None]] = []
+    recreated: list[str] = []
+
+    async def get_entry(episode_uuid):
+        return dict(stored)
+
+    async def rename_entry(episode_uuid, title, content=None):
+        renames.append((title, content))
+        return {**stored, "title": title, "content": content or stored["content"]}
+
+    async def remove_episode(episode_uuid):
+        pass
+
+    async def create_entry(group_id, title, content, source_description="manual", dedupe=True):
+        recreated.append(content)
+        return {**stored, "uuid": "u2", "title": title, "content": content, "duplicate": False}
+
+    monkeypatch.setattr(graphiti_worlds, "get_entry", get_entry)
+    monkeypatch.setattr(graphiti_worlds, "rename_entry", rename_entry)
+    monkeypatch.setattr(graphiti_worlds, "create_entry", create_entry)
+    monkeypatch.setattr(graphiti_worlds.graphiti, "remove_episode", remove_episode)
+
+    def update(**kwargs):
+        return asyncio.run(graphiti_worlds.update_entry("u1", **kwargs))
+
+    assert update(title="Ember Court", content=BODY)["change"] == "unchanged"
+    assert update(title="The Ember Court")["change"] == "renamed"
+
+    reformatted = update(content=BODY.replace(", ", ",\n"))
+    assert reformatted["change"] == "reformatted" and reformatted["uuid"] == "u1"
+    assert renames[-1] == ("Ember Court", BODY.replace(", ", ",\n"))
+
+    updated = update(content="The Ember Court has fallen.")
+    assert updated["change"] == "updated" and updated["uuid"] == "u2"
+    assert recreated == ["The Ember Court has fallen."]
@@ -0,0 +1,22 @@
+import asyncio
+
+import httpx
+
+from utils import http_transport
+
+
+def test_model_handle_survives_closing_the_shared_pool(monkeypatch):
+    monkeypatch.setattr(
+        http_transport.httpx, "AsyncHTTPTransport",
+        lambda **kwargs: httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True})),
+    )
+    handle = http_transport.pooled_async_client()
+
+    async def scenario() -> list[int]:
+        first = await handle.get("https://nano-gpt.com/api/v1/models")
+        await http_transport.close_shared_clients()
+        second = await handle.get("https://nano-gpt.com/api/v1/models")
+        await http_transport.close_shared_clients()
+        return [first.status_code, second.status_code]
+
+    assert asyncio.run(scenario()) == [200, 200]
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import httpx
+
+from utils.llm_cassette import AsyncCassetteTransport, _Cassettes, request_key
+
+URL = "https://llm.test/v1/chat/completions"
+BODY = {"model": "narrator", "messages": [{"role": "user", "content": "Describe the tavern."}]}
+
+
+def upstream():
+    """A streaming endpoint that answers ``reply-<n>`` to its n-th call; the
+    first call stalls mid-stream so a hedge overtakes it."""
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        n = calls
+
+        async def chunks():
+            yield b"reply-"
+            if n == 1:
+                await asyncio.sleep(5)
+            yield str(n).encode()
+
+        return httpx.Response(200, content=chunks())
+
+    return httpx.MockTransport(handler)
+
+
+async def fetch(client: httpx.AsyncClient) -> str:
+    async with client.stream("POST", URL, json=BODY) as response:
+        return (await response.aread()).decode()
+
+
+async def hedged_fetch(client: httpx.AsyncClient) -> str:
+    """Like ``llm_resilience``'s hedging: a backup with the same request starts
+    when the primary is slow, and the loser of the race is cancelled."""
+    primary = asyncio.create_task(fetch(client))
+    done, _ = await asyncio.wait({primary}, timeout=0.05)
+    if done:
+        return primary.result()
+    backup = asyncio.create_task(fetch(client))
+    done, pending = await asyncio.wait({primary, backup}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    return done.pop().result()
+
+
+async def session(transport: httpx.AsyncBaseTransport) -> list[str]:
+    """A hedged call, then the same request twice more (e.g. retries)."""
+    async with httpx.AsyncClient(transport=transport) as client:
+        return [await hedged_fetch(client), await fetch(client), await fetch(client)]
+
+
+def test_hedged_calls_round_trip_through_a_cassette(tmp_path):
+    recorded = asyncio.run(session(AsyncCassetteTransport(upstream(), "record", _Cassettes(tmp_path, 0))))
+    assert recorded == ["reply-2", "reply-3", "reply-4"]
+
+    key = request_key(httpx.Request("POST", URL, json=BODY))
+    interactions = json.loads((tmp_path / f"{key}.json").read_text())["interactions"]
+    assert len(interactions) == 3
+
+    def offline(request: httpx.Request) -> httpx.Response:
+        raise AssertionError("replay went to the network")
+
+    replay = AsyncCassetteTransport(httpx.MockTransport(offline), "replay", _Cassettes(tmp_path, 0))
+    assert asyncio.run(session(replay)) == recorded
+
+
+def test_replay_serves_the_last_response_once_a_key_runs_out(tmp_path):
+    async def record() -> str:
+        transport = AsyncCassetteTransport(upstream(), "record", _Cassettes(tmp_path, 0))
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await hedged_fetch(client)
+
+    assert asyncio.run(record()) == "reply-2"
+
+    replay = AsyncCassetteTransport(httpx.MockTransport(lambda request: None), "replay", _Cassettes(tmp_path, 0))
+    assert asyncio.run(session(replay)) == ["reply-2", "reply-2", "reply-2"]
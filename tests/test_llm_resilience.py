@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+
+from tests.fakes import UsageFakeChatModel, fake_model, include_raw
+from utils import llm_resilience
+from utils.llm_resilience import InvokePolicy, resilient_invoke
+
+USAGE = {"input_tokens": 20, "output_tokens": 7, "total_tokens": 27}
+
+
+def test_include_raw_result_keeps_raw_and_parsed():
+    result = asyncio.run(resilient_invoke(include_raw(fake_model('{"mood": "wary", "trust": 2}')), "hi",
+                                          policy="npc_mind"))
+
+    assert result["parsed"] == {"mood": "wary", "trust": 2}
+    assert result["parsing_error"] is None
+    assert isinstance(result["raw"], AIMessage)
+    assert result["raw"].content == '{"mood": "wary", "trust": 2}'
+
+
+def test_plain_message_is_aggregated():
+    result = asyncio.run(resilient_invoke(fake_model("The door creaks open."), "hi", policy="npc_narration"))
+
+    assert isinstance(result, AIMessage)
+    assert result.content == "The door creaks open."
+
+
+class Verdict(BaseModel):
+    changed: bool
+
+
+def test_usage_is_recorded_for_parsed_structured_output(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(llm_resilience, "record_llm_call", lambda *args: recorded.append(args[-1]))
+    model = UsageFakeChatModel(messages=iter([AIMessage(content='{"changed": true}')]), usage=USAGE)
+
+    result = asyncio.run(resilient_invoke(model | PydanticOutputParser(pydantic_object=Verdict), "hi",
+                                          policy="scene_change"))
+
+    assert result == Verdict(changed=True)
+    assert recorded == [USAGE]
+
+
+class SlowFirstCallModel(GenericFakeChatModel):
+    """On the first call streams ``slow`` and then hangs for ``delay_s``
+    before finishing; later calls stream ``messages`` and finish at once."""
+    slow: str
+    delay_s: float
+    calls: int = 0
+
+    async def _astream(self, *args: Any, **kwargs: Any):
+        self.calls += 1
+        if self.calls > 1:
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+            return
+        messages, self.messages = self.messages, iter([AIMessage(content=self.slow)])
+        async for chunk in super()._astream(*args, **kwargs):
+            yield chunk
+        self.messages = messages
+        await asyncio.sleep(self.delay_s)
+
+
+class TokenCollector(AsyncCallbackHandler):
+    def __init__(self):
+        self.tokens: list[str] = []
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.tokens.append(token)
+
+
+def test_losing_hedge_tokens_never_reach_callbacks(monkeypatch):
+    policy = InvokePolicy(timeout_s=5, first_token_s=5, max_attempts=1, hedge=True, hedge_after_s=0.05)
+    monkeypatch.setitem(llm_resilience.INVOKE_POLICIES, "test_hedge", policy)
+    model = SlowFirstCallModel(messages=iter([AIMessage(content="quick winner")]), slow="slow loser", delay_s=0.5)
+    # The step after the model only outputs once the model is done, so the
+    # first call streams tokens to callbacks but produces no output in time.
+    chain = model | RunnableLambda(lambda message: message)
+    collector = TokenCollector()
+
+    result = asyncio.run(resilient_invoke(chain, "hi", policy="test_hedge", config={"callbacks": [collector]}))
+
+    assert result.content == "quick winner"
+    assert "".join(collector.tokens) == "quick winner"
+
+
+def test_models_think_unless_thinking_is_disabled():
+    assert llm_resilience._thinks(SimpleNamespace(extra_body=None))
+    assert llm_resilience._thinks(SimpleNamespace(extra_body={"thinking": {"type": "enabled"}}))
+    assert not llm_resilience._thinks(SimpleNamespace(extra_body={"thinking": {"type": "disabled"}}))
@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+import httpx
+
+from utils import llm_resilience
+from utils.llm_resilience import resilient_invoke
+from utils.nanogpt_integration import ChatNanoGPT
+
+
+def _sse(*events: dict) -> bytes:
+    return b"".join(f"data: {json.dumps(e)}\n\n".encode() for e in events) + b"data: [DONE]\n\n"
+
+
+def _chunk(delta: dict, finish_reason: str | None = None) -> dict:
+    return {
+        "id": "c1", "object": "chat.completion.chunk", "created": 0, "model": "test-model",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _completions(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    events = [_chunk({"role": "assistant", "content": "Welcome, "}), _chunk({"content": "traveller."}, "stop")]
+    # Like OpenAI-compatible servers, usage only comes when it is asked for.
+    if body.get("stream_options", {}).get("include_usage"):
+        events.append({
+            "id": "c1", "object": "chat.completion.chunk", "created": 0, "model": "test-model", "choices": [],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15},
+        })
+    return httpx.Response(200, content=_sse(*events), headers={"content-type": "text/event-stream"})
+
+
+def test_streamed_calls_report_usage(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(llm_resilience, "record_llm_call", lambda *args: recorded.append(args[-1]))
+    model = ChatNanoGPT(
+        model="test-model", api_key="test-key",
+        http_async_client=httpx.AsyncClient(transport=httpx.MockTransport(_completions)),
+    )
+
+    result = asyncio.run(resilient_invoke(model, "hi", policy="npc_narration"))
+
+    assert result.content == "Welcome, traveller."
+    assert recorded and recorded[0]["total_tokens"] == 15
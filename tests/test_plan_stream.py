@@ -0,0 +1,60 @@
+import json
+
+from langchain_core.messages import AIMessageChunk, message_chunk_to_message
+
+from agents.dungeon_master.plan_stream import PlanStreamParser
+
+PLAN = {
+    "opening_narration": None,
+    "responding_npcs": [{"name": "Brom", "guidance": "Quote a price.", "withheld_info": []}],
+    "npcs_to_introduce": [],
+    "closing_narration": "The fire crackles.",
+}
+
+
+def _pieces(text: str, size: int = 7) -> list[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _aggregate(chunks: list[AIMessageChunk]):
+    aggregated = chunks[0]
+    for chunk in chunks[1:]:
+        aggregated = aggregated + chunk
+    return message_chunk_to_message(aggregated)
+
+
+def test_tool_call_chunks_emit_fields_and_validate():
+    fields = []
+    parser = PlanStreamParser(lambda name, value: fields.append((name, value)))
+    chunks = [
+        AIMessageChunk(content="", tool_call_chunks=[
+            {"name": "DMPlan" if i == 0 else None, "args": piece, "id": "call_1" if i == 0 else None, "index": 0},
+        ])
+        for i, piece in enumerate(_pieces(json.dumps(PLAN)))
+    ]
+
+    for chunk in chunks:
+        parser.on_chunk(chunk)
+
+    # Everything but the last field completes while streaming.
+    assert [name for name, _ in fields] == list(PLAN)[:-1]
+    assert dict(fields)["responding_npcs"] == PLAN["responding_npcs"]
+
+    plan = parser.finish(_aggregate(chunks))
+
+    assert [name for name, _ in fields] == list(PLAN)
+    assert plan.responding_npcs[0].name == "Brom"
+    assert plan.closing_narration == "The fire crackles."
+
+
+def test_content_chunks_emit_fields_and_validate():
+    fields = []
+    parser = PlanStreamParser(lambda name, value: fields.append((name, value)))
+    chunks = [AIMessageChunk(content=piece) for piece in _pieces(json.dumps(PLAN))]
+
+    for chunk in chunks:
+        parser.on_chunk(chunk)
+    plan = parser.finish(_aggregate(chunks))
+
+    assert [name for name, _ in fields] == list(PLAN)
+    assert plan.responding_npcs[0].guidance == "Quote a price."
@@ -0,0 +1,40 @@
+import asyncio
+
+from api import session_store
+from api.session_store import MemorySessionStore, bind_session_key, session_key
+
+
+class FakeServer:
+    """The two ``socketio.AsyncServer`` session calls the store uses."""
+
+    def __init__(self):
+        self.sessions: dict[tuple[str, str], dict] = {}
+
+    async def save_session(self, sid, session, namespace="/"):
+        self.sessions[(sid, namespace)] = session
+
+    async def get_session(self, sid, namespace="/"):
+        return self.sessions.get((sid, namespace), {})
+
+
+def test_reconnect_with_issued_key_resumes_it(monkeypatch):
+    monkeypatch.setattr(session_store, "_store", MemorySessionStore())
+    sio = FakeServer()
+
+    async def scenario():
+        issued = await bind_session_key(sio, "sid-1", None, namespace="/lore")
+        resumed = await bind_session_key(sio, "sid-2", {"session_key": issued}, namespace="/lore")
+        return issued, resumed, await session_key(sio, "sid-2", "/lore")
+
+    issued, resumed, bound = asyncio.run(scenario())
+    assert issued != "sid-1"
+    assert resumed == bound == issued
+
+
+def test_client_chosen_key_is_replaced(monkeypatch):
+    monkeypatch.setattr(session_store, "_store", MemorySessionStore())
+    sio = FakeServer()
+
+    key = asyncio.run(bind_session_key(sio, "sid-1", {"session_key": "table-7"}))
+
+    assert key != "table-7"
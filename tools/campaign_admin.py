@@ -496,7 +496,9 @@ def build_campaign_admin_tools(campaign_id: int) -> list:
         campaign and won't leak into others.
 
         Returns the new memory's UUID, which you can pass to
-        update_npc_memory or delete_npc_memory later.
+        update_npc_memory or delete_npc_memory later. If the NPC already has
+        a memory with the same (or nearly the same) content, nothing is added
+        and that memory's UUID is returned instead.
         """
         name = npc_name.strip()
         clean_title = title.strip()
@@ -522,6 +524,12 @@ def build_campaign_admin_tools(campaign_id: int) -> list:
             logger.exception(f"❌ [campaign_admin] Failed to create memory for NPC '{name}' (campaign {campaign_id})")
             return f"❌ Failed to create memory: {e}"
 
+        if entry["duplicate"]:
+            return (
+                f"♻️ Not created: NPC '{name}' already has this memory as "
+                f"'{entry['title']}' (uuid={entry['uuid']}) in campaign {campaign_id}."
+            )
+
         logger.info(
             f"🧠 [campaign_admin] Created memory '{clean_title}' for NPC '{name}' "
             f"(uuid={entry['uuid']}, campaign {campaign_id})"
@@ -539,9 +547,9 @@ def build_campaign_admin_tools(campaign_id: int) -> list:
         the field(s) you want to change; the other is preserved. The memory
         must belong to an NPC in this campaign.
 
-        Updating an episode memory re-creates it (Graphiti assigns a new
-        UUID), so use the UUID returned here for any subsequent references.
-        Entity memories keep their UUID.
+        Changing an episode memory's content re-creates it (Graphiti assigns
+        a new UUID), so use the UUID returned here for any subsequent
+        references. Title-only edits and entity memories keep their UUID.
         """
         try:
             existing = await _get_memory(memory_uuid)
@@ -564,6 +572,8 @@ def build_campaign_admin_tools(campaign_id: int) -> list:
             if result is None:
                 return f"❌ Failed to update memory {memory_uuid}."
 
+            if result.get("change") == "unchanged":
+                return f"⏭️ Memory '{result['title']}' is unchanged in campaign {campaign_id}."
             new_uuid = str(result["uuid"])
             note = "" if new_uuid == memory_uuid else f" (new uuid={new_uuid})"
             logger.info(
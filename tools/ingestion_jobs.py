@@ -0,0 +1,184 @@
+"""📦 In-process tracking of background lore ingestion jobs.
+
+``bulk_save_lore_entries`` hands its entries to Graphiti in the background.
+Each call opens an ``IngestionJob`` that records every entry's status
+(queued -> extracting -> done | failed) with timings, so the REST API can be
+polled and the ``/lore`` Socket.IO namespace can stream progress as it
+happens. The aggregate timings are what ``BULK_SAVE_CONCURRENCY`` should be
+tuned against.
+
+Jobs live in process memory; only the most recent ``MAX_TRACKED_JOBS`` are
+kept.
+"""
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from logging import getLogger
+from typing import Literal
+from uuid import uuid4
+
+from pydantic import BaseModel, Field, computed_field
+
+logger = getLogger(__name__)
+
+MAX_TRACKED_JOBS = 100
+
+EntryStatus = Literal["queued", "extracting", "done", "failed"]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _seconds(start: datetime | None, end: datetime | None) -> float | None:
+    if start is None or end is None:
+        return None
+    return round((end - start).total_seconds(), 3)
+
+
+class IngestionEntry(BaseModel):
+    """One entry of an ingestion job and where it is in the pipeline."""
+    index: int
+    title: str
+    status: EntryStatus = "queued"
+    uuid: str | None = None
+    duplicate: bool = Field(default=False, description="True when an existing entry was reused instead.")
+    error: str | None = None
+    queued_at: datetime = Field(default_factory=_now)
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    @computed_field
+    @property
+    def wait_s(self) -> float | None:
+        """Seconds spent queued behind the concurrency limit."""
+        return _seconds(self.queued_at, self.started_at)
+
+    @computed_field
+    @property
+    def extract_s(self) -> float | None:
+        """Seconds spent in Graphiti extraction + writes."""
+        return _seconds(self.started_at, self.finished_at)
+
+
+class IngestionJob(BaseModel):
+    """A batch of lore entries being ingested into one world."""
+    job_id: str
+    world_name: str
+    concurrency: int
+    created_at: datetime = Field(default_factory=_now)
+    finished_at: datetime | None = None
+    entries: list[IngestionEntry] = Field(default_factory=list)
+
+    @computed_field
+    @property
+    def counts(self) -> dict[str, int]:
+        counts = {status: 0 for status in ("queued", "extracting", "done", "failed")}
+        for entry in self.entries:
+            counts[entry.status] += 1
+        return counts
+
+    @computed_field
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    @computed_field
+    @property
+    def elapsed_s(self) -> float:
+        return _seconds(self.created_at, self.finished_at or _now()) or 0.0
+
+    @computed_field
+    @property
+    def mean_extract_s(self) -> float | None:
+        durations = [e.extract_s for e in self.entries if e.extract_s is not None]
+        return round(sum(durations) / len(durations), 3) if durations else None
+
+    @computed_field
+    @property
+    def entries_per_minute(self) -> float | None:
+        completed = sum(1 for e in self.entries if e.finished_at is not None)
+        if not completed or not self.elapsed_s:
+            return None
+        return round(completed * 60.0 / self.elapsed_s, 2)
+
+
+ProgressListener = Callable[[IngestionJob, IngestionEntry], Awaitable[None]]
+
+_jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+_listeners: list[ProgressListener] = []
+
+
+def add_progress_listener(listener: ProgressListener) -> None:
+    """Register a coroutine called after every entry status change."""
+    _listeners.append(listener)
+
+
+async def _notify(job: IngestionJob, entry: IngestionEntry) -> None:
+    for listener in _listeners:
+        try:
+            await listener(job, entry)
+        except Exception:
+            logger.exception(f"🔥 Ingestion progress listener failed for job {job.job_id}")
+
+
+def create_job(world_name: str, titles: list[str], concurrency: int) -> IngestionJob:
+    """📦 Open a job with every entry queued."""
+    job = IngestionJob(
+        job_id=str(uuid4()),
+        world_name=world_name,
+        concurrency=concurrency,
+        entries=[IngestionEntry(index=i, title=title) for i, title in enumerate(titles)],
+    )
+    _jobs[job.job_id] = job
+    while len(_jobs) > MAX_TRACKED_JOBS:
+        _jobs.popitem(last=False)
+    logger.info(f"📦 Ingestion job {job.job_id} opened: {len(titles)} entries for world '{world_name}'")
+    return job
+
+
+def get_job(job_id: str) -> IngestionJob | None:
+    return _jobs.get(job_id)
+
+
+def list_jobs(world_name: str | None = None) -> list[IngestionJob]:
+    """Tracked jobs, newest first, optionally for a single world."""
+    return [j for j in reversed(_jobs.values()) if world_name is None or j.world_name == world_name]
+
+
+def _finish_if_complete(job: IngestionJob) -> None:
+    if job.finished_at is None and all(e.finished_at is not None for e in job.entries):
+        job.finished_at = _now()
+        counts = job.counts
+        logger.info(
+            f"📦 Ingestion job {job.job_id} finished in {job.elapsed_s:.1f}s: "
+            f"{counts['done']} done, {counts['failed']} failed, "
+            f"mean extraction {job.mean_extract_s}s, {job.entries_per_minute} entries/min "
+            f"(concurrency={job.concurrency})"
+        )
+
+
+async def mark_extracting(job: IngestionJob, index: int) -> None:
+    entry = job.entries[index]
+    entry.status = "extracting"
+    entry.started_at = _now()
+    await _notify(job, entry)
+
+
+async def mark_done(job: IngestionJob, index: int, uuid: str, duplicate: bool = False) -> None:
+    entry = job.entries[index]
+    entry.status = "done"
+    entry.uuid = uuid
+    entry.duplicate = duplicate
+    entry.finished_at = _now()
+    _finish_if_complete(job)
+    await _notify(job, entry)
+
+
+async def mark_failed(job: IngestionJob, index: int, error: str) -> None:
+    entry = job.entries[index]
+    entry.status = "failed"
+    entry.error = error
+    entry.finished_at = _now()
+    _finish_if_complete(job)
+    await _notify(job, entry)
@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 from database.graphiti_utils import load_information, make_group_id
 from database.graphiti_types import ENTITY_TYPES
 from database.graphiti_worlds import (
+    content_hash,
     create_entry,
     delete_entry,
     get_entry,
@@ -14,6 +15,7 @@ from database.graphiti_worlds import (
     lore_group_id,
     update_entry,
 )
+from tools.ingestion_jobs import create_job, mark_done, mark_extracting, mark_failed
 
 from hephaestus.settings import settings
 
@@ -80,6 +82,9 @@ async def save_lore_entry(title: str, content: str, world_name: str) -> str:
     Call this once per atomic entry. When saving multiple entries from a
     larger article, call this tool separately for each one with its own
     title and content.
+
+    If the same (or nearly the same) content already exists in the world,
+    nothing new is saved and the existing entry's UUID is returned.
     """
     try:
         content = content.strip()
@@ -88,6 +93,11 @@ async def save_lore_entry(title: str, content: str, world_name: str) -> str:
 
         gid = lore_group_id(world_name)
         entry = await create_entry(gid, title, content, source_description=f"lore_creator:{world_name}")
+        if entry["duplicate"]:
+            return (
+                f"♻️ Not saved: '{title}' duplicates existing entry '{entry['title']}' "
+                f"(uuid={entry['uuid']}) in world '{world_name}'."
+            )
         logger.info(f"📜 Saved '{title}' (uuid={entry['uuid']}) to world '{world_name}'")
         return f"✅ Saved '{entry['title']}' (uuid={entry['uuid']}) to world '{world_name}'."
     except Exception as e:
@@ -104,16 +114,31 @@ async def bulk_save_lore_entries(entries: list[LoreEntryInput], world_name: str)
     standalone title and roughly 40-70 words of content.
 
     Saves run in the background so the conversation stays responsive.
+    Entries whose content already exists in the world are skipped. Progress
+    is tracked as an ingestion job whose id is returned here.
     """
-    valid = [e for e in entries if e.content.strip()]
+    valid: list[LoreEntryInput] = []
+    seen_hashes: set[str] = set()
+    for e in entries:
+        if not e.content.strip():
+            continue
+        digest = content_hash(e.content)
+        if digest in seen_hashes:
+            logger.info(f"♻️ Dropping in-batch duplicate '{e.title}' for world '{world_name}'")
+            continue
+        seen_hashes.add(digest)
+        valid.append(e)
     if not valid:
         return "❌ No entries to save: all content was empty."
 
+    job = create_job(world_name, [e.title for e in valid], BULK_SAVE_CONCURRENCY)
+
     async def _save_all() -> None:
         sem = asyncio.Semaphore(BULK_SAVE_CONCURRENCY)
 
-        async def _save_one(entry: LoreEntryInput) -> bool:
+        async def _save_one(index: int, entry: LoreEntryInput) -> str:
             async with sem:
+                await mark_extracting(job, index)
                 try:
                     gid = lore_group_id(world_name)
                     result = await create_entry(
@@ -122,21 +147,31 @@ async def bulk_save_lore_entries(entries: list[LoreEntryInput], world_name: str)
                         entry.content.strip(),
                         source_description=f"lore_creator:{world_name}",
                     )
-                    logger.info(
-                        f"📜 Bulk-saved '{entry.title}' (uuid={result['uuid']}) "
-                        f"to world '{world_name}'"
-                    )
-                    return True
-                except Exception:
+                except Exception as e:
                     logger.exception(f"❌ Bulk-save failed for '{entry.title}'")
-                    return False
+                    await mark_failed(job, index, f"{type(e).__name__}: {e}")
+                    return "failed"
 
-        results = await asyncio.gather(*[_save_one(e) for e in valid])
-        succeeded = sum(1 for r in results if r)
-        failed = len(results) - succeeded
+                await mark_done(job, index, str(result["uuid"]), duplicate=bool(result["duplicate"]))
+                if result["duplicate"]:
+                    logger.info(
+                        f"♻️ Bulk-save skipped '{entry.title}': duplicates "
+                        f"uuid={result['uuid']} in world '{world_name}'"
+                    )
+                    return "duplicate"
+                logger.info(
+                    f"📜 Bulk-saved '{entry.title}' (uuid={result['uuid']}) "
+                    f"to world '{world_name}'"
+                )
+                return "saved"
+
+        results = await asyncio.gather(*[_save_one(i, e) for i, e in enumerate(valid)])
+        succeeded = results.count("saved")
+        duplicates = results.count("duplicate")
+        failed = results.count("failed")
         logger.info(
             f"📦 Bulk save complete for world '{world_name}': "
-            f"{succeeded} succeeded, {failed} failed out of {len(valid)} "
+            f"{succeeded} succeeded, {duplicates} duplicate, {failed} failed out of {len(valid)} "
             f"(concurrency={BULK_SAVE_CONCURRENCY})"
         )
 
@@ -146,7 +181,7 @@ async def bulk_save_lore_entries(entries: list[LoreEntryInput], world_name: str)
     return (
         f"📦 Queued {len(valid)} lore entries for background save to world "
         f"'{world_name}': {titles}. They will be ingested into the knowledge "
-        "graph shortly."
+        f"graph shortly (ingestion job_id={job.job_id})."
     )
 
 
@@ -181,8 +216,10 @@ async def update_lore_entry(
     """Modify an existing lore entry's title and/or content.
 
     Provide only the field(s) you want to change; the other is preserved.
-    Updating re-creates the entry (Graphiti assigns a new UUID), so
-    subsequent references should use the UUID returned here.
+    Changing the content re-creates the entry (Graphiti assigns a new UUID),
+    so subsequent references should use the UUID returned here. A title-only
+    or whitespace-only change keeps the UUID, and an unchanged entry is left
+    untouched; the result says which of these happened.
 
     Verifies the entry belongs to the named world before updating.
     """
@@ -210,10 +247,26 @@ async def update_lore_entry(
             return f"❌ Failed to update entry {episode_uuid}."
 
         logger.info(
-            f"✏️ Updated lore entry in world '{world_name}': "
+            f"✏️ Updated lore entry in world '{world_name}' ({updated['change']}): "
             f"'{existing['title']}' (uuid={episode_uuid}) -> "
             f"'{updated['title']}' (uuid={updated['uuid']})"
         )
+        if updated["change"] == "unchanged":
+            return (
+                f"⏭️ '{updated['title']}' (uuid={episode_uuid}) is unchanged in "
+                f"world '{world_name}': the new title and content match the stored entry."
+            )
+        if updated["change"] == "renamed":
+            return (
+                f"✅ Renamed '{existing['title']}' to '{updated['title']}' "
+                f"(uuid={episode_uuid} kept) in world '{world_name}'."
+            )
+        if updated["change"] == "reformatted":
+            return (
+                f"✅ Saved the reformatted content of '{updated['title']}' "
+                f"(uuid={episode_uuid} kept) in world '{world_name}'. Only whitespace "
+                f"changed, so the knowledge graph was not re-extracted."
+            )
         return (
             f"✅ Updated '{updated['title']}' (new uuid={updated['uuid']}) "
             f"in world '{world_name}'. The old uuid={episode_uuid} no longer exists."
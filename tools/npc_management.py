@@ -1,9 +1,10 @@
 from logging import getLogger
 
 from langchain.tools import tool
+from sqlalchemy.exc import IntegrityError
 
 from database.models import Character as CharacterModel
-from database.postgres_connection import session
+from database.postgres_connection import Session
 
 logger = getLogger(__name__)
 
@@ -14,13 +15,30 @@ def check_npc_existence(npc_name: str) -> bool:
     return CharacterModel.exists(name=npc_name)
 
 
+def persist_character(name: str, description: str) -> bool:
+    """Insert a character with its first description; False if the name is taken."""
+    # Builders negotiate concurrently and sync tools run in worker threads,
+    # so each call gets its own short-lived session rather than sharing the
+    # global one, and the unique name constraint decides who created it.
+    with Session() as own_session:
+        if own_session.query(CharacterModel.id).filter(CharacterModel.name == name).first() is not None:
+            logger.info(f"🎭 Character '{name}' already exists, keeping it")
+            return False
+        try:
+            character = CharacterModel(name=name)
+            own_session.add(character)
+            own_session.flush()  # Get id before adding description
+            character.add_description(description)
+            own_session.commit()
+        except IntegrityError:
+            own_session.rollback()
+            logger.info(f"🎭 Character '{name}' was created concurrently, keeping it")
+            return False
+    logger.info(f"🎭 Created character '{name}'")
+    return True
+
+
 @tool
 def create_character(name: str, description: str) -> bool:
     """Create a new character in the database."""
-    character = CharacterModel(name=name)
-    session.add(character)
-    session.flush()  # Get id before adding description
-    character.add_description(description)
-    session.commit()
-    logger.info(f"🎭 Created character '{name}'")
-    return True
+    return persist_character(name, description)
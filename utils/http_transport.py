@@ -0,0 +1,193 @@
+"""🔌 Shared, pooled HTTP transport for the NanoGPT chat models.
+
+Every ``ChatNanoGPT`` instance talks to the same ``nano-gpt.com`` host, so
+they all share one httpx connection pool (one async client for ``ainvoke`` /
+``astream``, one sync client for the rare blocking call) instead of each model
+opening its own. HTTP/2 (``httpx[http2]``) lets concurrent calls multiplex
+over a single connection.
+
+Models hold a ``pooled_async_client()`` / ``pooled_sync_client()`` handle that
+forwards each request to the current shared client, so after
+``close_shared_clients()`` the next request simply opens a fresh pool.
+
+Pool limits are read from the environment so each deployment can size them:
+
+    NANOGPT_MAX_CONNECTIONS      total connections in the pool (default 64)
+    NANOGPT_MAX_KEEPALIVE        idle connections kept warm (default 32)
+    NANOGPT_KEEPALIVE_EXPIRY_S   idle connection lifetime (default 120)
+    NANOGPT_HTTP2                "0" to force HTTP/1.1 (default on)
+
+``transport_stats()`` reports how well connections are being reused. When an
+LLM cassette mode is set (see ``utils.llm_cassette``) the pool transport is
+wrapped so requests are recorded to, or replayed from, disk.
+"""
+import importlib.util
+import os
+from dataclasses import asdict, dataclass
+from logging import getLogger
+
+import httpx
+
+from utils.llm_cassette import wrap_async_transport, wrap_sync_transport
+
+logger = getLogger(__name__)
+
+NANOGPT_MAX_CONNECTIONS = int(os.environ.get("NANOGPT_MAX_CONNECTIONS", "64"))
+NANOGPT_MAX_KEEPALIVE = int(os.environ.get("NANOGPT_MAX_KEEPALIVE", "32"))
+NANOGPT_KEEPALIVE_EXPIRY_S = float(os.environ.get("NANOGPT_KEEPALIVE_EXPIRY_S", "120"))
+NANOGPT_HTTP2 = os.environ.get("NANOGPT_HTTP2", "1").lower() not in ("0", "false", "no")
+
+# Connect fast or fail fast; reads are left to the per-request timeout the
+# OpenAI client passes down, since reasoning models can think for minutes.
+_TIMEOUT = httpx.Timeout(connect=10.0, read=None, write=30.0, pool=30.0)
+
+
+@dataclass
+class TransportStats:
+    """Counters for the shared pool. A reused connection opens no new TCP/TLS."""
+    requests: int = 0
+    connections_opened: int = 0
+    tls_handshakes: int = 0
+    http2_responses: int = 0
+    server_errors: int = 0
+
+    def snapshot(self) -> dict[str, object]:
+        data: dict[str, object] = asdict(self)
+        data["reuse_ratio"] = (
+            round(1 - self.connections_opened / self.requests, 3) if self.requests else None
+        )
+        data["http2_enabled"] = _http2_available()
+        data["max_connections"] = NANOGPT_MAX_CONNECTIONS
+        data["max_keepalive"] = NANOGPT_MAX_KEEPALIVE
+        return data
+
+
+_stats = TransportStats()
+_async_client: httpx.AsyncClient | None = None
+_sync_client: httpx.Client | None = None
+
+
+def _http2_available() -> bool:
+    return NANOGPT_HTTP2 and importlib.util.find_spec("h2") is not None
+
+
+def _count_trace_event(event_name: str) -> None:
+    if event_name == "connection.connect_tcp.complete":
+        _stats.connections_opened += 1
+    elif event_name == "connection.start_tls.complete":
+        _stats.tls_handshakes += 1
+
+
+async def _async_trace(event_name: str, info: dict) -> None:
+    _count_trace_event(event_name)
+
+
+def _sync_trace(event_name: str, info: dict) -> None:
+    _count_trace_event(event_name)
+
+
+async def _on_async_request(request: httpx.Request) -> None:
+    _stats.requests += 1
+    request.extensions["trace"] = _async_trace
+
+
+def _on_sync_request(request: httpx.Request) -> None:
+    _stats.requests += 1
+    request.extensions["trace"] = _sync_trace
+
+
+def _count_response(response: httpx.Response) -> None:
+    if response.http_version == "HTTP/2":
+        _stats.http2_responses += 1
+    if response.status_code >= 500:
+        _stats.server_errors += 1
+
+
+async def _on_async_response(response: httpx.Response) -> None:
+    _count_response(response)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=NANOGPT_MAX_CONNECTIONS,
+        max_keepalive_connections=NANOGPT_MAX_KEEPALIVE,
+        keepalive_expiry=NANOGPT_KEEPALIVE_EXPIRY_S,
+    )
+
+
+def shared_async_client() -> httpx.AsyncClient:
+    """The process-wide async client every ChatNanoGPT model reuses."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        http2 = _http2_available()
+        if NANOGPT_HTTP2 and not http2:
+            logger.warning("⚠️ HTTP/2 requested for NanoGPT but 'h2' is not installed, using HTTP/1.1")
+        transport = httpx.AsyncHTTPTransport(http2=http2, limits=_limits())
+        _async_client = httpx.AsyncClient(
+            transport=wrap_async_transport(transport),
+            timeout=_TIMEOUT,
+            event_hooks={"request": [_on_async_request], "response": [_on_async_response]},
+        )
+        logger.info(
+            f"🔌 Shared NanoGPT async client ready (http2={http2}, "
+            f"max_connections={NANOGPT_MAX_CONNECTIONS}, keepalive={NANOGPT_MAX_KEEPALIVE})"
+        )
+    return _async_client
+
+
+def shared_sync_client() -> httpx.Client:
+    """The process-wide sync client, for the occasional blocking ``invoke``."""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        transport = httpx.HTTPTransport(http2=_http2_available(), limits=_limits())
+        _sync_client = httpx.Client(
+            transport=wrap_sync_transport(transport),
+            timeout=_TIMEOUT,
+            event_hooks={"request": [_on_sync_request], "response": [_count_response]},
+        )
+    return _sync_client
+
+
+class _PooledAsyncClient(httpx.AsyncClient):
+    """Sends through whichever shared async client is current."""
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await shared_async_client().send(request, **kwargs)
+
+
+class _PooledClient(httpx.Client):
+    """Sends through whichever shared sync client is current."""
+
+    def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return shared_sync_client().send(request, **kwargs)
+
+
+_pooled_async = _PooledAsyncClient(timeout=_TIMEOUT)
+_pooled_sync = _PooledClient(timeout=_TIMEOUT)
+
+
+def pooled_async_client() -> httpx.AsyncClient:
+    """The handle models keep; survives the shared pool being closed and rebuilt."""
+    return _pooled_async
+
+
+def pooled_sync_client() -> httpx.Client:
+    return _pooled_sync
+
+
+def transport_stats() -> dict[str, object]:
+    """Connection-reuse counters for the shared pool."""
+    return _stats.snapshot()
+
+
+async def close_shared_clients() -> None:
+    """Close both pooled clients. Call at application shutdown; a later
+    request through a model's handle opens a new pool."""
+    global _async_client, _sync_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+    logger.info(f"🔌 Shared NanoGPT clients closed: {transport_stats()}")
@@ -0,0 +1,386 @@
+"""📼 Record/replay cassettes for LLM HTTP traffic.
+
+Wraps the shared NanoGPT transport (see ``utils.http_transport``) so every
+chat model in ``utils.llm_models`` can run against disk instead of the live
+endpoint; ``cassette_http_client()`` does the same for Graphiti's xAI client. Recording happens at the HTTP layer, so streamed SSE chunks,
+structured outputs and tool calls all come back byte-for-byte as recorded.
+
+Selected with environment variables:
+
+    LLM_CASSETTE_MODE       passthrough (default) | record | replay
+    LLM_CASSETTE_DIR        where cassettes live (default ``.cassettes``)
+    LLM_CASSETTE_LATENCY    replay speed: 0 serves instantly (default), 1
+                            reproduces the recorded timing, 0.5 half of it
+
+A cassette file is keyed by a hash of the request (method, path and canonical
+JSON body). Identical requests made more than once are recorded in order and
+replayed in the same order, so retries and repeated prompts stay
+deterministic; once a key's recordings run out, the last one is served again.
+Identical requests in flight at the same time (a hedged call and its backup,
+see ``utils.llm_resilience``) count as one call: only one of their responses
+is recorded, preferring one that streamed to the end, and on replay they all
+get the same interaction. In replay mode a request without a cassette raises
+``CassetteMiss`` instead of going to the network.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+
+import httpx
+
+logger = getLogger(__name__)
+
+CASSETTE_MODES = ("passthrough", "record", "replay")
+
+LLM_CASSETTE_MODE = os.environ.get("LLM_CASSETTE_MODE", "passthrough").lower()
+LLM_CASSETTE_DIR = Path(os.environ.get("LLM_CASSETTE_DIR", ".cassettes"))
+LLM_CASSETTE_LATENCY = float(os.environ.get("LLM_CASSETTE_LATENCY", "0"))
+
+if LLM_CASSETTE_MODE not in CASSETTE_MODES:
+    raise ValueError(f"LLM_CASSETTE_MODE must be one of {CASSETTE_MODES}, got {LLM_CASSETTE_MODE!r}")
+
+
+class CassetteMiss(RuntimeError):
+    """Replay mode was asked for a request that was never recorded."""
+
+
+def request_key(request: httpx.Request) -> str:
+    """Stable hash of what the model is being asked, ignoring transport noise."""
+    body = request.content
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        pass
+    digest = hashlib.sha256()
+    digest.update(request.method.encode("utf-8"))
+    digest.update(request.url.path.encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+
+@dataclass
+class _InFlight:
+    """Identical requests open at the same time, standing for one call."""
+
+    index: int = 0
+    open: int = 1
+    saved: bool = False
+    partial: dict | None = None
+
+
+class _Cassettes:
+    """On-disk store: one JSON file per request key, holding every recorded interaction."""
+
+    def __init__(self, root: Path, latency: float):
+        self.root = root
+        self.latency = latency
+        self._replay_cursor: dict[str, int] = defaultdict(int)
+        self._recorded_this_run: set[str] = set()
+        self._in_flight: dict[str, _InFlight] = {}
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def load(self, key: str, request: httpx.Request) -> dict:
+        """The interaction to replay; pair with ``release`` once the response closes."""
+        path = self._path(key)
+        if not path.exists():
+            raise CassetteMiss(f"No cassette for {request.method} {request.url.path} (key={key[:12]})")
+        interactions = json.loads(path.read_text())["interactions"]
+        call = self._in_flight.get(key)
+        if call is None:
+            call = self._in_flight[key] = _InFlight(index=min(self._replay_cursor[key], len(interactions) - 1))
+            self._replay_cursor[key] += 1
+        else:
+            call.open += 1
+        return interactions[call.index]
+
+    def release(self, key: str) -> None:
+        call = self._in_flight[key]
+        call.open -= 1
+        if not call.open:
+            del self._in_flight[key]
+
+    def begin(self, key: str) -> None:
+        """Note a request about to be recorded; pair with ``finish``."""
+        call = self._in_flight.get(key)
+        if call is None:
+            self._in_flight[key] = _InFlight()
+        else:
+            call.open += 1
+
+    def finish(self, key: str, request: httpx.Request, interaction: dict | None, complete: bool) -> None:
+        """Record the first complete response among concurrent identical requests,
+        or, if none completed, the one that got furthest.  *interaction* is None
+        when the request failed before any response."""
+        call = self._in_flight[key]
+        call.open -= 1
+        if interaction is not None and not call.saved:
+            if complete:
+                call.saved = True
+                self.save(key, request, interaction)
+            elif call.partial is None or len(interaction["chunks"]) > len(call.partial["chunks"]):
+                call.partial = interaction
+        if not call.open:
+            del self._in_flight[key]
+            if not call.saved and call.partial is not None:
+                self.save(key, request, call.partial)
+
+    def save(self, key: str, request: httpx.Request, interaction: dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        # The first recording of a key in this run replaces any stale file;
+        # later ones append, preserving call order for replay.
+        interactions: list[dict] = []
+        if key in self._recorded_this_run and path.exists():
+            interactions = json.loads(path.read_text())["interactions"]
+        interactions.append(interaction)
+        self._recorded_this_run.add(key)
+        path.write_text(json.dumps({
+            "request": {
+                "method": request.method,
+                "path": request.url.path,
+                "body": request.content.decode("utf-8", errors="replace"),
+            },
+            "interactions": interactions,
+        }, indent=2))
+        logger.debug(f"📼 Recorded {request.method} {request.url.path} -> {path.name}")
+
+
+def _interaction(response: httpx.Response, chunks: list[tuple[float, bytes]]) -> dict:
+    return {
+        "status_code": response.status_code,
+        "headers": [[k, v] for k, v in response.headers.multi_items()],
+        "chunks": [[round(offset, 4), base64.b64encode(data).decode("ascii")] for offset, data in chunks],
+    }
+
+
+def _replay_response(request: httpx.Request, interaction: dict, stream) -> httpx.Response:
+    return httpx.Response(
+        status_code=interaction["status_code"],
+        headers=[(k, v) for k, v in interaction["headers"]],
+        stream=stream,
+        request=request,
+    )
+
+
+def _decoded_chunks(interaction: dict) -> list[tuple[float, bytes]]:
+    return [(offset, base64.b64decode(data)) for offset, data in interaction["chunks"]]
+
+
+# ---------------------------------------------------------------------------
+# Async
+# ---------------------------------------------------------------------------
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    def __init__(self, inner: httpx.AsyncByteStream, started: float, on_close):
+        self._inner = inner
+        self._started = started
+        self._on_close = on_close
+        self._chunks: list[tuple[float, bytes]] = []
+        self._complete = False
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._inner:
+            self._chunks.append((time.monotonic() - self._started, chunk))
+            yield chunk
+        self._complete = True
+
+    async def aclose(self) -> None:
+        try:
+            await self._inner.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close(self._chunks, self._complete)
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: list[tuple[float, bytes]], latency: float, on_close):
+        self._chunks = chunks
+        self._latency = latency
+        self._on_close = on_close
+        self._closed = False
+
+    async def __aiter__(self):
+        previous = 0.0
+        for offset, data in self._chunks:
+            if self._latency:
+                await asyncio.sleep(max(0.0, offset - previous) * self._latency)
+            previous = offset
+            yield data
+
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._on_close()
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    """Async transport that records to, or replays from, the cassette store."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, mode: str, cassettes: _Cassettes):
+        self._inner = inner
+        self._mode = mode
+        self._cassettes = cassettes
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        key = request_key(request)
+
+        if self._mode == "replay":
+            interaction = self._cassettes.load(key, request)
+            stream = _AsyncReplayStream(
+                _decoded_chunks(interaction), self._cassettes.latency, lambda: self._cassettes.release(key),
+            )
+            return _replay_response(request, interaction, stream)
+
+        started = time.monotonic()
+        self._cassettes.begin(key)
+        try:
+            response = await self._inner.handle_async_request(request)
+        except BaseException:
+            self._cassettes.finish(key, request, None, complete=False)
+            raise
+
+        def on_close(chunks: list[tuple[float, bytes]], complete: bool) -> None:
+            self._cassettes.finish(key, request, _interaction(response, chunks), complete)
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_AsyncRecordingStream(response.stream, started, on_close),
+            extensions=response.extensions,
+            request=request,
+        )
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+# ---------------------------------------------------------------------------
+# Sync
+# ---------------------------------------------------------------------------
+
+
+class _SyncRecordingStream(httpx.SyncByteStream):
+    def __init__(self, inner: httpx.SyncByteStream, started: float, on_close):
+        self._inner = inner
+        self._started = started
+        self._on_close = on_close
+        self._chunks: list[tuple[float, bytes]] = []
+        self._complete = False
+        self._closed = False
+
+    def __iter__(self):
+        for chunk in self._inner:
+            self._chunks.append((time.monotonic() - self._started, chunk))
+            yield chunk
+        self._complete = True
+
+    def close(self) -> None:
+        try:
+            self._inner.close()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close(self._chunks, self._complete)
+
+
+class _SyncReplayStream(httpx.SyncByteStream):
+    def __init__(self, chunks: list[tuple[float, bytes]], latency: float, on_close):
+        self._chunks = chunks
+        self._latency = latency
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        previous = 0.0
+        for offset, data in self._chunks:
+            if self._latency:
+                time.sleep(max(0.0, offset - previous) * self._latency)
+            previous = offset
+            yield data
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._on_close()
+
+
+class SyncCassetteTransport(httpx.BaseTransport):
+    """Sync twin of ``AsyncCassetteTransport``."""
+
+    def __init__(self, inner: httpx.BaseTransport, mode: str, cassettes: _Cassettes):
+        self._inner = inner
+        self._mode = mode
+        self._cassettes = cassettes
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        key = request_key(request)
+
+        if self._mode == "replay":
+            interaction = self._cassettes.load(key, request)
+            stream = _SyncReplayStream(
+                _decoded_chunks(interaction), self._cassettes.latency, lambda: self._cassettes.release(key),
+            )
+            return _replay_response(request, interaction, stream)
+
+        started = time.monotonic()
+        self._cassettes.begin(key)
+        try:
+            response = self._inner.handle_request(request)
+        except BaseException:
+            self._cassettes.finish(key, request, None, complete=False)
+            raise
+
+        def on_close(chunks: list[tuple[float, bytes]], complete: bool) -> None:
+            self._cassettes.finish(key, request, _interaction(response, chunks), complete)
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_SyncRecordingStream(response.stream, started, on_close),
+            extensions=response.extensions,
+            request=request,
+        )
+
+    def close(self) -> None:
+        self._inner.close()
+
+
+_cassettes = _Cassettes(LLM_CASSETTE_DIR, LLM_CASSETTE_LATENCY)
+
+
+def wrap_async_transport(inner: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    """Return *inner*, or a cassette wrapper around it when a cassette mode is active."""
+    if LLM_CASSETTE_MODE == "passthrough":
+        return inner
+    logger.warning(f"📼 LLM cassette mode '{LLM_CASSETTE_MODE}' active (dir={LLM_CASSETTE_DIR})")
+    return AsyncCassetteTransport(inner, LLM_CASSETTE_MODE, _cassettes)
+
+
+def wrap_sync_transport(inner: httpx.BaseTransport) -> httpx.BaseTransport:
+    if LLM_CASSETTE_MODE == "passthrough":
+        return inner
+    return SyncCassetteTransport(inner, LLM_CASSETTE_MODE, _cassettes)
+
+
+def cassette_http_client() -> httpx.AsyncClient | None:
+    """A cassette-backed client for other OpenAI-compatible endpoints (Graphiti's xAI).
+
+    Returns None in passthrough mode so callers keep their default client.
+    """
+    if LLM_CASSETTE_MODE == "passthrough":
+        return None
+    return httpx.AsyncClient(transport=AsyncCassetteTransport(httpx.AsyncHTTPTransport(), LLM_CASSETTE_MODE, _cassettes))
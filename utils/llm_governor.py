@@ -0,0 +1,311 @@
+"""🚦 Central admission control for upstream model calls.
+
+Every ``resilient_invoke`` call asks the governor of its upstream model for a
+lease before sending a request. Each model gets:
+
+- a concurrency limit, granted in priority order
+  (``LIVE`` narration > ``PLANNING`` > ``BACKGROUND`` memory/faction work),
+  with background work additionally capped to a share of the slots so it
+  can never crowd out an interactive turn;
+- token buckets for requests per minute and (estimated) tokens per minute,
+  refilled continuously, so bursts from several tables are smoothed instead
+  of tripping upstream throttling.
+
+Defaults come from the environment and apply to every model; a JSON object in
+``LLM_GOVERNOR_LIMITS`` overrides them per upstream model name:
+
+    LLM_MAX_CONCURRENCY       in-flight requests per model (default 16)
+    LLM_REQUESTS_PER_MINUTE   request budget per model (default 240)
+    LLM_TOKENS_PER_MINUTE     token budget per model (default 1_000_000)
+    LLM_BACKGROUND_SHARE      fraction of slots background may hold (default 0.5)
+    LLM_GOVERNOR_LIMITS       e.g. {"zai-org/glm-5.2": {"max_concurrency": 8}}
+
+Queue wait is recorded per priority class; see ``governor_stats()``.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field, replace
+from enum import IntEnum
+from logging import getLogger
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+
+logger = getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get("LLM_REQUESTS_PER_MINUTE", "240"))
+LLM_TOKENS_PER_MINUTE = float(os.environ.get("LLM_TOKENS_PER_MINUTE", "1000000"))
+LLM_BACKGROUND_SHARE = float(os.environ.get("LLM_BACKGROUND_SHARE", "0.5"))
+
+# Rough prompt-size estimate; good enough for budgeting, reconciled with the
+# reported usage when the response carries it.
+CHARS_PER_TOKEN = 4
+DEFAULT_COMPLETION_TOKENS = 1024
+
+# Queue-wait samples kept per priority class for percentiles.
+WAIT_WINDOW = 500
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+    LIVE = 0
+    PLANNING = 1
+    BACKGROUND = 2
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    max_concurrency: int = LLM_MAX_CONCURRENCY
+    requests_per_minute: float = LLM_REQUESTS_PER_MINUTE
+    tokens_per_minute: float = LLM_TOKENS_PER_MINUTE
+    background_share: float = LLM_BACKGROUND_SHARE
+
+    @property
+    def background_slots(self) -> int:
+        return max(1, int(self.max_concurrency * self.background_share))
+
+
+def _load_limit_overrides() -> dict[str, ModelLimits]:
+    raw = os.environ.get("LLM_GOVERNOR_LIMITS")
+    if not raw:
+        return {}
+    return {name: replace(ModelLimits(), **fields) for name, fields in json.loads(raw).items()}
+
+
+MODEL_LIMITS: dict[str, ModelLimits] = _load_limit_overrides()
+
+
+class _TokenBucket:
+    """Continuously refilled budget. May go negative when usage is reconciled upward."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until ``amount`` (capped at capacity) is available."""
+        self._refill()
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+    def give_back(self, amount: float) -> None:
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+@dataclass
+class _ClassStats:
+    granted: int = 0
+    total_wait_s: float = 0.0
+    max_wait_s: float = 0.0
+    waits: deque = field(default_factory=lambda: deque(maxlen=WAIT_WINDOW))
+
+    def record(self, wait_s: float) -> None:
+        self.granted += 1
+        self.total_wait_s += wait_s
+        self.max_wait_s = max(self.max_wait_s, wait_s)
+        self.waits.append(wait_s)
+
+    def snapshot(self) -> dict[str, Any]:
+        ordered = sorted(self.waits)
+
+        def pct(q: float) -> float | None:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3) if ordered else None
+
+        return {
+            "granted": self.granted,
+            "mean_wait_s": round(self.total_wait_s / self.granted, 3) if self.granted else None,
+            "p50_wait_s": pct(0.5),
+            "p90_wait_s": pct(0.9),
+            "max_wait_s": round(self.max_wait_s, 3),
+        }
+
+
+_class_stats: dict[Priority, _ClassStats] = {p: _ClassStats() for p in Priority}
+
+
+class Lease:
+    """A granted slot. Release exactly once; extra calls are no-ops."""
+
+    def __init__(self, governor: "ModelGovernor", priority: Priority, tokens: int):
+        self._governor = governor
+        self.priority = priority
+        self.tokens = tokens
+        self._released = False
+
+    def release(self, actual_tokens: int | None = None) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._governor._release(self.priority, self.tokens, actual_tokens)
+
+
+class ModelGovernor:
+    """Priority-ordered concurrency + rate admission for one upstream model."""
+
+    def __init__(self, name: str, limits: ModelLimits):
+        self.name = name
+        self.limits = limits
+        self._in_flight = 0
+        self._background_in_flight = 0
+        self._waiters: list[tuple[int, int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._requests = _TokenBucket(limits.requests_per_minute)
+        self._tokens = _TokenBucket(limits.tokens_per_minute)
+        self._wake: asyncio.TimerHandle | None = None
+
+    def _rate_delay(self, tokens: int) -> float:
+        return max(self._requests.delay_for(1), self._tokens.delay_for(tokens))
+
+    def _can_run(self, priority: Priority) -> bool:
+        if self._in_flight >= self.limits.max_concurrency:
+            return False
+        return priority != Priority.BACKGROUND or self._background_in_flight < self.limits.background_slots
+
+    def _grant(self, priority: Priority, tokens: int) -> None:
+        self._in_flight += 1
+        if priority == Priority.BACKGROUND:
+            self._background_in_flight += 1
+        self._requests.take(1)
+        self._tokens.take(tokens)
+
+    def _release(self, priority: Priority, tokens: int, actual_tokens: int | None) -> None:
+        self._in_flight -= 1
+        if priority == Priority.BACKGROUND:
+            self._background_in_flight -= 1
+        if actual_tokens is not None:
+            if actual_tokens < tokens:
+                self._tokens.give_back(tokens - actual_tokens)
+            else:
+                self._tokens.take(actual_tokens - tokens)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant queued waiters in priority order while slots and budget allow."""
+        if self._wake is not None:
+            self._wake.cancel()
+            self._wake = None
+        held_back = []
+        while self._waiters:
+            priority, seq, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._in_flight >= self.limits.max_concurrency:
+                break
+            if not self._can_run(Priority(priority)):
+                # Background over its share; let later (interactive) waiters through.
+                held_back.append(heapq.heappop(self._waiters))
+                continue
+            delay = self._rate_delay(tokens)
+            if delay > 0:
+                self._wake = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                break
+            heapq.heappop(self._waiters)
+            self._grant(Priority(priority), tokens)
+            future.set_result(None)
+        for item in held_back:
+            heapq.heappush(self._waiters, item)
+
+    async def acquire(self, priority: Priority, tokens: int) -> Lease:
+        """Wait for a slot and rate budget; queue wait is recorded per class."""
+        queued_at = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), tokens, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted in the same tick we were cancelled: hand the slot back.
+                self._release(priority, tokens, 0)
+            raise
+        wait_s = time.monotonic() - queued_at
+        _class_stats[priority].record(wait_s)
+        if wait_s > 1.0:
+            logger.info(f"🚦 [{self.name}] {priority.name} call waited {wait_s:.1f}s for admission")
+        return Lease(self, priority, tokens)
+
+    def try_acquire(self, priority: Priority, tokens: int) -> Lease | None:
+        """Grant immediately if nobody is queued and budget allows, else None."""
+        if any(not f.done() for *_, f in self._waiters):
+            return None
+        if not self._can_run(priority) or self._rate_delay(tokens) > 0:
+            return None
+        self._grant(priority, tokens)
+        _class_stats[priority].record(0.0)
+        return Lease(self, priority, tokens)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "background_in_flight": self._background_in_flight,
+            "queued": sum(1 for *_, f in self._waiters if not f.done()),
+            "limits": asdict(self.limits),
+        }
+
+
+_governors: dict[str, ModelGovernor] = {}
+
+
+def underlying_model(runnable: Any) -> BaseChatModel | None:
+    """Find the chat model inside a bound / structured-output runnable."""
+    for _ in range(8):
+        if runnable is None or isinstance(runnable, BaseChatModel):
+            return runnable
+        runnable = getattr(runnable, "bound", None) or getattr(runnable, "first", None)
+    return None
+
+
+def governor_for(model: BaseChatModel | None) -> ModelGovernor:
+    name = (getattr(model, "model_name", None) or type(model).__name__) if model is not None else "default"
+    governor = _governors.get(name)
+    if governor is None:
+        governor = _governors[name] = ModelGovernor(name, MODEL_LIMITS.get(name, ModelLimits()))
+    return governor
+
+
+def estimate_tokens(input: Any, model: BaseChatModel | None) -> int:
+    """Prompt size by character count plus the model's completion budget."""
+    if hasattr(input, "to_messages"):
+        messages = input.to_messages()
+    elif isinstance(input, list):
+        messages = input
+    else:
+        messages = [input]
+    chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+    completion = getattr(model, "max_tokens", None) or DEFAULT_COMPLETION_TOKENS
+    return chars // CHARS_PER_TOKEN + completion
+
+
+def reported_tokens(result: Any) -> int | None:
+    """Actual token usage when the response reports it."""
+    if isinstance(result, AIMessage) and result.usage_metadata:
+        return result.usage_metadata.get("total_tokens")
+    return None
+
+
+def governor_stats() -> dict[str, Any]:
+    """Queue wait per priority class and live occupancy per model."""
+    return {
+        "classes": {p.name.lower(): _class_stats[p].snapshot() for p in Priority},
+        "models": {name: g.snapshot() for name, g in _governors.items()},
+    }
@@ -58,6 +58,8 @@ lore_creator = ChatNanoGPT(**nanogpt) #ChatXAI(**xai, extra_body={"reasoning_eff
 memory_filter = ChatNanoGPT(**_nano(thinking_disabled=True, max_tokens=1024)) #ChatXAI(**xai)
 
 npc_builder = ChatNanoGPT(**nanogpt) #ChatXAI(**xai, extra_body={"reasoning_effort": "high"})
+# Adapting a pooled NPC card to a new name and brief is a light rewrite.
+npc_template_adapter = ChatNanoGPT(**_nano(thinking_disabled=True, max_tokens=1536))
 
 # --- Campaign Admin (out-of-character campaign configuration chat) ---
 campaign_admin = ChatNanoGPT(**nanogpt) #ChatXAI(**xai, extra_body={"reasoning_effort": "high"})
@@ -77,4 +79,6 @@ dm_continuity_model = ChatNanoGPT(**_nano(thinking_disabled=True, max_tokens=512
 dm_referee_model = ChatNanoGPT(**_nano(reasoning_effort="high", max_tokens=1024)) #ChatXAI(**xai)
 dm_ooc_model = ChatNanoGPT(**nanogpt) #ChatXAI(**xai)
 dm_summarizer_model = ChatNanoGPT(**_nano(reasoning_effort="high", max_tokens=1024)) #ChatXAI(**xai)
+# Rolling "story so far" for prompt context: frequent, so cheap and non-reasoning.
+context_summarizer = ChatNanoGPT(**_nano(thinking_disabled=True, max_tokens=1024))
 dm_faction_model = ChatNanoGPT(**nanogpt) #ChatXAI(**xai, extra_body={"reasoning_effort": "high"})
\ No newline at end of file
@@ -0,0 +1,558 @@
+"""🛟 Resilient, hedged model invocation for every DM/NPC hop.
+
+The nano-gpt endpoint intermittently returns a server-side "Request timed
+out" SSE error (raised as ``openai.APIError``) or silently stalls.
+``resilient_invoke`` bounds that tail:
+
+- **Hedging** -- if an attempt has produced no output by the adaptive
+  threshold (the p90 time-to-first-token of recent calls for that policy), a
+  duplicate request is sent. Whichever produces output first wins; the loser
+  is cancelled. Each attempt's streamed tokens are held back from callbacks
+  until it has won, so a losing hedge never reaches the token streams.
+- **Stall detection** -- an attempt with no output after ``first_token_s`` is
+  abandoned as stalled.
+- **Retries** -- transient failures (API errors, timeouts, stalls) are retried
+  with backoff up to the policy's ``max_attempts``; permanent 4xx errors fail
+  fast.
+
+Each call names a policy (usually the model's role in ``utils.llm_models``).
+Defaults live in ``INVOKE_POLICIES`` and can be overridden per deployment with
+a JSON object in ``LLM_INVOKE_POLICIES``, e.g.
+``{"dm_narrator": {"timeout_s": 45, "hedge": false}}``. A policy's
+``reasoning_timeout_s`` replaces ``timeout_s`` when the model thinks before
+answering (its thinking is not disabled).
+
+Calls go through ``astream`` so the first token is observable; streaming
+callbacks (LangGraph's ``messages`` mode) see the winner's tokens exactly as
+with ``ainvoke``.
+
+Every attempt is admitted by the model's governor (``utils.llm_governor``) at
+the policy's priority. A hedge is only sent when the governor can admit it
+immediately -- duplicating requests into a saturated upstream would only
+deepen the queue.
+
+Callers that want the output as it streams pass a ``ChunkListener``. It only
+ever sees the winning attempt: ``reset()`` is called when a winner is chosen
+(again on a retry), followed by every chunk that winner has produced so far
+and then each new one.
+"""
+import asyncio
+import inspect
+import json
+import os
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field, replace
+from logging import getLogger
+from typing import Any, Protocol
+
+import openai
+from langchain_core.callbacks import AsyncCallbackHandler, BaseCallbackHandler, Callbacks
+from langchain_core.messages import AIMessage, BaseMessageChunk, message_chunk_to_message
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import Runnable, RunnableConfig, ensure_config
+from langchain_core.runnables.config import merge_configs
+from langchain_core.runnables.utils import AddableDict
+
+from utils.llm_governor import (
+    ModelGovernor,
+    Priority,
+    estimate_tokens,
+    governor_for,
+    underlying_model,
+)
+from utils.metrics import record_llm_call, record_llm_error, record_llm_ttft
+
+logger = getLogger(__name__)
+
+# Samples of time-to-first-token kept per policy for the adaptive threshold.
+HEDGE_WINDOW = 200
+# Below this many samples the policy's static ``hedge_after_s`` is used.
+HEDGE_MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 0.9
+
+# Permanent client errors -- retrying won't change the outcome, so fail fast.
+NON_RETRYABLE_API_ERRORS = (
+    openai.BadRequestError,
+    openai.AuthenticationError,
+    openai.PermissionDeniedError,
+    openai.NotFoundError,
+    openai.UnprocessableEntityError,
+    openai.ConflictError,
+)
+
+
+class FirstTokenTimeout(asyncio.TimeoutError):
+    """No attempt produced any output within the policy's ``first_token_s``."""
+
+
+class ChunkListener(Protocol):
+    def reset(self) -> None: ...
+    def on_chunk(self, chunk: Any) -> None: ...
+
+
+@dataclass(frozen=True)
+class InvokePolicy:
+    """Timeouts, retry budget and hedging for one kind of model call."""
+    timeout_s: float = 180.0
+    first_token_s: float = 180.0
+    max_attempts: int = 3
+    backoff_s: tuple[float, ...] = (2.0, 5.0)
+    hedge: bool = False
+    hedge_after_s: float = 8.0
+    min_hedge_after_s: float = 1.0
+    priority: Priority = Priority.PLANNING
+    reasoning_timeout_s: float | None = None
+
+
+# Latency-critical hops on the player's wait path hedge; expensive reasoning
+# calls (planner, thoughts) and background work only retry. Narration the
+# player is watching stream is LIVE; epilogue and memory work is BACKGROUND.
+INVOKE_POLICIES: dict[str, InvokePolicy] = {
+    "dm_intent": InvokePolicy(timeout_s=30, first_token_s=15, max_attempts=2, hedge=True, hedge_after_s=4),
+    "dm_referee": InvokePolicy(timeout_s=90, first_token_s=60, max_attempts=2, hedge=True, hedge_after_s=20),
+    "dm_planner": InvokePolicy(timeout_s=180, first_token_s=120, max_attempts=2),
+    "dm_continuity": InvokePolicy(timeout_s=30, first_token_s=15, max_attempts=2, hedge=True, hedge_after_s=4),
+    "dm_narrator": InvokePolicy(
+        timeout_s=90, first_token_s=30, max_attempts=2, hedge=True, hedge_after_s=6, priority=Priority.LIVE,
+        reasoning_timeout_s=300,
+    ),
+    "dm_ooc": InvokePolicy(
+        timeout_s=90, first_token_s=30, max_attempts=2, hedge=True, hedge_after_s=6, priority=Priority.LIVE,
+        reasoning_timeout_s=300,
+    ),
+    "dm_npc_reviewer": InvokePolicy(timeout_s=120, first_token_s=90, max_attempts=2),
+    "npc_emotions": InvokePolicy(timeout_s=60, first_token_s=30, max_attempts=2, hedge=True, hedge_after_s=8),
+    "npc_thoughts": InvokePolicy(timeout_s=120, first_token_s=60, max_attempts=2),
+    "npc_mind": InvokePolicy(timeout_s=120, first_token_s=60, max_attempts=2),
+    "npc_narration": InvokePolicy(
+        timeout_s=90, first_token_s=30, max_attempts=2, hedge=True, hedge_after_s=6, priority=Priority.LIVE,
+        reasoning_timeout_s=300,
+    ),
+    "scene_change": InvokePolicy(timeout_s=60, first_token_s=30, priority=Priority.BACKGROUND),
+    "dm_summarizer": InvokePolicy(timeout_s=180, first_token_s=120, priority=Priority.BACKGROUND),
+    "context_summarizer": InvokePolicy(timeout_s=120, first_token_s=60, priority=Priority.BACKGROUND),
+    "dm_faction": InvokePolicy(timeout_s=180, first_token_s=120, priority=Priority.BACKGROUND),
+    "memory_filter": InvokePolicy(timeout_s=60, first_token_s=30, priority=Priority.BACKGROUND),
+    "lore_creator": InvokePolicy(backoff_s=(10.0, 20.0)),
+    "npc_builder": InvokePolicy(backoff_s=(10.0, 20.0)),
+    "npc_template_generator": InvokePolicy(timeout_s=240, first_token_s=120, priority=Priority.BACKGROUND),
+    "npc_template_adapter": InvokePolicy(timeout_s=60, first_token_s=30, max_attempts=2),
+    "campaign_admin": InvokePolicy(backoff_s=(10.0, 20.0)),
+}
+
+
+def _load_overrides() -> None:
+    raw = os.environ.get("LLM_INVOKE_POLICIES")
+    if not raw:
+        return
+    for name, fields in json.loads(raw).items():
+        if "backoff_s" in fields:
+            fields["backoff_s"] = tuple(fields["backoff_s"])
+        if "priority" in fields:
+            fields["priority"] = Priority[str(fields["priority"]).upper()]
+        INVOKE_POLICIES[name] = replace(INVOKE_POLICIES.get(name, InvokePolicy()), **fields)
+        logger.info(f"🛟 Invoke policy '{name}' overridden: {INVOKE_POLICIES[name]}")
+
+
+_load_overrides()
+
+
+def get_policy(name: str) -> InvokePolicy:
+    policy = INVOKE_POLICIES.get(name)
+    if policy is None:
+        logger.warning(f"⚠️ No invoke policy named '{name}', using defaults")
+        policy = INVOKE_POLICIES[name] = InvokePolicy()
+    return policy
+
+
+@dataclass
+class InvokeStats:
+    """Per-policy counters plus the rolling time-to-first-token window."""
+    calls: int = 0
+    hedges: int = 0
+    hedges_skipped: int = 0
+    hedge_wins: int = 0
+    retries: int = 0
+    stalls: int = 0
+    failures: int = 0
+    ttft_samples: deque = field(default_factory=lambda: deque(maxlen=HEDGE_WINDOW))
+
+    def percentile(self, q: float) -> float | None:
+        if not self.ttft_samples:
+            return None
+        ordered = sorted(self.ttft_samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def hedge_delay(self, policy: InvokePolicy) -> float:
+        if len(self.ttft_samples) < HEDGE_MIN_SAMPLES:
+            return policy.hedge_after_s
+        return max(policy.min_hedge_after_s, self.percentile(HEDGE_PERCENTILE))
+
+    def snapshot(self, policy: InvokePolicy) -> dict[str, Any]:
+        data = {k: v for k, v in asdict(self).items() if k != "ttft_samples"}
+        data["ttft_p50_s"] = _round(self.percentile(0.5))
+        data["ttft_p90_s"] = _round(self.percentile(HEDGE_PERCENTILE))
+        data["hedge_after_s"] = round(self.hedge_delay(policy), 3) if policy.hedge else None
+        return data
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 3) if value is not None else None
+
+
+_stats: dict[str, InvokeStats] = defaultdict(InvokeStats)
+
+
+def invoke_stats() -> dict[str, dict[str, Any]]:
+    """Hedging/retry counters and latency percentiles for every policy used so far."""
+    return {name: stats.snapshot(get_policy(name)) for name, stats in _stats.items()}
+
+
+class _TokenGate:
+    """Holds an attempt's ``on_llm_new_token`` callbacks until the race is
+    decided: the winner's are replayed in order and then pass straight
+    through, a loser's are dropped. Other events (run start/end, errors) are
+    never held, so traces stay complete.
+    """
+
+    def __init__(self) -> None:
+        self.open: bool | None = None
+        self._held: list[tuple[Callable, tuple, dict]] = []
+        self._classes: dict[type, type] = {}
+
+    def _gated_class(self, cls: type) -> type:
+        # A subclass per handler type whose only change is the token hook.
+        gated = self._classes.get(cls)
+        if gated is None:
+            gate = self
+            inner = cls.on_llm_new_token
+            if inspect.iscoroutinefunction(inner):
+                async def on_llm_new_token(handler, *args, **kwargs):
+                    if gate.open:
+                        return await inner(handler, *args, **kwargs)
+                    if gate.open is None:
+                        gate._held.append((inner, (handler, *args), kwargs))
+            else:
+                def on_llm_new_token(handler, *args, **kwargs):
+                    if gate.open:
+                        return inner(handler, *args, **kwargs)
+                    if gate.open is None:
+                        gate._held.append((inner, (handler, *args), kwargs))
+            gated = self._classes[cls] = type(cls.__name__, (cls,), {"on_llm_new_token": on_llm_new_token})
+        return gated
+
+    def _wrap(self, handler: BaseCallbackHandler) -> BaseCallbackHandler:
+        if not hasattr(handler, "__dict__"):
+            return handler
+        wrapped = object.__new__(self._gated_class(type(handler)))
+        # Same state as the original: only the token hook differs.
+        wrapped.__dict__ = handler.__dict__
+        return wrapped
+
+    def wrap(self, callbacks: Callbacks) -> Callbacks:
+        if callbacks is None:
+            return None
+        if isinstance(callbacks, list):
+            return [self._wrap(h) for h in callbacks]
+        wrapped = {id(h): self._wrap(h) for h in [*callbacks.handlers, *callbacks.inheritable_handlers]}
+        manager = callbacks.copy()
+        manager.handlers = [wrapped[id(h)] for h in callbacks.handlers]
+        manager.inheritable_handlers = [wrapped[id(h)] for h in callbacks.inheritable_handlers]
+        return manager
+
+    async def release(self) -> None:
+        # Tokens arriving while the backlog replays are queued behind it.
+        while self._held:
+            event, args, kwargs = self._held.pop(0)
+            result = event(*args, **kwargs)
+            if inspect.isawaitable(result):
+                await result
+        self.open = True
+
+    def drop(self) -> None:
+        self._held.clear()
+        self.open = False
+
+
+def _merge(final: Any, chunk: Any) -> Any:
+    # Message chunks concatenate. ``include_raw`` structured output streams
+    # ``{"raw": ...}`` chunks and then ``{"parsed": ...}``; adding the
+    # AddableDicts keeps every key instead of only the last chunk's.
+    if isinstance(final, (BaseMessageChunk, AddableDict)):
+        return final + chunk
+    return chunk
+
+
+def _finalize(final: Any) -> Any:
+    if isinstance(final, BaseMessageChunk):
+        return message_chunk_to_message(final)
+    if isinstance(final, AddableDict):
+        return {k: _finalize(v) for k, v in final.items()}
+    return final
+
+
+class _UsageRecorder(AsyncCallbackHandler):
+    """Keeps the usage the chat model reports when it finishes.
+
+    Structured output parses the model's message away, so this is the only
+    place a ``with_structured_output`` call's token usage is visible.
+    """
+
+    def __init__(self) -> None:
+        self.usage: dict | None = None
+
+    async def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if isinstance(message, AIMessage) and message.usage_metadata:
+                    self.usage = dict(message.usage_metadata)
+
+
+def _message_usage(result: Any) -> dict | None:
+    if isinstance(result, dict):
+        result = result.get("raw")
+    if isinstance(result, AIMessage) and result.usage_metadata:
+        return dict(result.usage_metadata)
+    return None
+
+
+class _Attempt:
+    """One streamed request, run in its own task so it can be raced and cancelled.
+
+    ``ready`` resolves at the first chunk (or completion/failure); ``task``
+    returns the aggregated output, after which ``usage`` holds the token
+    usage the model reported, if any.
+    """
+
+    def __init__(self, runnable: Runnable, input: Any, config: RunnableConfig | None):
+        self.started = time.monotonic()
+        self.ttft: float | None = None
+        self.usage: dict | None = None
+        self._recorder = _UsageRecorder()
+        self.gate = _TokenGate()
+        self._listener: ChunkListener | None = None
+        self._unseen: list[Any] = []
+        self.ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        # Failures are surfaced through ``task``; don't warn about ``ready``.
+        self.ready.add_done_callback(lambda f: f.cancelled() or f.exception())
+        config = merge_configs(ensure_config(config), {"callbacks": [self._recorder]})
+        config["callbacks"] = self.gate.wrap(config.get("callbacks"))
+        self.task = asyncio.create_task(self._run(runnable, input, config))
+
+    async def _run(self, runnable: Runnable, input: Any, config: RunnableConfig | None) -> Any:
+        final = None
+        try:
+            async for chunk in runnable.astream(input, config=config):
+                if self.ttft is None:
+                    self.ttft = time.monotonic() - self.started
+                    self._resolve()
+                final = _merge(final, chunk)
+                if self._listener is not None:
+                    self._listener.on_chunk(chunk)
+                else:
+                    self._unseen.append(chunk)
+        except asyncio.CancelledError:
+            if not self.ready.done():
+                self.ready.cancel()
+            raise
+        except Exception as e:
+            if not self.ready.done():
+                self.ready.set_exception(e)
+            raise
+        self._resolve()
+        result = _finalize(final)
+        self.usage = self._recorder.usage or _message_usage(result)
+        return result
+
+    def _resolve(self) -> None:
+        if not self.ready.done():
+            self.ready.set_result(None)
+
+    def attach(self, listener: ChunkListener) -> None:
+        """Replay what this attempt has streamed so far, then forward live."""
+        listener.reset()
+        for chunk in self._unseen:
+            listener.on_chunk(chunk)
+        self._unseen = []
+        self._listener = listener
+
+    @property
+    def succeeded(self) -> bool:
+        return self.ready.done() and not self.ready.cancelled() and self.ready.exception() is None
+
+    @property
+    def failed(self) -> bool:
+        return self.ready.done() and not self.succeeded
+
+    async def cancel(self) -> None:
+        if not self.task.done():
+            self.task.cancel()
+        try:
+            await self.task
+        except BaseException:
+            pass
+
+
+async def _hedged_call(
+    runnable: Runnable,
+    input: Any,
+    config: RunnableConfig | None,
+    name: str,
+    policy: InvokePolicy,
+    stats: InvokeStats,
+    governor: ModelGovernor,
+    tokens: int,
+    listener: ChunkListener | None,
+) -> tuple[Any, dict | None]:
+    attempts = [_Attempt(runnable, input, config)]
+    hedge_lease = None
+    started = attempts[0].started
+    hedge_at = started + stats.hedge_delay(policy) if policy.hedge else None
+    stall_at = started + policy.first_token_s
+    winner: _Attempt | None = None
+    try:
+        while winner is None:
+            now = time.monotonic()
+            wake_at = stall_at if hedge_at is None or len(attempts) > 1 else min(stall_at, hedge_at)
+            pending = [a.ready for a in attempts if not a.ready.done()]
+            if pending:
+                await asyncio.wait(pending, timeout=max(0.0, wake_at - now), return_when=asyncio.FIRST_COMPLETED)
+
+            winner = next((a for a in attempts if a.succeeded), None)
+            if winner is not None:
+                break
+            if all(a.failed for a in attempts):
+                # Surface the primary's error to the retry loop.
+                await attempts[0].task
+
+            now = time.monotonic()
+            if now >= stall_at:
+                stats.stalls += 1
+                raise FirstTokenTimeout(f"[{name}] no output after {policy.first_token_s:.0f}s")
+            if hedge_at is not None and len(attempts) == 1 and now >= hedge_at:
+                hedge_lease = governor.try_acquire(policy.priority, tokens)
+                if hedge_lease is None:
+                    stats.hedges_skipped += 1
+                    hedge_at = None
+                    logger.info(f"⏱️ [{name}] upstream busy, not hedging after {now - started:.1f}s")
+                    continue
+                stats.hedges += 1
+                logger.warning(
+                    f"⏱️ [{name}] no output after {now - started:.1f}s, sending a hedged duplicate request"
+                )
+                attempts.append(_Attempt(runnable, input, config))
+
+        for other in attempts:
+            if other is not winner:
+                other.gate.drop()
+        await winner.gate.release()
+        if listener is not None:
+            winner.attach(listener)
+        for other in attempts:
+            if other is not winner:
+                await other.cancel()
+        if winner is not attempts[0]:
+            stats.hedge_wins += 1
+            logger.info(f"⏱️ [{name}] hedged request won after {time.monotonic() - started:.1f}s")
+        if winner.ttft is not None:
+            stats.ttft_samples.append(winner.ttft)
+            record_llm_ttft(name, governor.name, winner.ttft)
+        return await winner.task, winner.usage
+    finally:
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.gate.drop()
+            if not attempt.task.done():
+                await attempt.cancel()
+        if hedge_lease is not None:
+            hedge_lease.release()
+
+
+def _thinks(model: Any) -> bool:
+    """Whether the model reasons before answering, i.e. thinking is not disabled."""
+    extra = getattr(model, "extra_body", None) or {}
+    return (extra.get("thinking") or {}).get("type") != "disabled"
+
+
+async def _governed_call(
+    runnable: Runnable,
+    input: Any,
+    config: RunnableConfig | None,
+    name: str,
+    policy: InvokePolicy,
+    stats: InvokeStats,
+    governor: ModelGovernor,
+    tokens: int,
+    listener: ChunkListener | None,
+) -> tuple[Any, dict | None]:
+    # Queue wait is not counted against the attempt's timeout.
+    lease = await governor.acquire(policy.priority, tokens)
+    timeout_s = policy.timeout_s
+    if policy.reasoning_timeout_s is not None and _thinks(underlying_model(runnable)):
+        timeout_s = policy.reasoning_timeout_s
+    try:
+        result, usage = await asyncio.wait_for(
+            _hedged_call(runnable, input, config, name, policy, stats, governor, tokens, listener),
+            timeout=timeout_s,
+        )
+        lease.release(usage.get("total_tokens") if usage else None)
+        return result, usage
+    finally:
+        lease.release()
+
+
+async def resilient_invoke(
+    runnable: Runnable,
+    input: Any,
+    *,
+    policy: str,
+    config: RunnableConfig | None = None,
+    listener: ChunkListener | None = None,
+) -> Any:
+    """Invoke ``runnable`` like ``ainvoke``, with the named policy's timeouts,
+    retries and hedging, optionally streaming the winner's chunks to ``listener``.
+
+    Permanent client errors (4xx) are re-raised immediately. After
+    ``max_attempts`` transient failures the last error is re-raised so
+    langfuse/langgraph still record the failure.
+    """
+    settings = get_policy(policy)
+    stats = _stats[policy]
+    stats.calls += 1
+    model = underlying_model(runnable)
+    governor = governor_for(model)
+    tokens = estimate_tokens(input, model)
+    started = time.monotonic()
+    for attempt in range(1, settings.max_attempts + 1):
+        try:
+            result, usage = await _governed_call(
+                runnable, input, config, policy, settings, stats, governor, tokens, listener,
+            )
+            record_llm_call(policy, governor.name, time.monotonic() - started, usage)
+            return result
+        except NON_RETRYABLE_API_ERRORS as e:
+            stats.failures += 1
+            record_llm_error(policy, governor.name, time.monotonic() - started, e)
+            logger.error(f"🤖 [{policy}] model call hit non-retryable {type(e).__name__}: {e}")
+            raise
+        except (openai.APIError, asyncio.TimeoutError) as e:
+            if attempt >= settings.max_attempts:
+                stats.failures += 1
+                record_llm_error(policy, governor.name, time.monotonic() - started, e)
+                logger.error(
+                    f"🤖 [{policy}] model call failed after {attempt}/{settings.max_attempts} "
+                    f"attempts: {type(e).__name__}: {e}"
+                )
+                raise
+            stats.retries += 1
+            backoff = settings.backoff_s[min(attempt - 1, len(settings.backoff_s) - 1)]
+            logger.warning(
+                f"🤖 [{policy}] model call attempt {attempt}/{settings.max_attempts} "
+                f"failed ({type(e).__name__}: {e}); retrying in {backoff:.0f}s"
+            )
+            await asyncio.sleep(backoff)
+    # Defensive: max_attempts < 1.
+    raise RuntimeError(f"[{policy}] model invoke made no attempts")
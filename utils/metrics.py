@@ -0,0 +1,224 @@
+"""📈 Prometheus metrics for where a turn's time, tokens and money go.
+
+Four choke points are instrumented, so most code never touches this module:
+
+- **Graph nodes** -- ``instrument_node`` wraps every DM and NPC node when the
+  graphs are built: wall time and errors per ``(graph, node)``. The same
+  timings feed the per-turn breakdown in ``utils.turn_timing``.
+- **Model calls** -- ``resilient_invoke`` reports wall time, time-to-first-
+  token, prompt/completion tokens and failures per policy and model. Cost is
+  derived from ``LLM_TOKEN_PRICES``, a JSON object of USD per million tokens,
+  e.g. ``{"gpt-4o": {"prompt": 2.5, "completion": 10}}``.
+- **Graphiti** -- the ``graphiti_utils`` helpers are decorated with
+  ``graphiti_timed``.
+- **Background jobs** -- ``fire_and_forget`` wraps its coroutine with
+  ``timed_job``.
+- **Preempted turns** -- ``utils.turn_scope`` counts cancelled turns and the
+  streamed tokens and bubbles they threw away.
+- **Token streaming** -- ``utils.stream_coalescing`` records model chunks and
+  Socket.IO frames per streamed message.
+
+``render_metrics`` produces the text exposition served at ``/metrics``. Each
+worker process keeps its own counters, so with ``uvicorn --workers N`` set
+``PROMETHEUS_MULTIPROC_DIR`` to an empty directory shared by the workers
+(and wiped on deploy): every worker then writes its samples there and
+``/metrics`` serves the sum over all of them, whichever worker answers.
+
+    PROMETHEUS_MULTIPROC_DIR  directory for multi-worker metrics (default: single process)
+"""
+import functools
+import inspect
+import json
+import os
+import time
+from collections.abc import Awaitable, Callable, Coroutine
+from logging import getLogger
+from typing import Any
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from utils.turn_timing import record_node_time
+
+logger = getLogger(__name__)
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+# Read by prometheus_client itself when it is imported; set it in the environment.
+PROMETHEUS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# Turns take 20-60s end to end, single nodes anywhere from milliseconds to a minute.
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120, float("inf"))
+TTFT_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, float("inf"))
+# A streamed message is a few hundred chunks; coalesced, a handful of frames.
+FRAME_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, float("inf"))
+
+
+def _load_prices() -> dict[str, dict[str, float]]:
+    raw = os.environ.get("LLM_TOKEN_PRICES")
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        logger.error("❌ LLM_TOKEN_PRICES is not valid JSON, cost metrics disabled")
+        return {}
+
+
+LLM_TOKEN_PRICES = _load_prices()
+
+NODE_SECONDS = Histogram(
+    "dionysus_node_seconds", "Wall time of one graph node run.", ["graph", "node"], buckets=LATENCY_BUCKETS,
+)
+NODE_ERRORS = Counter("dionysus_node_errors_total", "Graph node runs that raised.", ["graph", "node", "error"])
+
+LLM_SECONDS = Histogram(
+    "dionysus_llm_seconds", "Wall time of a model call, retries included.", ["policy", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TTFT = Histogram(
+    "dionysus_llm_ttft_seconds", "Time to first token of the winning attempt.", ["policy", "model"],
+    buckets=TTFT_BUCKETS,
+)
+LLM_TOKENS = Counter("dionysus_llm_tokens_total", "Reported model tokens.", ["policy", "model", "kind"])
+LLM_COST = Counter("dionysus_llm_cost_usd_total", "Model spend priced from LLM_TOKEN_PRICES.", ["policy", "model"])
+LLM_ERRORS = Counter("dionysus_llm_errors_total", "Model calls that failed for good.", ["policy", "model", "error"])
+
+GRAPHITI_SECONDS = Histogram(
+    "dionysus_graphiti_seconds", "Wall time of a Graphiti operation.", ["operation"], buckets=LATENCY_BUCKETS,
+)
+GRAPHITI_ERRORS = Counter("dionysus_graphiti_errors_total", "Graphiti operations that raised.", ["operation", "error"])
+
+JOB_SECONDS = Histogram(
+    "dionysus_background_job_seconds", "Wall time of a background job.", ["job"], buckets=LATENCY_BUCKETS,
+)
+JOB_ERRORS = Counter("dionysus_background_job_errors_total", "Background jobs that raised.", ["job", "error"])
+
+TURNS_CANCELLED = Counter("dionysus_turns_cancelled_total", "Turns preempted by a newer player message.")
+CANCELLED_TOKENS = Counter("dionysus_cancelled_tokens_total", "Tokens streamed by turns that were then cancelled.")
+RETRACTED_BUBBLES = Counter("dionysus_retracted_bubbles_total", "Streamed bubbles retracted on cancellation.")
+
+STREAM_FRAMES = Histogram(
+    "dionysus_stream_frames_per_message", "Socket.IO token frames sent per streamed message.", ["stream"],
+    buckets=FRAME_BUCKETS,
+)
+STREAM_CHUNKS = Counter("dionysus_stream_chunks_total", "Model chunks received for streamed messages.", ["stream"])
+STREAM_FRAMES_TOTAL = Counter("dionysus_stream_frames_total", "Socket.IO token frames sent.", ["stream"])
+
+
+def render_metrics() -> bytes:
+    if PROMETHEUS_MULTIPROC_DIR:
+        # A fresh registry per scrape, as prometheus_client's multiprocess docs require.
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+# ------------------------------------------------------------------
+# Graph nodes
+# ------------------------------------------------------------------
+
+def instrument_node(graph: str, node: str, fn: Callable) -> Callable:
+    """Time a graph node. The wrapper keeps ``fn``'s signature, so LangGraph
+    still passes ``config`` to nodes that ask for it."""
+    def observe(started: float) -> None:
+        seconds = time.monotonic() - started
+        NODE_SECONDS.labels(graph, node).observe(seconds)
+        record_node_time(f"{graph}.{node}", seconds)
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.monotonic()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                NODE_ERRORS.labels(graph, node, type(e).__name__).inc()
+                raise
+            finally:
+                observe(started)
+    else:
+        @functools.wraps(fn)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                NODE_ERRORS.labels(graph, node, type(e).__name__).inc()
+                raise
+            finally:
+                observe(started)
+    return timed
+
+
+# ------------------------------------------------------------------
+# Model calls
+# ------------------------------------------------------------------
+
+def record_llm_call(policy: str, model: str, seconds: float, usage: dict | None) -> None:
+    """One successful model call; ``usage`` is the model's reported token usage."""
+    LLM_SECONDS.labels(policy, model).observe(seconds)
+    if not usage:
+        return
+    prompt, completion = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    LLM_TOKENS.labels(policy, model, "prompt").inc(prompt)
+    LLM_TOKENS.labels(policy, model, "completion").inc(completion)
+    price = LLM_TOKEN_PRICES.get(model)
+    if price:
+        cost = (prompt * price.get("prompt", 0) + completion * price.get("completion", 0)) / 1_000_000
+        LLM_COST.labels(policy, model).inc(cost)
+
+
+def record_llm_ttft(policy: str, model: str, seconds: float) -> None:
+    LLM_TTFT.labels(policy, model).observe(seconds)
+
+
+def record_llm_error(policy: str, model: str, seconds: float, error: BaseException) -> None:
+    LLM_SECONDS.labels(policy, model).observe(seconds)
+    LLM_ERRORS.labels(policy, model, type(error).__name__).inc()
+
+
+# ------------------------------------------------------------------
+# Graphiti and background jobs
+# ------------------------------------------------------------------
+
+def graphiti_timed(operation: str) -> Callable[[Callable[..., Awaitable]], Callable[..., Awaitable]]:
+    """Decorate an async Graphiti helper with wall-time and error metrics."""
+    def decorate(fn: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+        @functools.wraps(fn)
+        async def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.monotonic()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                GRAPHITI_ERRORS.labels(operation, type(e).__name__).inc()
+                raise
+            finally:
+                GRAPHITI_SECONDS.labels(operation).observe(time.monotonic() - started)
+        return timed
+    return decorate
+
+
+async def timed_job(coro: Coroutine) -> Any:
+    """Await a background coroutine, labelled by its function name."""
+    job = getattr(coro, "__name__", type(coro).__name__)
+    started = time.monotonic()
+    try:
+        return await coro
+    except Exception as e:
+        JOB_ERRORS.labels(job, type(e).__name__).inc()
+        raise
+    finally:
+        JOB_SECONDS.labels(job).observe(time.monotonic() - started)
+
+
+def record_turn_cancelled(tokens: int, bubbles: int) -> None:
+    TURNS_CANCELLED.inc()
+    CANCELLED_TOKENS.inc(tokens)
+    RETRACTED_BUBBLES.inc(bubbles)
+
+
+def record_stream_message(stream: str, chunks: int, frames: int) -> None:
+    STREAM_FRAMES.labels(stream).observe(frames)
+    STREAM_CHUNKS.labels(stream).inc(chunks)
+    STREAM_FRAMES_TOTAL.labels(stream).inc(frames)
@@ -7,6 +7,8 @@ from pydantic import ConfigDict, Field, SecretStr, model_validator
 
 from hephaestus.settings import settings
 
+from utils.http_transport import pooled_async_client, pooled_sync_client
+
 _NANOGPT_BASE_URL = "https://nano-gpt.com/api/v1"
 _NANOGPT_LEGACY_URL = "https://nano-gpt.com/api/v1legacy"
 
@@ -16,6 +18,12 @@ class ChatNanoGPT(BaseChatOpenAI):  # type: ignore[override]
 
     Reads the API key from ``settings.NANOGPT_KEY`` (or pass ``api_key``).
     Set ``use_legacy_endpoint=True`` for reasoning/thinking models.
+
+    Streamed responses report token usage (``stream_usage``) like
+    non-streamed ones.
+
+    All instances share one pooled HTTP transport (see ``utils.http_transport``)
+    unless ``http_client`` / ``http_async_client`` are passed explicitly.
     """
 
     model_name: str = Field(alias="model")
@@ -25,6 +33,9 @@ class ChatNanoGPT(BaseChatOpenAI):  # type: ignore[override]
         default_factory=lambda: SecretStr(settings.NANOGPT_KEY),
     )
     openai_api_base: str = Field(default=_NANOGPT_BASE_URL)
+    # LangChain only asks for usage on streams to api.openai.com; calls are
+    # streamed (utils.llm_resilience), so token accounting depends on this.
+    stream_usage: bool = True
 
     use_legacy_endpoint: bool = False
 
@@ -40,3 +51,11 @@ class ChatNanoGPT(BaseChatOpenAI):  # type: ignore[override]
         if isinstance(data, dict) and data.get("use_legacy_endpoint"):
             data.setdefault("openai_api_base", _NANOGPT_LEGACY_URL)
         return data
+
+    @model_validator(mode="before")
+    @classmethod
+    def _use_shared_transport(cls, data: dict) -> dict:
+        if isinstance(data, dict):
+            data.setdefault("http_async_client", pooled_async_client())
+            data.setdefault("http_client", pooled_sync_client())
+        return data
@@ -1,39 +1,252 @@
+"""📜 Langfuse prompt registry.
+
+Prompts are resolved lazily on first use instead of at import time, so
+importing an agent never touches the network. At startup ``warm()`` boots
+from the on-disk snapshot (when one exists) and refreshes every known prompt
+from Langfuse concurrently in the background; without a snapshot it fetches
+them all concurrently before serving.
+
+The snapshot records each prompt's Langfuse version and is rewritten after
+every refresh, so a cold start -- or a Langfuse outage -- still has the last
+known prompts. ``reload()`` is the hot-reload hook: it re-fetches now and
+swaps the new versions in for the next call.
+
+    PROMPT_CACHE_DIR            where the snapshot lives (default ``.prompt_cache``)
+    PROMPT_REFRESH_INTERVAL_S   background refresh period, 0 disables (default 300)
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+
+from langchain_core.prompt_values import PromptValue
 from langchain_core.prompts import ChatPromptTemplate
 
 from hephaestus.langfuse_handler import langfuse
 
+logger = getLogger(__name__)
+
+PROMPT_CACHE_DIR = Path(os.environ.get("PROMPT_CACHE_DIR", ".prompt_cache"))
+PROMPT_REFRESH_INTERVAL_S = float(os.environ.get("PROMPT_REFRESH_INTERVAL_S", "300"))
+
+# Bump when the snapshot layout changes; older snapshots are then ignored.
+SNAPSHOT_SCHEMA = 1
+
+KNOWN_PROMPTS = (
+    "npc-plan",
+    "npc-tool",
+    "npc-narrator",
+    "npc-emotions",
+    "did-scene-change",
+    "character-episodic-memory",
+    "lore-creator",
+    "memory-significance-filter",
+    "npc-builder",
+    "dm-planner",
+    "dm-narrator",
+    "dm-npc-reviewer",
+    "dm-intent-router",
+    "dm-rules-referee",
+    "dm-continuity-checker",
+    "dm-ooc-responder",
+    "dm-faction-simulator",
+    "dm-scene-summarizer",
+    "placeholder_location",
+    "placeholder_scenario",
+    "campaign-admin",
+)
+
+
+@dataclass
+class PromptEntry:
+    """One resolved prompt: chat messages as (role, template) pairs, or plain text."""
+    version: int | None
+    kind: str
+    payload: Any
+    fetched_at: float
+
+
+def _serialize_message(message: Any) -> list[str]:
+    if isinstance(message, (tuple, list)):
+        return list(message)
+    if hasattr(message, "variable_name"):
+        return ["placeholder", f"{{{message.variable_name}}}"]
+    raise TypeError(f"Unsupported Langfuse chat message: {message!r}")
+
+
+def compile_text(template: str, **variables: Any) -> str:
+    """Fill ``{{variable}}`` slots in a Langfuse text prompt."""
+    return re.sub(
+        r"\{\{\s*(\w+)\s*\}\}",
+        lambda m: str(variables[m.group(1)]) if m.group(1) in variables else m.group(0),
+        template,
+    )
+
+
+class PromptRegistry:
+    def __init__(self, cache_dir: Path):
+        self._entries: dict[str, PromptEntry] = {}
+        self._templates: dict[str, ChatPromptTemplate] = {}
+        self._snapshot_path = cache_dir / f"prompts.v{SNAPSHOT_SCHEMA}.json"
+        self._refresh_task: asyncio.Task | None = None
+
+    # -- resolution ---------------------------------------------------------
+
+    @staticmethod
+    def _fetch(name: str) -> PromptEntry:
+        """Blocking Langfuse fetch; run off the event loop where possible."""
+        prompt = langfuse.get_prompt(name)
+        if isinstance(prompt.prompt, str):
+            return PromptEntry(prompt.version, "text", prompt.prompt, time.time())
+        messages = [_serialize_message(m) for m in prompt.get_langchain_prompt()]
+        return PromptEntry(prompt.version, "chat", messages, time.time())
+
+    def _store(self, name: str, entry: PromptEntry) -> None:
+        previous = self._entries.get(name)
+        if previous is not None and previous.version != entry.version:
+            logger.info(f"📜 Prompt '{name}' updated: v{previous.version} -> v{entry.version}")
+        self._entries[name] = entry
+        self._templates.pop(name, None)
+
+    def _entry(self, name: str) -> PromptEntry:
+        entry = self._entries.get(name)
+        if entry is None:
+            logger.info(f"📜 Prompt '{name}' not cached, fetching from Langfuse")
+            entry = self._fetch(name)
+            self._store(name, entry)
+        return entry
+
+    async def _aentry(self, name: str) -> PromptEntry:
+        entry = self._entries.get(name)
+        if entry is None:
+            logger.info(f"📜 Prompt '{name}' not cached, fetching from Langfuse")
+            entry = await asyncio.to_thread(self._fetch, name)
+            self._store(name, entry)
+        return entry
+
+    def _template(self, name: str, entry: PromptEntry) -> ChatPromptTemplate:
+        if entry.kind != "chat":
+            raise TypeError(f"Prompt '{name}' is a text prompt, not a chat prompt")
+        template = self._templates.get(name)
+        if template is None:
+            template = ChatPromptTemplate.from_messages([tuple(m) for m in entry.payload])
+            self._templates[name] = template
+        return template
+
+    def chat(self, name: str) -> ChatPromptTemplate:
+        """The chat template for ``name``, fetching it now if never resolved."""
+        return self._template(name, self._entry(name))
+
+    async def achat(self, name: str) -> ChatPromptTemplate:
+        return self._template(name, await self._aentry(name))
+
+    async def ainvoke(self, name: str, values: dict[str, Any]) -> PromptValue:
+        """Format chat prompt ``name`` with ``values``."""
+        return await (await self.achat(name)).ainvoke(values)
+
+    def text(self, name: str) -> str:
+        """The raw text of a text prompt (use ``compile_text`` to fill it)."""
+        return self._entry(name).payload
+
+    async def atext(self, name: str) -> str:
+        return (await self._aentry(name)).payload
+
+    def versions(self) -> dict[str, int | None]:
+        return {name: entry.version for name, entry in sorted(self._entries.items())}
+
+    # -- snapshot -----------------------------------------------------------
 
-def get_langchain_prompt(prompt_name: str) -> ChatPromptTemplate:
+    def load_snapshot(self) -> int:
+        """Seed the registry from disk. Returns how many prompts were loaded."""
+        if not self._snapshot_path.exists():
+            return 0
+        try:
+            raw = json.loads(self._snapshot_path.read_text())
+        except (OSError, ValueError):
+            logger.exception(f"⚠️ Unreadable prompt snapshot {self._snapshot_path}, ignoring it")
+            return 0
+        for name, data in raw.items():
+            self._entries.setdefault(name, PromptEntry(**data))
+        logger.info(f"📜 Loaded {len(raw)} prompt(s) from snapshot {self._snapshot_path}")
+        return len(raw)
 
-    return ChatPromptTemplate.from_messages(
-        langfuse.get_prompt(prompt_name).get_langchain_prompt())
+    def save_snapshot(self) -> None:
+        self._snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._snapshot_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({n: asdict(e) for n, e in self._entries.items()}, indent=2))
+        tmp.replace(self._snapshot_path)
 
-plan_prompt_template = get_langchain_prompt("npc-plan")
-tool_prompt_template = get_langchain_prompt("npc-tool")
-narrator_prompt_template = get_langchain_prompt("npc-narrator")
-emotions_prompt_template = get_langchain_prompt("npc-emotions")
+    # -- refresh ------------------------------------------------------------
 
-scene_change_prompt_template = get_langchain_prompt("did-scene-change")
-character_episodic_memory = langfuse.get_prompt("character-episodic-memory")
+    async def refresh(self, names: list[str] | None = None) -> dict[str, str]:
+        """Fetch ``names`` (default: every known prompt) concurrently and
+        persist the snapshot. Returns ``{name: error}`` for failed fetches;
+        those keep their previous version."""
+        names = list(names or sorted({*KNOWN_PROMPTS, *self._entries}))
+        started = time.monotonic()
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self._fetch, name) for name in names), return_exceptions=True,
+        )
+        failures: dict[str, str] = {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                failures[name] = f"{type(result).__name__}: {result}"
+                logger.warning(f"⚠️ Could not refresh prompt '{name}': {failures[name]}")
+            else:
+                self._store(name, result)
+        if len(failures) < len(names):
+            self.save_snapshot()
+        logger.info(
+            f"📜 Refreshed {len(names) - len(failures)}/{len(names)} prompt(s) "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+        return failures
 
-lore_creator_prompt_template = get_langchain_prompt("lore-creator")
+    async def warm(self) -> None:
+        """Startup hook: boot from snapshot if present, else fetch everything now."""
+        if self.load_snapshot():
+            self.start_background_refresh(refresh_now=True)
+        else:
+            await self.refresh()
+            self.start_background_refresh(refresh_now=False)
 
-memory_significance_prompt = get_langchain_prompt("memory-significance-filter")
+    async def reload(self, name: str | None = None) -> dict[str, Any]:
+        """Hot-reload hook: re-fetch one prompt (or all) and use it from the next call on."""
+        failures = await self.refresh([name] if name else None)
+        return {"versions": self.versions(), "failures": failures}
 
-npc_builder_prompt_template = get_langchain_prompt("npc-builder")
+    def start_background_refresh(self, refresh_now: bool) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if PROMPT_REFRESH_INTERVAL_S <= 0 and not refresh_now:
+            return
+        self._refresh_task = asyncio.create_task(self._refresh_loop(refresh_now))
 
-dm_planner_prompt_template = get_langchain_prompt("dm-planner")
-dm_narrator_prompt_template = get_langchain_prompt("dm-narrator")
-dm_npc_reviewer_prompt_template = get_langchain_prompt("dm-npc-reviewer")
+    async def _refresh_loop(self, refresh_now: bool) -> None:
+        delay = 0.0 if refresh_now else PROMPT_REFRESH_INTERVAL_S
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("🔥 Background prompt refresh failed")
+            if PROMPT_REFRESH_INTERVAL_S <= 0:
+                return
+            delay = PROMPT_REFRESH_INTERVAL_S
 
-dm_intent_router_prompt_template = get_langchain_prompt("dm-intent-router")
-dm_rules_referee_prompt_template = get_langchain_prompt("dm-rules-referee")
-dm_continuity_prompt_template = get_langchain_prompt("dm-continuity-checker")
-dm_ooc_responder_prompt_template = get_langchain_prompt("dm-ooc-responder")
-dm_faction_prompt_template = get_langchain_prompt("dm-faction-simulator")
-dm_scene_summarizer_prompt_template = get_langchain_prompt("dm-scene-summarizer")
+    async def stop_background_refresh(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
 
-placeholder_location = langfuse.get_prompt("placeholder_location").prompt
-placeholder_scenario = langfuse.get_prompt("placeholder_scenario").prompt
 
-campaign_admin_prompt_template = get_langchain_prompt("campaign-admin")
\ No newline at end of file
+prompts = PromptRegistry(PROMPT_CACHE_DIR)
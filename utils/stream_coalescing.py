@@ -0,0 +1,111 @@
+"""🪣 Coalesce streamed model tokens into fewer Socket.IO frames.
+
+Model streams arrive a token or two per chunk; forwarding each one as its own
+event means hundreds of websocket frames and JSON encodes per message, which
+with many tables adds up to an event loop busy framing. A ``TokenCoalescer``
+buffers a message's text and sends it when the oldest buffered text is
+``STREAM_FLUSH_MS`` old or ``STREAM_FLUSH_BYTES`` have piled up, whichever
+comes first. The first chunk of a message is always sent at once so
+time-to-first-token is unchanged, and ``close()`` flushes whatever is left --
+call it before the message's end event.
+
+All token streams share it: the DM narrator handler, the NPC streamer and
+the ``/lore``, ``/npc_builder`` and ``/campaign_admin`` namespaces.
+Frames per message are recorded in ``/metrics``.
+
+    STREAM_FLUSH_MS     max age of buffered text, 0 sends every chunk (default 50)
+    STREAM_FLUSH_BYTES  buffered UTF-8 bytes that force a send (default 512)
+"""
+import asyncio
+import os
+import time
+from typing import Any
+
+import socketio
+
+from utils.metrics import record_stream_message
+
+STREAM_FLUSH_MS = float(os.environ.get("STREAM_FLUSH_MS", "50"))
+STREAM_FLUSH_BYTES = int(os.environ.get("STREAM_FLUSH_BYTES", "512"))
+
+
+class TokenCoalescer:
+    """Buffers one message's tokens and emits them as ``{**payload, "token": text}``."""
+
+    def __init__(
+        self,
+        sio: socketio.AsyncServer,
+        event: str,
+        payload: dict[str, Any],
+        *,
+        to: str,
+        namespace: str | None = None,
+        stream: str,
+    ):
+        self.sio = sio
+        self.event = event
+        self.payload = payload
+        self.to = to
+        self.namespace = namespace
+        self.stream = stream
+        self.chunks = 0
+        self.frames = 0
+        self._buffer: list[str] = []
+        self._bytes = 0
+        self._first_at = 0.0
+        self._timer: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._closed = False
+
+    async def push(self, token: str) -> None:
+        if not token or self._closed:
+            return
+        self.chunks += 1
+        if not self._buffer:
+            self._first_at = time.monotonic()
+        self._buffer.append(token)
+        self._bytes += len(token.encode())
+
+        if self.frames == 0 or STREAM_FLUSH_MS <= 0 or self._bytes >= STREAM_FLUSH_BYTES:
+            await self.flush()
+        elif time.monotonic() - self._first_at >= STREAM_FLUSH_MS / 1000:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(max(STREAM_FLUSH_MS / 1000 - (time.monotonic() - self._first_at), 0))
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        # Serialized so a timer flush and a size flush can never reorder text.
+        async with self._lock:
+            if not self._buffer:
+                return
+            text = "".join(self._buffer)
+            self._buffer.clear()
+            self._bytes = 0
+            self.frames += 1
+            await self.sio.emit(self.event, {**self.payload, "token": text}, to=self.to, namespace=self.namespace)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def close(self) -> None:
+        """Send what is buffered and record the message's frame count."""
+        if self._closed:
+            return
+        self._cancel_timer()
+        await self.flush()
+        self._closed = True
+        if self.chunks:
+            record_stream_message(self.stream, self.chunks, self.frames)
+
+    def discard(self) -> None:
+        """Drop buffered text without sending it (the message is being retracted)."""
+        self._cancel_timer()
+        self._buffer.clear()
+        self._closed = True
@@ -0,0 +1,138 @@
+"""🧵 What a running turn owns, so a preempted turn can be torn down cleanly.
+
+The Socket.IO turn handler opens a ``TurnScope`` before streaming the DM
+graph. Like ``TurnTimer`` it lives in a context variable, so the nodes of
+that turn reach it without threading it through state. The scope holds:
+
+- **child tasks** -- work a node starts outside LangGraph's own task tree
+  (speculative rulings, narration drafts, context prefetches, memory writes),
+  spawned with ``spawn_child`` or registered with ``adopt``. Cancelling the
+  graph stream cancels its nodes and their model streams; the children are
+  cancelled by ``cancel_children``.
+- **bubbles** -- every message id streamed to the client, so a cancelled
+  turn can retract them.
+- **streamed tokens** -- counted so the tokens thrown away by cancellation
+  show up in ``cancellation_stats`` and ``/metrics``.
+
+Once ``persist_messages`` has written the turn (``mark_committed``) its
+bubbles are canon and are no longer retracted, and the callbacks registered
+with ``after_commit`` run -- work that must only happen for a turn that
+stands, such as queueing its epilogue.
+"""
+import asyncio
+from collections.abc import Callable, Coroutine
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any
+
+from utils.metrics import record_turn_cancelled
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class TurnScope:
+    conversation_id: int
+    turn_id: str
+    children: set[asyncio.Task] = field(default_factory=set)
+    bubbles: list[str] = field(default_factory=list)
+    streamed_tokens: int = 0
+    committed: bool = False
+    on_commit: list[Callable[[], None]] = field(default_factory=list)
+
+
+@dataclass
+class CancellationStats:
+    cancelled_turns: int = 0
+    retracted_bubbles: int = 0
+    cancelled_tokens: int = 0
+    cancelled_children: int = 0
+
+
+_current_scope: ContextVar[TurnScope | None] = ContextVar("current_turn_scope", default=None)
+_stats = CancellationStats()
+
+
+def open_scope(conversation_id: int, turn_id: str) -> TurnScope:
+    """Open the scope for the turn running in the current context."""
+    scope = TurnScope(conversation_id, turn_id)
+    _current_scope.set(scope)
+    return scope
+
+
+def current_scope() -> TurnScope | None:
+    return _current_scope.get()
+
+
+def adopt(task: asyncio.Task) -> asyncio.Task:
+    """Tie an already-created task to the current turn, if there is one."""
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.children.add(task)
+        task.add_done_callback(scope.children.discard)
+    return task
+
+
+def spawn_child(coro: Coroutine) -> asyncio.Task:
+    """``asyncio.create_task`` for work that belongs to the current turn."""
+    return adopt(asyncio.create_task(coro))
+
+
+def note_bubble(message_id: str) -> None:
+    scope = _current_scope.get()
+    if scope is not None and message_id not in scope.bubbles:
+        scope.bubbles.append(message_id)
+
+
+def note_token() -> None:
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.streamed_tokens += 1
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the current turn is persisted; at once outside a turn."""
+    scope = _current_scope.get()
+    if scope is None or scope.committed:
+        callback()
+    else:
+        scope.on_commit.append(callback)
+
+
+def mark_committed() -> None:
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.committed = True
+        callbacks, scope.on_commit = scope.on_commit, []
+        for callback in callbacks:
+            callback()
+
+
+def cancel_children(scope: TurnScope) -> int:
+    """Cancel the turn's unfinished child tasks; returns how many there were."""
+    pending = [task for task in scope.children if not task.done()]
+    for task in pending:
+        task.cancel()
+    return len(pending)
+
+
+def record_cancellation(scope: TurnScope, children: int) -> None:
+    _stats.cancelled_turns += 1
+    _stats.retracted_bubbles += len(scope.bubbles)
+    _stats.cancelled_tokens += scope.streamed_tokens
+    _stats.cancelled_children += children
+    record_turn_cancelled(scope.streamed_tokens, len(scope.bubbles))
+    logger.info(
+        f"✂️ Turn {scope.turn_id} cancelled: {len(scope.bubbles)} bubble(s) and "
+        f"{scope.streamed_tokens} streamed token(s) retracted, {children} child task(s) cancelled"
+    )
+
+
+def cancellation_stats() -> dict[str, Any]:
+    return {
+        "cancelled_turns": _stats.cancelled_turns,
+        "retracted_bubbles": _stats.retracted_bubbles,
+        "cancelled_tokens": _stats.cancelled_tokens,
+        "cancelled_children": _stats.cancelled_children,
+    }
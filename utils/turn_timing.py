@@ -0,0 +1,110 @@
+"""⏱️ Per-turn latency markers.
+
+The Socket.IO turn handler opens a ``TurnTimer`` before streaming the DM
+graph; it lives in a context variable, so every node and stream handler of
+that turn can reach it without threading it through state. The headline
+number is time-to-first-narration-token (TTFNT): from the player's message
+to the first token the player sees, whoever speaks first.
+
+Samples are bucketed by the turn's ``mode`` (set by the planner, e.g.
+``plan_streaming`` vs ``plan_blocking``), so two configurations can be
+compared side by side -- offline with recorded cassettes, or in production.
+
+Every instrumented graph node (``utils.metrics.instrument_node``) also adds
+its wall time to the turn, so ``breakdown()`` shows where the turn went.
+Nodes on parallel branches overlap, so their times can sum past the total.
+With ``TURN_TIMING_DEBUG=1`` the breakdown is sent to the client on the
+turn's last ``stream_end`` event.
+"""
+import os
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any
+
+logger = getLogger(__name__)
+
+# TTFNT samples kept per mode.
+TTFNT_WINDOW = 500
+
+TURN_TIMING_DEBUG = os.environ.get("TURN_TIMING_DEBUG", "0").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class TurnTimer:
+    mode: str = "unplanned"
+    started: float = field(default_factory=time.monotonic)
+    first_token_s: float | None = None
+    nodes: dict[str, float] = field(default_factory=dict)
+
+    def breakdown(self) -> dict[str, Any]:
+        """Per-node seconds for this turn, slowest first."""
+        nodes = sorted(self.nodes.items(), key=lambda item: item[1], reverse=True)
+        return {
+            "mode": self.mode,
+            "total_s": round(time.monotonic() - self.started, 3),
+            "ttfnt_s": round(self.first_token_s, 3) if self.first_token_s is not None else None,
+            "nodes": {name: round(seconds, 3) for name, seconds in nodes},
+        }
+
+
+_current_turn: ContextVar[TurnTimer | None] = ContextVar("current_turn", default=None)
+_last_turn_started = 0.0
+_ttfnt_samples: dict[str, deque] = defaultdict(lambda: deque(maxlen=TTFNT_WINDOW))
+
+
+def start_turn() -> TurnTimer:
+    """Open the timer for the turn running in the current context."""
+    global _last_turn_started
+    timer = TurnTimer()
+    _last_turn_started = timer.started
+    _current_turn.set(timer)
+    return timer
+
+
+def current_turn() -> TurnTimer | None:
+    return _current_turn.get()
+
+
+def seconds_since_last_turn() -> float:
+    """How long this process has gone without a new turn (idle-time work gate)."""
+    return time.monotonic() - _last_turn_started
+
+
+def set_turn_mode(mode: str) -> None:
+    timer = _current_turn.get()
+    if timer is not None:
+        timer.mode = mode
+
+
+def record_node_time(node: str, seconds: float) -> None:
+    """Add a node run to the current turn's breakdown (repeat runs accumulate)."""
+    timer = _current_turn.get()
+    if timer is not None:
+        timer.nodes[node] = timer.nodes.get(node, 0.0) + seconds
+
+
+def mark_first_token() -> None:
+    """Record TTFNT the first time any narration token reaches the player."""
+    timer = _current_turn.get()
+    if timer is None or timer.first_token_s is not None:
+        return
+    timer.first_token_s = time.monotonic() - timer.started
+    _ttfnt_samples[timer.mode].append(timer.first_token_s)
+    logger.info(f"⏱️ First narration token after {timer.first_token_s:.2f}s ({timer.mode})")
+
+
+def ttfnt_stats() -> dict[str, dict[str, Any]]:
+    """TTFNT percentiles per turn mode."""
+    stats = {}
+    for mode, samples in _ttfnt_samples.items():
+        ordered = sorted(samples)
+        stats[mode] = {
+            "turns": len(ordered),
+            "p50_s": round(ordered[len(ordered) // 2], 3),
+            "p90_s": round(ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))], 3),
+            "mean_s": round(sum(ordered) / len(ordered), 3),
+        }
+    return stats